@@ -8,7 +8,7 @@ import json
 from scipy.stats import binomtest
 
 # --- Correctly import the PostgreSQL connection functions ---
-from database import get_db_connection, release_db_connection, connection_pool
+from database import get_db_connection, release_db_connection, connection_pool, read_archived_insights
 from config import TRANSACTION_COST_PERCENT, BENCHMARK_TICKER, RISK_FREE_RATE
 
 # --- Configuration ---
@@ -29,6 +29,11 @@ def run_backtest():
         conn = get_db_connection()
         query = "SELECT * FROM insights WHERE sentiment != 'Neutral' AND timestamp < NOW() - INTERVAL '3 days'"
         df = pd.read_sql_query(query, conn)
+        # Months past the retention window live in the Parquet archive, not in the table
+        archived = read_archived_insights()
+        if not archived.empty:
+            archived = archived[archived["sentiment"] != "Neutral"]
+            df = pd.concat([archived, df], ignore_index=True) if not df.empty else archived
         # ---------------------------------------------
 
     except Exception as e:
@@ -0,0 +1,82 @@
+# benchmark_queries.py
+"""
+Shows the query plans and timings of the two hot insights queries with and without
+the indexes from database.MIGRATIONS (migration 3).
+
+Usage:
+    python benchmark_queries.py                 # uses the most frequent ticker
+    python benchmark_queries.py --ticker INFY --runs 5
+
+Nothing is dropped: the "before" plan is produced in a read-only transaction with
+index and bitmap scans disabled (SET LOCAL), which forces the sequential scans the
+queries used before the indexes existed. Run `python -c "import database;
+database.initialize_db()"` first so the indexes are in place for the "after" plan.
+"""
+
+import time
+import logging
+import argparse
+from database import get_db_connection, release_db_connection, connection_pool
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+
+QUERIES = {
+    "get_historical_sentiment": ("SELECT * FROM insights WHERE ticker = %s ORDER BY timestamp DESC", True),
+    "backtester": ("SELECT * FROM insights WHERE sentiment != 'Neutral' AND timestamp < NOW() - INTERVAL '3 days'", False),
+}
+
+
+def _explain(cursor, sql: str, params: tuple, use_indexes: bool) -> tuple:
+    cursor.execute("BEGIN READ ONLY")
+    try:
+        if not use_indexes:
+            cursor.execute("SET LOCAL enable_indexscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+            cursor.execute("SET LOCAL enable_indexonlyscan = off")
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+        plan = [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.execute("ROLLBACK")
+    execution_ms = next((float(line.split(":")[1].split()[0]) for line in plan
+                         if line.startswith("Execution Time")), float("nan"))
+    return plan, execution_ms
+
+
+def run_benchmark(ticker: str = None, runs: int = 3):
+    if not connection_pool:
+        logging.error("Benchmark aborted: no database connection available.")
+        return
+    conn = get_db_connection()
+    conn.autocommit = True   # transactions are managed explicitly around each EXPLAIN
+    try:
+        with conn.cursor() as cursor:
+            if ticker is None:
+                cursor.execute("SELECT ticker FROM insights GROUP BY ticker ORDER BY COUNT(*) DESC LIMIT 1")
+                row = cursor.fetchone()
+                if row is None:
+                    logging.warning("The insights table is empty; nothing to benchmark.")
+                    return
+                ticker = row[0]
+            cursor.execute("SELECT COUNT(*) FROM insights")
+            print(f"insights rows: {cursor.fetchone()[0]}, ticker: {ticker}, runs: {runs}\n")
+
+            for name, (sql, takes_ticker) in QUERIES.items():
+                params = (ticker,) if takes_ticker else ()
+                for label, use_indexes in (("before (sequential scan)", False), ("after (indexes)", True)):
+                    started = time.perf_counter()
+                    timings = [_explain(cursor, sql, params, use_indexes)[1] for _ in range(runs)]
+                    plan, _ = _explain(cursor, sql, params, use_indexes)
+                    print(f"=== {name} — {label}: median {sorted(timings)[len(timings) // 2]:.2f} ms "
+                          f"(wall {1000 * (time.perf_counter() - started) / (runs + 1):.2f} ms/run)")
+                    print("\n".join(plan) + "\n")
+    finally:
+        conn.autocommit = False
+        release_db_connection(conn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ticker", help="ticker for the get_historical_sentiment query")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per plan")
+    args = parser.parse_args()
+    run_benchmark(args.ticker, args.runs)
@@ -0,0 +1,180 @@
+# company_matcher.py
+"""
+Company-name matching over the NSE list.
+
+CompanyNameMatcher — indexed fuzzy matcher for a single candidate name.
+MentionScanner     — Aho-Corasick automaton that finds every exact name mention
+                     in a text in one linear pass.
+
+CompanyNameMatcher
+
+Produces exactly the result of scanning every official name with
+`thefuzz.fuzz.token_set_ratio` (same scores, same "shorter name wins ties" rule),
+but only scores a shortlist of names that could possibly reach the cutoff:
+
+  • names sharing at least one token with the query (token inverted index), and
+  • names whose character multiset overlaps the query's enough for the
+    character-level ratio to reach the cutoff (vectorized numpy bound).
+
+With no shared tokens, token_set_ratio reduces to an indel ratio of the sorted
+token sets, which can never exceed 2·overlap / (len_a + len_b) where `overlap`
+counts characters common to both strings — so every name the bound discards
+would have scored below the cutoff anyway. The shortlist is then scored with
+rapidfuzz's C implementation, which thefuzz itself wraps.
+"""
+
+import re
+from collections import defaultdict, deque
+from functools import lru_cache
+import numpy as np
+from rapidfuzz import fuzz, process
+from thefuzz import utils
+
+
+def _process(text: str) -> str:
+    # Same preprocessing thefuzz applies inside token_set_ratio (on lowercased input)
+    return utils.full_process(text.lower(), force_ascii=True)
+
+
+def _token_set_string(processed: str) -> str:
+    return " ".join(sorted(set(processed.split())))
+
+
+class CompanyNameMatcher:
+    def __init__(self, name_to_ticker: dict, cache_size: int = 20000):
+        self.source = name_to_ticker
+        self._names = list(name_to_ticker)
+        self._tickers = [name_to_ticker[n] for n in self._names]
+        self._processed = [_process(n) for n in self._names]
+        self._name_lengths = np.array([len(n) for n in self._names])
+
+        # Case-insensitive exact lookup (first official name wins, as in the old linear scan)
+        self._exact = {}
+        for i, name in enumerate(self._names):
+            self._exact.setdefault(name.strip().lower(), i)
+
+        # Token inverted index: token -> ids of names containing it
+        postings = defaultdict(list)
+        for i, processed in enumerate(self._processed):
+            for token in set(processed.split()):
+                postings[token].append(i)
+        self._postings = {t: np.array(ids) for t, ids in postings.items()}
+
+        # Character counts of each name's sorted token set, for the overlap bound
+        token_sets = [_token_set_string(p) for p in self._processed]
+        alphabet = sorted({c for s in token_sets for c in s})
+        self._char_columns = {c: j for j, c in enumerate(alphabet)}
+        self._char_counts = np.zeros((len(token_sets), len(alphabet)), dtype=np.int32)
+        for i, s in enumerate(token_sets):
+            for c in s:
+                self._char_counts[i, self._char_columns[c]] += 1
+        self._token_set_lengths = np.array([len(s) for s in token_sets])
+
+        self.best_match = lru_cache(maxsize=cache_size)(self._best_match)
+
+    def __len__(self):
+        return len(self._names)
+
+    def exact(self, name: str):
+        """(official_name, ticker) for a case-insensitive exact name match, else None."""
+        i = self._exact.get(name.strip().lower())
+        return (self._names[i], self._tickers[i]) if i is not None else None
+
+    def shortlist(self, processed_query: str, score_cutoff: float) -> np.ndarray:
+        """Ids of every name that can reach `score_cutoff` (after thefuzz's rounding)."""
+        if score_cutoff <= 0:
+            return np.arange(len(self._names))
+
+        tokens = set(processed_query.split())
+        shared = [self._postings[t] for t in tokens if t in self._postings]
+
+        query_set = _token_set_string(processed_query)
+        counts = np.zeros(len(self._char_columns), dtype=np.int32)
+        for c in query_set:
+            j = self._char_columns.get(c)
+            if j is not None:
+                counts[j] += 1
+        overlap = np.minimum(self._char_counts, counts).sum(axis=1)
+        total = self._token_set_lengths + len(query_set)
+        # Scores are rounded to int, so anything >= cutoff - 0.5 may still round up
+        reachable = np.nonzero(200 * overlap >= (score_cutoff - 0.5) * total)[0]
+
+        return np.unique(np.concatenate(shared + [reachable])) if shared else reachable
+
+    def _best_match(self, name: str, score_cutoff: float = 0) -> tuple:
+        """
+        Best (official_name, ticker, score) for `name`, or (None, None, 0) when no
+        name scores at least `score_cutoff`. Ties go to the shorter official name,
+        then to the earlier entry in the source map.
+        """
+        query = _process(name)
+        ids = self.shortlist(query, score_cutoff)
+        if not query or not len(ids):
+            return None, None, 0
+
+        choices = [self._processed[i] for i in ids]
+        raw = process.cdist([query], choices, scorer=fuzz.token_set_ratio, dtype=np.float64)[0]
+        scores = np.rint(raw).astype(int)   # half-to-even, like thefuzz's int(round(score))
+        best_score = scores.max()
+        if best_score <= 0 or best_score < score_cutoff:
+            return None, None, 0
+
+        tied = ids[scores == best_score]
+        best = tied[np.argmin(self._name_lengths[tied])]   # argmin keeps the earliest on equal length
+        return self._names[best], self._tickers[best], int(best_score)
+
+
+class MentionScanner:
+    """
+    Token-level Aho-Corasick automaton over normalized names (lowercase, punctuation
+    treated as whitespace — the keys of nlp_processor.NORMALIZED_INDEX). Matching on
+    whole tokens means a name is never found inside a longer word, and scanning is
+    linear in the number of tokens regardless of how many names are compiled in.
+    """
+    _token_pattern = re.compile(r'\w+')
+
+    def __init__(self, normalized_names):
+        self.source = normalized_names
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]   # per node: [(name as given, length_in_tokens)]
+
+        for name in normalized_names:
+            tokens = name.split()
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                child = self._goto[node].get(token)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][token] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append((name, len(tokens)))
+
+        # Breadth-first construction of failure links; children of the root fail to the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def scan(self, text: str):
+        """Yields (name, start_char, end_char) for every mention in `text`; `name` is the
+        compiled name exactly as given, so it can be used as a key into the source mapping."""
+        spans = [(m.start(), m.end(), m.group().lower()) for m in self._token_pattern.finditer(text)]
+        node = 0
+        for i, (_, end, token) in enumerate(spans):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for name, length in self._out[node]:
+                yield name, spans[i - length + 1][0], end
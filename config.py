@@ -8,8 +8,64 @@ FEEDS_TO_PROCESS = {
     "Livemint":     {'url': "https://www.livemint.com/rss/companies", 'weight': 0.9},
 }
 
+# --- SCRAPER CONFIG ---
+SCRAPER_MAX_CONCURRENCY = 16       # total open connections in async fetch mode
+SCRAPER_PER_HOST_CONCURRENCY = 2   # in-flight requests allowed per news site
+SCRAPER_PER_HOST_DELAY = 0.5       # min seconds between request starts to the same site
+FEED_STATE_MAX_GUIDS = 500         # processed entry GUIDs remembered per feed (feed_state.json)
+SEEN_STORE_HOT_SIZE = 5000         # in-memory LRU entries in front of seen_articles.db
+
+# --- DATABASE CONFIG ---
+STORAGE_BACKEND = "postgres"  # "postgres", or "sqlite" to run everything locally (storage.py)
+SQLITE_PATH = "local_insights.db"  # the "sqlite" backend's file (relative to the repo)
+DB_POOL_MIN_CONNECTIONS = 2   # opened at import time and kept open while idle (extra ones close on return)
+DB_POOL_MAX_CONNECTIONS = 10  # callers wait for a free connection beyond this
+DB_POOL_TIMEOUT_SECONDS = 30.0      # longest wait for a free connection before PoolError
+DB_POOL_HEALTHCHECK_SECONDS = 60.0  # connections idle longer than this are re-checked with SELECT 1
+DB_POOL_RETRY_SECONDS = 30.0        # if the pool could not be opened, try again at most this often
+INSIGHT_BATCH_SIZE = 200      # rows per multi-row INSERT / commit (database.InsightWriter)
+INSIGHT_FLUSH_SECONDS = 5.0   # flush once the oldest buffered insight is this old
+INSIGHT_WRITE_RETRIES = 3     # retries on connection errors, each on a fresh pooled connection
+HISTORY_PAGE_SIZE = 500       # default rows per database.query_insights page
+INSIGHTS_HOT_MONTHS = 12                  # monthly partitions kept in Postgres; older ones are archived
+INSIGHTS_PARTITION_MONTHS_AHEAD = 2       # partitions created in advance of the current month
+INSIGHTS_ARCHIVE_DIR = "archive/insights" # Parquet archive of dropped partitions (relative to the repo)
+DASHBOARD_HISTORY_DAYS = 90   # sentiment history window in the company drilldown
+INSIGHTS_NOTIFY_CHANNEL = "insights_changed"  # Postgres NOTIFY channel for insight writes (migration 7)
+DASHBOARD_CHANGE_CHECK_SECONDS = 2   # how often a dashboard session checks for new insights
+
+# --- WORKER PIPELINE CONFIG ---
+# Each worker.py stage runs its own thread pool; stages are linked by bounded queues
+# of PIPELINE_QUEUE_SIZE items, so a slow stage throttles the ones feeding it.
+PIPELINE_QUEUE_SIZE = 64
+PIPELINE_STAGES = {
+    "fetch":   {'workers': 1},                     # one iter_feeds call streams every feed
+    "parse":   {'workers': 1, 'batch_size': 32},   # articles per nlp.pipe batch (CPU bound)
+    "extract": {'workers': 1},
+    "infer":   {'workers': 2, 'batch_size': 8},    # articles per concurrent LLM batch
+    "enrich":  {'workers': 1},                     # in-memory SectorIndex lookups (cheap, GIL bound)
+    "persist": {'workers': 1, 'batch_size': 32},   # articles per insight commit; keep one writer
+}
+
 # --- NLP PROCESSOR CONFIG ---
 FUZZY_MATCH_THRESHOLD = 90
+# "ngram": fuzzy-match every unigram and 2-4-gram (original behaviour)
+# "automaton": one Aho-Corasick pass for exact name mentions, fuzzy only for leftover NER ORG spans
+TICKER_SCAN_MODE = "ngram"
+# spaCy is only used for NER (ORG / MONEY / PERCENT) and sentence boundaries, so the
+# default profile drops the tagger, parser, lemmatizer and attribute ruler and uses the
+# much cheaper statistical sentence segmenter instead of the parser. en_core_web_lg's
+# NER reads the static vectors, so they stay; "lite" switches to the vector-less sm model.
+SPACY_MODEL = "en_core_web_lg"
+SPACY_PROFILE = "ner"
+SPACY_PROFILES = {
+    "full": {"exclude": []},
+    "ner":  {"exclude": ["tagger", "parser", "attribute_ruler", "lemmatizer"], "enable": ["senter"]},
+    "lite": {"model": "en_core_web_sm",
+             "exclude": ["tagger", "parser", "attribute_ruler", "lemmatizer"], "enable": ["senter"]},
+}
+NLP_BATCH_SIZE = 32   # texts per nlp.pipe batch
+NLP_N_PROCESS = 1     # spaCy worker processes for large batches; -1 = one per CPU core (backfills)
 ENTITY_BLOCKLIST = {
     'swiggy', 'zerodha', 'byju\'s', 'razorpay', 'cred', 'phonepe', 'ola', 'oyo',
     'reserve bank of india', 'rbi', 'sebi', 'ministry of finance', 'flipkart'
@@ -17,12 +73,45 @@ ENTITY_BLOCKLIST = {
 
 # --- INFERENCE ENGINE CONFIG ---
 GROQ_MODEL = "llama-3.1-8b-instant"
+# Sentiment backend core_nlp dispatches to: "groq", "local" (AdvancedSentimentAnalyzer, offline)
+# or "auto" (Groq, falling back to local when the key is missing or the API is down)
+SENTIMENT_BACKEND = "auto"
+LOCAL_SENTIMENT_MAX_CONFIDENCE = 0.8   # cap on the local backend's confidence
+# Two-tier cascade (worker): AdvancedSentimentAnalyzer scores every snippet, and only raw
+# scores inside the uncertainty band go to Groq. A small share of fully-local articles is
+# audited against Groq to track agreement.
+SENTIMENT_CASCADE = False
+CASCADE_UNCERTAINTY_BAND = (-0.3, 0.3)
+CASCADE_AUDIT_RATE = 0.05
+# Keyword rules for headline event types when no LLM answer is used (checked in order)
+EVENT_KEYWORDS = {
+    "Earnings Report": ["results", "earnings", "quarterly", "q[1-4]", "profit", "net loss", "revenue"],
+    "Merger or Acquisition": ["acquires?", "acquisition", "merger", "merges?", "buyout", "takeover", "stake"],
+    "Legal or Regulatory Issue": ["sebi", "penalty", "fined?", "court", "probe", "lawsuit", "regulator", "ban"],
+    "Analyst Update": ["upgrades?", "downgrades?", "target price", "rating", "brokerage", "outperform", "underperform"],
+    "Product Launch": ["launch(?:es|ed)?", "unveils?", "rolls out", "introduces?"],
+    "Partnership": ["partners?", "partnership", "tie-up", "joint venture", "mou", "collaborat\\w*"],
+    "Executive Change": ["ceo", "cfo", "chairman", "appoints?", "resigns?", "steps down", "managing director"],
+}
+GROQ_REQUESTS_PER_MINUTE = 30   # async client budget; keep at or below the account's limits
+GROQ_TOKENS_PER_MINUTE = 6000
+GROQ_MAX_CONCURRENCY = 4        # async calls in flight at once
+GROQ_MAX_RETRIES = 4            # retries on 429 / transient errors (jittered exponential backoff)
+SENTIMENT_BATCH_SIZE = 10         # snippets packed into one prompt by core_nlp.analyze_sentiments_batch
+SENTIMENT_BATCH_MAX_TOKENS = 120  # minimum output budget per batched prompt
+SENTIMENT_BATCH_TOKENS_PER_SNIPPET = 8   # budget per "n: Label" line (~6 tokens), so large batches aren't cut off
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600   # cached Groq answers expire after 30 days (llm_cache.db)
+LLM_CACHE_MAX_ENTRIES = 100_000          # least recently used entries beyond this are evicted
 EVENT_IMPACT_MULTIPLIERS = {
     "Merger or Acquisition": 1.5, 
     "Earnings Report": 1.4, 
     "Legal or Regulatory Issue": 1.3
 }
 COMPETITIVE_KEYWORDS = {'beats', 'wins', 'outperforms', 'loses to', 'rival'}
+# Competitor lookups for the graph rule come from sector_index.SectorIndex (in memory).
+# "table": stocks table, then nse_stocks_enriched.csv; "graph": Neo4j IN_SECTOR edges first
+SECTOR_INDEX_SOURCE = "table"
+SECTOR_INDEX_RELOAD_SECONDS = 6 * 3600
 
 # --- BACKTESTER CONFIG ---
 TRANSACTION_COST_PERCENT = 0.2
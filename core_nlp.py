@@ -1,9 +1,20 @@
 # core_nlp.py
 import os
+import re
+import json
+import time
+import random
+import asyncio
 import logging
+import threading
 from dotenv import load_dotenv
 from groq import Groq
-from config import GROQ_MODEL
+from config import GROQ_MODEL, SENTIMENT_BACKEND, SENTIMENT_BATCH_SIZE, SENTIMENT_BATCH_MAX_TOKENS
+from config import SENTIMENT_BATCH_TOKENS_PER_SNIPPET
+from config import EVENT_KEYWORDS, CASCADE_UNCERTAINTY_BAND, CASCADE_AUDIT_RATE
+from llm_cache import LLMCache, cache_key
+from llm_client import AsyncLLMClient, LLMUnavailableError, run_sync
+from sentiment_backends import SentimentBackend, LocalSentimentBackend
 
 load_dotenv()
 try:
@@ -14,32 +25,474 @@ except Exception as e:
     logging.error(f"Core NLP: Failed to initialize Groq client: {e}")
     client = None
 
-def analyze_sentiment_core(text: str) -> dict:
-    if not client or not text: return {"sentiment": "Neutral", "confidence": 0.5}
+# Shared async client; its token buckets persist across batches
+async_client = AsyncLLMClient()
+
+# Bump a task's prompt version whenever its prompt or response parsing changes,
+# so the disk cache stops serving answers produced by the old prompt
+SENTIMENT_PROMPT_VERSION = "1"
+EVENT_PROMPT_VERSION = "1"
+ARTICLE_PROMPT_VERSION = "2"
+
+EVENT_TYPES = [
+    "Earnings Report", "Merger or Acquisition", "Analyst Update", "Product Launch",
+    "Legal or Regulatory Issue", "Partnership", "Executive Change", "General News",
+]
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+
+try:
+    llm_cache = LLMCache()
+except Exception as e:
+    logging.error(f"Core NLP: LLM cache unavailable, every call will hit Groq: {e}")
+    llm_cache = None
+
+def _cached(task: str, prompt_version: str, text: str, compute):
+    """Returns the cached result for (task, model, prompt version, text), else computes and stores it.
+    `compute` raises on failure, so errors are never cached."""
+    key = cache_key(task, GROQ_MODEL, prompt_version, text)
+    if llm_cache is not None:
+        hit = llm_cache.get(key)
+        if hit is not None:
+            return hit
+    result = compute()
+    if llm_cache is not None:
+        llm_cache.set(key, task, result)
+    return result
+
+# --- Prompts: each task builds its request and parses the reply the same way for
+# the sync client below and the async client (llm_client.AsyncLLMClient) ---
+
+def _sentiment_request(snippet: str) -> dict:
     system_prompt = "You are a financial sentiment analysis expert. Respond with only a single word: Positive, Negative, or Neutral."
-    try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": text[:1500]}],
-            model=GROQ_MODEL, temperature=0.0, max_tokens=10,
-        )
-        response_text = chat_completion.choices[0].message.content.strip().capitalize()
-        if "Positive" in response_text: sentiment = "Positive"
-        elif "Negative" in response_text: sentiment = "Negative"
-        else: sentiment = "Neutral"
-        return {"sentiment": sentiment, "confidence": 0.9}
-    except Exception as e:
-        logging.error(f"Core sentiment analysis failed: {e}"); return {"sentiment": "Neutral", "confidence": 0.5}
+    return {"messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": snippet}],
+            "max_tokens": 10}
+
+def _parse_sentiment(response_text: str) -> dict:
+    response_text = response_text.strip().capitalize()
+    if "Positive" in response_text: sentiment = "Positive"
+    elif "Negative" in response_text: sentiment = "Negative"
+    else: sentiment = "Neutral"
+    return {"sentiment": sentiment, "confidence": 0.9}
+
+def _event_request(text: str) -> dict:
+    candidate_labels = ", ".join(EVENT_TYPES[:-1]) + f", or {EVENT_TYPES[-1]}"
+    system_prompt = f"Classify the headline into one of these categories: {candidate_labels}. Respond with only the category name."
+    return {"messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": f"'{text}'"}],
+            "max_tokens": 20}
+
+def _parse_event(response_text: str) -> str:
+    return response_text.strip()
+
+def _article_request(payload: str, tickers: list) -> dict:
+    system_prompt = (
+        "You are a financial news analyst. You get a JSON object with a headline and, for each company "
+        "ticker, the text that mentions it. Respond with only a JSON object of the form "
+        '{"event_type": <category>, "sentiments": {<ticker>: <sentiment>, ...}} where <category> is one of: '
+        f"{', '.join(EVENT_TYPES)}; and <sentiment> is Positive, Negative, or Neutral for that company. "
+        "Include every ticker you were given and no others."
+    )
+    return {"messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": payload}],
+            "max_tokens": 40 + 15 * len(tickers), "response_format": {"type": "json_object"}}
+
+def _article_payload(title: str, snippets: dict) -> str:
+    return json.dumps({"headline": title, "companies": snippets}, sort_keys=True)
+
+def _sentiment_batch_request(snippets: list, max_tokens: int) -> dict:
+    system_prompt = (
+        "You are a financial sentiment analysis expert. You get numbered news snippets. For each snippet, "
+        "respond with one line of the form '<number>: <label>' where <label> is Positive, Negative, or Neutral. "
+        "Give exactly one line per snippet, in order, and nothing else."
+    )
+    numbered = "\n\n".join(f"{i}: {snippet}" for i, snippet in enumerate(snippets, start=1))
+    return {"messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": numbered}],
+            "max_tokens": max_tokens}
+
+_batch_line = re.compile(r'^\s*(\d+)\s*[:.)\-]\s*([A-Za-z]+)\W*$')
+
+def _parse_sentiment_batch(response_text: str, count: int) -> list:
+    """Strict parse of a batched reply: exactly one valid label for each of 1..count, else ValueError."""
+    labels = {label.lower(): label for label in SENTIMENTS}
+    found = {}
+    for line in (response_text or "").splitlines():
+        if not line.strip():
+            continue
+        match = _batch_line.match(line)
+        if not match:
+            raise ValueError(f"unparseable line {line!r}")
+        number, label = int(match.group(1)), labels.get(match.group(2).lower())
+        if label is None or number in found or not 1 <= number <= count:
+            raise ValueError(f"invalid line {line!r}")
+        found[number] = label
+    if len(found) != count:
+        raise ValueError(f"expected {count} labels, got {len(found)}")
+    return [{"sentiment": found[i], "confidence": 0.9} for i in range(1, count + 1)]
+
+def _complete(request: dict) -> str:
+    chat_completion = client.chat.completions.create(model=GROQ_MODEL, temperature=0.0, **request)
+    return chat_completion.choices[0].message.content
+
+# --- Synchronous API (falls back along the backend chain, then to Neutral / General News) ---
+
+class GroqSentimentBackend(SentimentBackend):
+    name = "groq"
+
+    def available(self) -> bool:
+        return client is not None
+
+    def analyze(self, text: str) -> dict:
+        snippet = text[:1500]
+        result = _cached("sentiment", SENTIMENT_PROMPT_VERSION, snippet,
+                         lambda: _parse_sentiment(_complete(_sentiment_request(snippet))))
+        return dict(result, backend=self.name)
+
+# Backends analyze_sentiment_core can dispatch to, by name (see config.SENTIMENT_BACKEND)
+SENTIMENT_BACKENDS = {backend.name: backend for backend in (GroqSentimentBackend(), LocalSentimentBackend())}
+
+def register_sentiment_backend(backend: SentimentBackend):
+    SENTIMENT_BACKENDS[backend.name] = backend
+
+def _sentiment_chain() -> list:
+    """Backends to try in order: "auto" is Groq with the local backend behind it."""
+    names = ["groq", "local"] if SENTIMENT_BACKEND == "auto" else [SENTIMENT_BACKEND]
+    return [SENTIMENT_BACKENDS[n] for n in names if n in SENTIMENT_BACKENDS and SENTIMENT_BACKENDS[n].available()]
+
+def analyze_sentiment_core(text: str) -> dict:
+    if not text: return {"sentiment": "Neutral", "confidence": 0.5}
+    for backend in _sentiment_chain():
+        try:
+            return backend.analyze(text)
+        except Exception as e:
+            logging.error(f"Core sentiment analysis failed on the {backend.name} backend: {e}")
+    return {"sentiment": "Neutral", "confidence": 0.5}
 
 def classify_event_type_core(text: str) -> str:
     if not client: return "General News"
-    candidate_labels = "Earnings Report, Merger or Acquisition, Analyst Update, Product Launch, Legal or Regulatory Issue, Partnership, Executive Change, or General News"
-    system_prompt = f"Classify the headline into one of these categories: {candidate_labels}. Respond with only the category name."
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": f"'{text}'"}],
-            model=GROQ_MODEL, temperature=0.0, max_tokens=20,
-        )
-        return chat_completion.choices[0].message.content.strip()
+        return _cached("event_type", EVENT_PROMPT_VERSION, text,
+                       lambda: _parse_event(_complete(_event_request(text))))
     except Exception as e:
         logging.error(f"Core event classification failed: {e}"); return "General News"
-    
\ No newline at end of file
+
+def analyze_article_core(title: str, snippets: dict) -> dict:
+    """
+    Event type of the headline plus a sentiment for every ticker in one Groq call.
+    `snippets` maps each ticker to the text about it (e.g. the sentences mentioning it).
+    Returns {'event_type': str, 'sentiments': {ticker: {'sentiment', 'confidence'}}}.
+    If the combined call fails or its JSON doesn't match the expected shape exactly,
+    falls back to classify_event_type_core + one analyze_sentiment_core call per ticker.
+    """
+    snippets = {ticker: text[:1500] for ticker, text in snippets.items()}
+    if client and title:
+        payload = _article_payload(title, snippets)
+        try:
+            return _cached("article", ARTICLE_PROMPT_VERSION, payload,
+                           lambda: _parse_article_analysis(_complete(_article_request(payload, list(snippets))), list(snippets)))
+        except Exception as e:
+            logging.warning(f"Combined article analysis failed, falling back to per-call analysis: {e}")
+    return {
+        "event_type": classify_event_type_core(title),
+        "sentiments": {ticker: analyze_sentiment_core(text) for ticker, text in snippets.items()},
+    }
+
+def classify_event_type_local(title: str) -> str:
+    """Keyword-rule event type for a headline (config.EVENT_KEYWORDS); General News if nothing matches."""
+    for event_type, pattern in _event_patterns:
+        if pattern.search(title or ""):
+            return event_type
+    return "General News"
+
+_event_patterns = [(event_type, re.compile(r'\b(?:' + '|'.join(keywords) + r')\b', re.I))
+                   for event_type, keywords in EVENT_KEYWORDS.items()]
+
+def analyze_article_offline(title: str, snippets: dict) -> dict:
+    """analyze_article_core without any API call: local sentiment per ticker, keyword-rule event type."""
+    local = SENTIMENT_BACKENDS["local"]
+    return {"event_type": classify_event_type_local(title),
+            "sentiments": {ticker: local.analyze(text) for ticker, text in snippets.items()}}
+
+# --- Async API: rate-limited and coalesced; raises LLMUnavailableError instead of degrading ---
+
+async def _cached_async(task: str, prompt_version: str, text: str, compute):
+    key = cache_key(task, GROQ_MODEL, prompt_version, text)
+    if llm_cache is not None:
+        hit = llm_cache.get(key)
+        if hit is not None:
+            return hit
+    result = await compute()
+    if llm_cache is not None:
+        llm_cache.set(key, task, result)
+    return result
+
+async def analyze_sentiment_async(text: str) -> dict:
+    if not text: return {"sentiment": "Neutral", "confidence": 0.5}
+    snippet = text[:1500]
+
+    async def compute():
+        return _parse_sentiment(await async_client.complete(**_sentiment_request(snippet)))
+    return dict(await _cached_async("sentiment", SENTIMENT_PROMPT_VERSION, snippet, compute), backend="groq")
+
+async def classify_event_type_async(text: str) -> str:
+    async def compute():
+        return _parse_event(await async_client.complete(**_event_request(text)))
+    return await _cached_async("event_type", EVENT_PROMPT_VERSION, text, compute)
+
+def _fallback_sentiment(text: str) -> dict:
+    """What analyze_sentiment_core answers once Groq has failed: the next backend in the chain, else Neutral."""
+    for backend in _sentiment_chain():
+        if backend.name == "groq":
+            continue
+        try:
+            return backend.analyze(text)
+        except Exception as e:
+            logging.error(f"Core sentiment analysis failed on the {backend.name} backend: {e}")
+    return {"sentiment": "Neutral", "confidence": 0.5}
+
+async def _or_default(coro, default, what: str):
+    """Awaits `coro`; any failure but LLMUnavailableError gives `default()`, as the sync API does."""
+    try:
+        return await coro
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        logging.error(f"{what} failed: {e}")
+        return default()
+
+async def analyze_article_async(title: str, snippets: dict) -> dict:
+    """Async analyze_article_core. Like the sync path, a failed combined call (malformed
+    JSON, a rejected request) falls back to per-call analysis, and a failed per-call
+    request to the rest of the backend chain (the local backend in "auto" mode, else
+    Neutral) / General News; only rate limiting / unavailability raises
+    LLMUnavailableError."""
+    snippets = {ticker: text[:1500] for ticker, text in snippets.items()}
+    payload = _article_payload(title, snippets)
+
+    async def compute():
+        reply = await async_client.complete(**_article_request(payload, list(snippets)))
+        return _parse_article_analysis(reply, list(snippets))
+    try:
+        return await _cached_async("article", ARTICLE_PROMPT_VERSION, payload, compute)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        logging.warning(f"Combined article analysis failed, falling back to per-call analysis: {e}")
+
+    tickers = list(snippets)
+    event_type, *sentiments = await asyncio.gather(
+        _or_default(classify_event_type_async(title), lambda: "General News", "Event classification"),
+        *(_or_default(analyze_sentiment_async(snippets[t]), lambda t=t: _fallback_sentiment(snippets[t]),
+                      "Sentiment analysis") for t in tickers)
+    )
+    return {"event_type": event_type, "sentiments": dict(zip(tickers, sentiments))}
+
+async def analyze_sentiments_batch_async(texts: list, batch_size: int = SENTIMENT_BATCH_SIZE,
+                                        max_tokens: int = SENTIMENT_BATCH_MAX_TOKENS) -> list:
+    """
+    One sentiment result per text, in order. Texts not already in the cache are packed
+    `batch_size` to a prompt; if a batched reply doesn't contain exactly one valid label
+    per snippet, that batch is retried one snippet at a time. `max_tokens` is a floor:
+    each prompt gets SENTIMENT_BATCH_TOKENS_PER_SNIPPET per snippet if that is more.
+    """
+    results = [None] * len(texts)
+    misses = []   # (index, snippet, cache key)
+    for i, text in enumerate(texts):
+        if not text:
+            results[i] = {"sentiment": "Neutral", "confidence": 0.5}
+            continue
+        snippet = text[:1500]
+        # Same key as single-snippet calls: it is the same question about the same text
+        key = cache_key("sentiment", GROQ_MODEL, SENTIMENT_PROMPT_VERSION, snippet)
+        hit = llm_cache.get(key) if llm_cache is not None else None
+        if hit is not None:
+            results[i] = hit
+        else:
+            misses.append((i, snippet, key))
+
+    async def run_batch(batch):
+        snippets = [snippet for _, snippet, _ in batch]
+        try:
+            budget = max(max_tokens, SENTIMENT_BATCH_TOKENS_PER_SNIPPET * len(snippets))
+            reply = await async_client.complete(**_sentiment_batch_request(snippets, budget))
+            labels = _parse_sentiment_batch(reply, len(snippets))
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            logging.warning(f"Batched sentiment call failed, retrying {len(snippets)} snippets one by one: {e}")
+            labels = await asyncio.gather(*(
+                _or_default(analyze_sentiment_async(snippet), lambda s=snippet: _fallback_sentiment(s),
+                            "Sentiment analysis") for snippet in snippets))
+            for (i, _, _), label in zip(batch, labels):
+                results[i] = label
+            return
+        for (i, _, key), label in zip(batch, labels):
+            results[i] = label
+            if llm_cache is not None:
+                llm_cache.set(key, "sentiment", label)
+
+    batches = [misses[start:start + batch_size] for start in range(0, len(misses), batch_size)]
+    await asyncio.gather(*(run_batch(batch) for batch in batches))
+    return results
+
+def analyze_sentiments_batch(texts: list, batch_size: int = SENTIMENT_BATCH_SIZE,
+                             max_tokens: int = SENTIMENT_BATCH_MAX_TOKENS) -> list:
+    """Blocking wrapper around analyze_sentiments_batch_async, for backfills and scripts.
+    Raises LLMUnavailableError if the API stays rate limited / unavailable."""
+    return run_sync(analyze_sentiments_batch_async(texts, batch_size, max_tokens)) if texts else []
+
+def analyze_articles_concurrently(requests: list) -> list:
+    """
+    Runs analyze_article_async for every (title, snippets) pair concurrently, within the
+    client's rate limits, and returns the results in order. What happens to a request the
+    LLM cannot complete depends on config.SENTIMENT_BACKEND:
+      "groq"  — its LLMUnavailableError is returned in its place;
+      "auto"  — it is answered by analyze_article_offline (logged, marked backend='local');
+      "local" — no API calls at all, every request is answered offline.
+    Without a Groq client (no GROQ_API_KEY) nothing is sent: "auto" answers every
+    request offline and "groq" reports each one as unavailable.
+    """
+    if SENTIMENT_BACKEND == "local" or (client is None and SENTIMENT_BACKEND == "auto"):
+        return [analyze_article_offline(title, snippets) for title, snippets in requests]
+    if client is None:
+        return [LLMUnavailableError("Groq client not configured (GROQ_API_KEY missing)") for _ in requests]
+    async def run_all():
+        return await asyncio.gather(
+            *(analyze_article_async(title, snippets) for title, snippets in requests), return_exceptions=True
+        )
+    results = run_sync(run_all()) if requests else []
+    for i, r in enumerate(results):
+        if isinstance(r, Exception) and not isinstance(r, LLMUnavailableError):
+            raise r
+        if isinstance(r, LLMUnavailableError) and SENTIMENT_BACKEND == "auto":
+            logging.warning(f"LLM unavailable, using the local sentiment backend for \"{requests[i][0]}\": {r}")
+            results[i] = analyze_article_offline(*requests[i])
+    return results
+
+def _parse_article_analysis(response_text: str, tickers: list) -> dict:
+    """Strict parse of the combined response; raises ValueError on any deviation from the schema."""
+    try:
+        data = json.loads(response_text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"response is not JSON: {e}")
+    if not isinstance(data, dict) or set(data) != {"event_type", "sentiments"}:
+        raise ValueError(f"unexpected response keys: {response_text!r}")
+
+    event_type = data["event_type"]
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"unknown event type {event_type!r}")
+
+    sentiments = data["sentiments"]
+    if not isinstance(sentiments, dict) or set(sentiments) != set(tickers):
+        raise ValueError(f"sentiments do not cover exactly {sorted(tickers)}: {sentiments!r}")
+    labels = {label.lower(): label for label in SENTIMENTS}
+    results = {}
+    for ticker, value in sentiments.items():
+        label = labels.get(value.strip().lower()) if isinstance(value, str) else None
+        if label is None:
+            raise ValueError(f"invalid sentiment {value!r} for {ticker}")
+        results[ticker] = {"sentiment": label, "confidence": 0.9, "backend": "groq"}
+    return {"event_type": event_type, "sentiments": results}
+
+
+# --- Two-tier cascade: local scoring first, Groq only for uncertain snippets ---
+
+class CascadeStats:
+    """Running counters for the cascade, including agreement between tiers on audited articles."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.snippets = self.decided_local = self.escalated = self.escalation_failures = 0
+        self.articles = self.llm_calls = 0
+        self.audited = self.audit_agreements = 0
+
+    def record(self, **counts):
+        with self._lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    @property
+    def agreement_rate(self):
+        """Share of audited snippets where the local label matched the LLM's (None before any audit)."""
+        return self.audit_agreements / self.audited if self.audited else None
+
+    def summary(self) -> str:
+        rate = f"{self.agreement_rate:.0%}" if self.agreement_rate is not None else "n/a"
+        return (f"cascade: {self.articles} articles, {self.llm_calls} LLM calls; "
+                f"{self.decided_local}/{self.snippets} snippets decided locally, {self.escalated} escalated "
+                f"({self.escalation_failures} failed); audit agreement {rate} over {self.audited} snippets")
+
+cascade_stats = CascadeStats()
+
+def _timed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+def cascade_analyze_articles(requests: list, band: tuple = CASCADE_UNCERTAINTY_BAND,
+                             audit_rate: float = CASCADE_AUDIT_RATE) -> list:
+    """
+    Same input/output as analyze_articles_concurrently, but every snippet is scored by the
+    local backend first and only those whose raw score falls inside `band` (the local
+    tier's uncertainty zone) are escalated to Groq. An article with nothing to escalate
+    makes no API call at all; its event type comes from classify_event_type_local.
+
+    A random `audit_rate` share of fully-local articles is sent to Groq anyway and the
+    labels compared, so cascade_stats.agreement_rate tracks what skipping the LLM costs.
+
+    Nothing is escalated or audited when SENTIMENT_BACKEND is "local" or there is no Groq
+    client: every snippet keeps its local answer. An escalated snippet Groq itself could
+    not answer (its per-call fallback) keeps its local answer too.
+
+    Each sentiment records the tier that decided it ('tier': 'local' | 'llm') and each
+    result carries 'decided_by' and 'timings' ({'local_ms', 'llm_ms'}).
+    """
+    local = SENTIMENT_BACKENDS["local"]
+    low, high = band
+    can_escalate = SENTIMENT_BACKEND != "local" and client is not None
+    results, escalations = [], []   # escalations: (result index, snippets to send, is_audit)
+
+    for i, (title, snippets) in enumerate(requests):
+        start = time.perf_counter()
+        sentiments = {ticker: dict(local.analyze(text), tier="local") for ticker, text in snippets.items()}
+        local_ms = _timed_ms(start)
+        uncertain = {t: snippets[t] for t, r in sentiments.items()
+                     if can_escalate and low <= r['raw_score'] <= high}
+        audit = can_escalate and bool(snippets) and not uncertain and random.random() < audit_rate
+
+        results.append({"event_type": classify_event_type_local(title), "sentiments": sentiments,
+                        "decided_by": "local", "timings": {"local_ms": local_ms, "llm_ms": 0.0}})
+        if uncertain or audit:
+            escalations.append((i, snippets if audit else uncertain, audit))
+        cascade_stats.record(articles=1, snippets=len(snippets), decided_local=len(snippets) - len(uncertain),
+                             escalated=len(uncertain))
+
+    async def timed(title, snippets):
+        start = time.perf_counter()
+        try:
+            return await analyze_article_async(title, snippets), _timed_ms(start)
+        except LLMUnavailableError as e:
+            return e, _timed_ms(start)
+
+    async def run_all():
+        return await asyncio.gather(*(timed(requests[i][0], snippets) for i, snippets, _ in escalations))
+
+    for (i, sent, audit), (llm_result, llm_ms) in zip(escalations, run_sync(run_all()) if escalations else []):
+        result = results[i]
+        result["timings"]["llm_ms"] = llm_ms
+        cascade_stats.record(llm_calls=1)
+        if isinstance(llm_result, LLMUnavailableError):
+            # Uncertain snippets keep their local answer rather than dropping the article
+            logging.warning(f"Cascade escalation failed for \"{requests[i][0]}\", keeping local results: {llm_result}")
+            cascade_stats.record(escalation_failures=0 if audit else len(sent))
+            continue
+
+        answered = {t: r for t, r in llm_result["sentiments"].items() if r.get("backend") == "groq"}
+        if audit:
+            agreements = sum(result["sentiments"][t]["sentiment"] == r["sentiment"] for t, r in answered.items())
+            cascade_stats.record(audited=len(answered), audit_agreements=agreements)
+        else:
+            cascade_stats.record(escalation_failures=len(sent) - len(answered))
+        for ticker, llm_sentiment in answered.items():
+            result["sentiments"][ticker] = dict(llm_sentiment, tier="llm")
+        result["event_type"] = llm_result["event_type"]
+        tiers = {r["tier"] for r in result["sentiments"].values()}
+        result["decided_by"] = "llm" if tiers == {"llm"} else "mixed"
+    return results
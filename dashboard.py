@@ -3,16 +3,16 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import sqlite3
 import logging
 import json
 from datetime import datetime
 
 # ── Local imports ──────────────────────────────────────────────────────────────
-from database import get_historical_sentiment, initialize_db
+from database import HISTORY_COLUMNS
+from storage import get_store
 from stock_data import StockDataFetcher
 from advanced_analysis import AdvancedSentimentAnalyzer, TradingSignalGenerator
-from config import FEEDS_TO_PROCESS
+from config import FEEDS_TO_PROCESS, DASHBOARD_HISTORY_DAYS, DASHBOARD_CHANGE_CHECK_SECONDS
 
 # ── App-level setup ────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -36,6 +36,7 @@ def get_analyzers():
 for key, default in {
     "active_company": None,   # dict: {name, ticker, fig}
     "last_refresh": datetime.now().strftime("%H:%M:%S"),
+    "insights_version": None, # storage change version the insight caches were last read at
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
@@ -294,20 +295,71 @@ def apply_theme(fig, height=300, margin=None):
     return fig
 
 
-@st.cache_data(ttl=60)
-def load_insights(limit=60):
+# Insight loaders are keyed on the storage change version (see watch_insight_changes), so
+# they re-query only after new insights are written; the long TTL is just a backstop.
+INSIGHT_CACHE_TTL = 3600
+
+
+@st.cache_data(ttl=INSIGHT_CACHE_TTL)
+def load_insights(limit=60, version=None):
+    """The latest insights across all tickers, from the configured storage backend."""
     try:
-        conn = sqlite3.connect("insights.db")
-        df = pd.read_sql_query(
-            "SELECT * FROM insights ORDER BY timestamp DESC LIMIT ?", conn, params=(limit,)
-        )
-        conn.close()
+        df, _ = get_store().query_insights(columns=None, limit=limit)
+        # query_insights hands back categoricals; the cards and charts want plain text columns
+        # (fillna with a new label, value_counts without zero-count categories)
+        for column in df.select_dtypes("category"):
+            df[column] = df[column].astype(object)
         return df
     except Exception as e:
         logging.error(f"DB read error: {e}")
         return pd.DataFrame()
 
 
+@st.cache_data(ttl=INSIGHT_CACHE_TTL)
+def load_latest_sentiment(ticker, version=None):
+    """The ticker's most recent insight (timestamp, sentiment, confidence) for the trading signal."""
+    try:
+        df, _ = get_store().query_insights(ticker, columns=HISTORY_COLUMNS, limit=1)
+        return df
+    except Exception as e:
+        logging.error(f"DB read error: {e}")
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+
+@st.cache_data(ttl=INSIGHT_CACHE_TTL)
+def load_sentiment_rollup(ticker, version=None):
+    """Daily sentiment buckets for the drilldown chart — a few rows per day, not every insight."""
+    since = (pd.Timestamp.now(tz="Asia/Kolkata") - pd.Timedelta(days=DASHBOARD_HISTORY_DAYS)).date()
+    try:
+        return get_store().query_sentiment_rollup(ticker, since=since)
+    except Exception as e:
+        logging.error(f"DB read error: {e}")
+        return pd.DataFrame()
+
+
+# st.fragment graduated from st.experimental_fragment in Streamlit 1.37
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+
+@_fragment(run_every=DASHBOARD_CHANGE_CHECK_SECONDS)
+def watch_insight_changes():
+    """
+    Checks the store's change version every DASHBOARD_CHANGE_CHECK_SECONDS and reruns the
+    page when it moved. On PostgreSQL the version is an in-memory counter fed by NOTIFY,
+    so idle sessions never query the database.
+    """
+    try:
+        version = get_store().change_version()
+    except Exception as e:
+        logging.error(f"Insight change check failed: {e}")
+        return
+    previous = st.session_state.insights_version
+    st.session_state.insights_version = version
+    if previous is not None and version != previous:
+        st.session_state.last_refresh = datetime.now().strftime("%H:%M:%S")
+        st.rerun()
+
+
 @st.cache_data(ttl=300)
 def fetch_stock_price(ticker):
     return get_stock_fetcher().get_stock_price(ticker)
@@ -320,12 +372,11 @@ def fetch_technicals(ticker):
 
 # ── Chart builders ─────────────────────────────────────────────────────────────
 
-def build_sentiment_history_chart(df, company_name):
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["timestamp"]).dt.date
-    counts = df.groupby(["date", "sentiment"]).size().reset_index(name="count")
+def build_sentiment_history_chart(rollup_df, company_name):
+    # Rollup rows are per (day, sentiment, event_type); the chart sums over event types
+    counts = rollup_df.groupby(["day", "sentiment"], observed=True)["count"].sum().reset_index()
     fig = px.bar(
-        counts, x="date", y="count", color="sentiment",
+        counts, x="day", y="count", color="sentiment",
         title=f"Sentiment Timeline — {company_name}",
         color_discrete_map={k: SENTIMENT_COLOR[k] for k in SENTIMENT_COLOR},
         barmode="group",
@@ -467,7 +518,7 @@ def render_insight_card(data):
     kf_json = data.get("key_figures")
     if kf_json and kf_json != "null":
         try:
-            kf = json.loads(kf_json)
+            kf = kf_json if isinstance(kf_json, dict) else json.loads(kf_json)
             priority = [("profit_change_percent", "Profit Δ"), ("revenue_change_percent", "Revenue Δ"),
                         ("profit_amount", "Profit"), ("revenue_amount", "Revenue"),
                         ("deal_size", "Deal Size")]
@@ -606,9 +657,9 @@ def render_company_drilldown(company_name, ticker):
 
     with left:
         # Sentiment history chart
-        df_hist = get_historical_sentiment(ticker)
-        if not df_hist.empty:
-            st.plotly_chart(build_sentiment_history_chart(df_hist, company_name),
+        rollup_df = load_sentiment_rollup(ticker, st.session_state.insights_version)
+        if not rollup_df.empty:
+            st.plotly_chart(build_sentiment_history_chart(rollup_df, company_name),
                             use_container_width=True)
         else:
             st.info("No historical sentiment data available.")
@@ -625,8 +676,7 @@ def render_company_drilldown(company_name, ticker):
         render_live_price(ticker, company_name)
         st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
 
-        df_hist = get_historical_sentiment(ticker)
-        render_trading_signal(ticker, df_hist)
+        render_trading_signal(ticker, load_latest_sentiment(ticker, st.session_state.insights_version))
 
     if st.button("⬅ Back to Latest Insights"):
         st.session_state.active_company = None
@@ -645,7 +695,9 @@ def render_sidebar():
         )
         st.caption(f"Last refreshed: {st.session_state.last_refresh}")
         if st.button("🔄 Refresh Data", use_container_width=True):
-            st.cache_data.clear()
+            # Insights only: prices and technicals keep their own TTLs
+            for loader in (load_insights, load_latest_sentiment, load_sentiment_rollup):
+                loader.clear()
             st.session_state.last_refresh = datetime.now().strftime("%H:%M:%S")
             st.rerun()
 
@@ -720,9 +772,10 @@ def main():
     st.markdown("<div style='margin:12px 0 4px'></div>", unsafe_allow_html=True)
 
     render_sidebar()
+    watch_insight_changes()
 
     # ── Load data ──
-    df = load_insights(limit=60)
+    df = load_insights(limit=60, version=st.session_state.insights_version)
     if df.empty:
         st.info("👋 No insights yet. The background worker may still be collecting data.")
         return
@@ -773,5 +826,5 @@ def main():
 
 
 if __name__ == "__main__":
-    initialize_db()
+    get_store().initialize()
     main()
\ No newline at end of file
@@ -8,11 +8,23 @@
 # insights.db is listed in .gitignore and should not be committed.
 #
 import os
+import re
+import time
+import select
 import logging
+import json
+import threading
+from collections import deque
 import pandas as pd
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import pool
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
+from config import (DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS, DB_POOL_TIMEOUT_SECONDS,
+                    DB_POOL_HEALTHCHECK_SECONDS, DB_POOL_RETRY_SECONDS, INSIGHT_BATCH_SIZE, INSIGHT_FLUSH_SECONDS, INSIGHT_WRITE_RETRIES, HISTORY_PAGE_SIZE,
+                    INSIGHTS_HOT_MONTHS, INSIGHTS_PARTITION_MONTHS_AHEAD, INSIGHTS_ARCHIVE_DIR,
+                    INSIGHTS_NOTIFY_CHANNEL)
 
 # --- Configuration ---
 load_dotenv()
@@ -24,51 +36,724 @@ DB_NAME = os.getenv("DB_NAME")
 
 # --- Connection Pooling: The Professional Standard ---
 # This creates a pool of reusable connections, which is far more efficient
-# than opening a new one for every single query.
-try:
-    connection_pool = psycopg2.pool.SimpleConnectionPool(
-        1, 10, # min/max connections
-        host=DB_HOST, port=DB_PORT, user=DB_USER,
-        password=DB_PASSWORD, dbname=DB_NAME
-    )
-    logging.info("PostgreSQL connection pool created successfully.")
-except Exception as e:
-    logging.error(f"Failed to create PostgreSQL connection pool: {e}")
-    connection_pool = None
+# than opening a new one for every single query. The pool is shared by the worker's
+# pipeline threads and dashboard sessions, so it is a ThreadedConnectionPool that
+# makes callers wait (up to DB_POOL_TIMEOUT_SECONDS) for a free connection instead of
+# failing, re-checks connections that sat idle, and records the metrics in pool_stats().
+
+class PoolMetrics:
+    """Thread-safe counters and recent latencies for the connection pool."""
+
+    WINDOW = 1000   # latencies kept for the percentiles
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=self.WINDOW)
+        self._queries = deque(maxlen=self.WINDOW)
+        self.checkouts = self.exhausted = self.timeouts = self.reconnects = self.queries = 0
+
+    def record_checkout(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self._waits.append(seconds)
+
+    def record_exhausted(self):
+        with self._lock:
+            self.exhausted += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_reconnect(self):
+        with self._lock:
+            self.reconnects += 1
+
+    def record_query(self, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self._queries.append(seconds)
+
+    @staticmethod
+    def _summary(samples, prefix: str) -> dict:
+        ordered = sorted(samples)
+        if not ordered:
+            return {f"{prefix}_avg_ms": 0.0, f"{prefix}_p95_ms": 0.0, f"{prefix}_max_ms": 0.0}
+        return {
+            f"{prefix}_avg_ms": round(1000 * sum(ordered) / len(ordered), 3),
+            f"{prefix}_p95_ms": round(1000 * ordered[int(0.95 * (len(ordered) - 1))], 3),
+            f"{prefix}_max_ms": round(1000 * ordered[-1], 3),
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = {"checkouts": self.checkouts, "exhausted": self.exhausted, "timeouts": self.timeouts,
+                     "reconnects": self.reconnects, "queries": self.queries}
+            stats.update(self._summary(self._waits, "checkout_wait"))
+            stats.update(self._summary(self._queries, "query"))
+        return stats
+
+pool_metrics = PoolMetrics()
+
+class _TimedCursor(psycopg2.extensions.cursor):
+    """Default cursor of pooled connections: records every statement's latency."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            pool_metrics.record_query(time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            pool_metrics.record_query(time.perf_counter() - started)
+
+class HealthCheckedPool(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool that blocks while all `maxconn` connections are checked out
+    (raising PoolError after `timeout` seconds) and replaces closed connections, or ones
+    idle for more than `healthcheck_seconds` that fail a `SELECT 1`, before handing them out.
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout: float = DB_POOL_TIMEOUT_SECONDS,
+                 healthcheck_seconds: float = DB_POOL_HEALTHCHECK_SECONDS, metrics: PoolMetrics = None, **kwargs):
+        self.timeout = timeout
+        self.healthcheck_seconds = healthcheck_seconds
+        self.metrics = metrics or pool_metrics
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._returned_at = {}   # id(conn) -> monotonic time it was last put back
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        started = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            self.metrics.record_exhausted()
+            if not self._slots.acquire(timeout=self.timeout):
+                self.metrics.record_timeout()
+                raise pool.PoolError(f"No database connection free after {self.timeout:.0f}s "
+                                     f"({self.maxconn} in use).")
+        try:
+            conn = self._healthy(super().getconn(key), key)
+        except Exception:
+            self._slots.release()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return conn
+
+    def putconn(self, conn, key=None, close=False):
+        super().putconn(conn, key, close)
+        self._slots.release()
+
+    def _putconn(self, conn, key=None, close=False):
+        # Runs under the pool lock. Only a connection that actually went back into the idle
+        # list is timestamped: psycopg2 closes the ones above minconn, and their entries
+        # would otherwise pile up (and a recycled id() could inherit a stale time)
+        self._returned_at.pop(id(conn), None)
+        super()._putconn(conn, key, close)
+        if any(idle is conn for idle in self._pool):
+            self._returned_at[id(conn)] = time.monotonic()
+
+    def _healthy(self, conn, key):
+        returned_at = self._returned_at.pop(id(conn), None)
+        if not conn.closed and (returned_at is None or time.monotonic() - returned_at <= self.healthcheck_seconds):
+            return conn
+        if not conn.closed:
+            try:
+                # A plain cursor: health checks are not query latency
+                with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                logging.warning(f"Discarding stale pooled connection: {e}")
+        self.metrics.record_reconnect()
+        super().putconn(conn, key, close=True)
+        return super().getconn(key)
+
+def _create_pool():
+    try:
+        created = HealthCheckedPool(
+            DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS,
+            host=DB_HOST, port=DB_PORT, user=DB_USER,
+            password=DB_PASSWORD, dbname=DB_NAME, cursor_factory=_TimedCursor
+        )
+        logging.info("PostgreSQL connection pool created successfully.")
+        return created
+    except Exception as e:
+        logging.error(f"Failed to create PostgreSQL connection pool: {e}")
+        return None
+
+connection_pool = _create_pool()
+_pool_lock = threading.Lock()
+_pool_retry_at = time.monotonic() + DB_POOL_RETRY_SECONDS
+
+def _require_pool():
+    """
+    The connection pool, re-created (at most every DB_POOL_RETRY_SECONDS) if it could not
+    be opened. Raises psycopg2.OperationalError while the database stays unreachable, the
+    same connection-level error InsightWriter retries, so writes fail instead of being skipped.
+    """
+    global connection_pool, _pool_retry_at
+    with _pool_lock:
+        if connection_pool is None and time.monotonic() >= _pool_retry_at:
+            connection_pool = _create_pool()
+            _pool_retry_at = time.monotonic() + DB_POOL_RETRY_SECONDS
+    if connection_pool is None:
+        raise psycopg2.OperationalError("Database connection pool is not available.")
+    return connection_pool
+
+def pool_stats() -> dict:
+    """Pool size and usage plus pool_metrics.snapshot(): checkout waits, exhaustion and query latency."""
+    stats = pool_metrics.snapshot()
+    if isinstance(connection_pool, pool.AbstractConnectionPool):
+        stats.update(max_connections=connection_pool.maxconn, in_use=len(connection_pool._used),
+                     idle=len(connection_pool._pool))
+    return stats
 
 def get_db_connection():
-    """Gets a connection from the pool."""
-    if connection_pool:
-        return connection_pool.getconn()
-    raise ConnectionError("Database connection pool is not available.")
+    """Gets a connection from the pool (waits for one if they are all in use)."""
+    return _require_pool().getconn()
 
-def release_db_connection(conn):
-    """Returns a connection to the pool."""
+def release_db_connection(conn, close: bool = False):
+    """Returns a connection to the pool (`close=True` discards a broken one)."""
     if connection_pool:
-        connection_pool.putconn(conn)
+        connection_pool.putconn(conn, close=close)
+
+# Recomputes insight_daily_rollup from insights. Days are NSE trading days (IST);
+# the same expression is used by the maintenance trigger in migration 5.
+_ROLLUP_REBUILD_SQL = '''
+    INSERT INTO insight_daily_rollup (ticker, day, sentiment, event_type, n, confidence_sum, impact_sum)
+    SELECT ticker, (timestamp AT TIME ZONE 'Asia/Kolkata')::date, sentiment, COALESCE(event_type, ''),
+           COUNT(*), SUM(confidence), SUM(COALESCE(impact_score, 0))
+    FROM insights
+    GROUP BY 1, 2, 3, 4
+'''
+
+# --- Schema migrations ---
+# Each entry is applied once, in order, in its own transaction, and recorded in
+# schema_migrations. Never edit an applied migration: append a new one instead.
+# Statements use IF NOT EXISTS so databases created before this table existed
+# (tables and keys already in place) migrate cleanly.
+MIGRATIONS = [
+    (1, "create insights table", [
+        # Note the data type changes for PostgreSQL (SERIAL, TIMESTAMPTZ, JSONB)
+        '''
+        CREATE TABLE IF NOT EXISTS insights (
+            id SERIAL PRIMARY KEY, timestamp TIMESTAMPTZ NOT NULL,
+            article_title TEXT NOT NULL, link TEXT, company_name TEXT NOT NULL,
+            ticker TEXT NOT NULL, sentiment TEXT NOT NULL, confidence REAL NOT NULL,
+            event_type TEXT, impact_score REAL, key_figures JSONB
+        )
+        ''',
+    ]),
+    (2, "unique (link, ticker) natural key", [
+        # One row per (article, ticker): re-runs and retries update it instead of adding
+        # duplicates. Rows written before the key existed are de-duplicated first (latest wins).
+        '''
+        DELETE FROM insights a USING insights b
+        WHERE a.link = b.link AND a.ticker = b.ticker AND a.id < b.id
+        ''',
+        "CREATE UNIQUE INDEX IF NOT EXISTS insights_link_ticker_key ON insights (link, ticker)",
+    ]),
+    (3, "query-serving indexes", [
+        # get_historical_sentiment: WHERE ticker = %s ORDER BY timestamp DESC
+        "CREATE INDEX IF NOT EXISTS idx_insights_ticker_timestamp ON insights (ticker, timestamp DESC)",
+        # time-window scans (dashboard, rollups)
+        "CREATE INDEX IF NOT EXISTS idx_insights_timestamp ON insights (timestamp)",
+        # backtester: WHERE sentiment != 'Neutral' AND timestamp < ... — only actionable rows
+        "CREATE INDEX IF NOT EXISTS idx_insights_actionable_timestamp ON insights (timestamp)"
+        " WHERE sentiment <> 'Neutral'",
+        "ANALYZE insights",
+    ]),
+    (4, "keyset pagination index", [
+        # query_insights pages on (timestamp, id) within a ticker; this index serves that
+        # order directly and supersedes the (ticker, timestamp DESC) one
+        "CREATE INDEX IF NOT EXISTS idx_insights_ticker_timestamp_id ON insights (ticker, timestamp DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_insights_ticker_timestamp",
+    ]),
+    (5, "daily sentiment rollup", [
+        # Block writers until the trigger and the backfill are committed together
+        "LOCK TABLE insights IN SHARE MODE",
+        '''
+        CREATE TABLE IF NOT EXISTS insight_daily_rollup (
+            ticker TEXT NOT NULL, day DATE NOT NULL, sentiment TEXT NOT NULL,
+            event_type TEXT NOT NULL DEFAULT '', n INTEGER NOT NULL,
+            confidence_sum DOUBLE PRECISION NOT NULL, impact_sum DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (ticker, day, sentiment, event_type)
+        )
+        ''',
+        # Maintained by a row trigger rather than in InsightWriter, so every write path
+        # (batches, single saves, upserts that change an existing row's sentiment, deletes)
+        # moves exactly one count from the old bucket to the new one
+        '''
+        CREATE OR REPLACE FUNCTION insights_rollup_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE insight_daily_rollup
+                SET n = n - 1, confidence_sum = confidence_sum - OLD.confidence,
+                    impact_sum = impact_sum - COALESCE(OLD.impact_score, 0)
+                WHERE ticker = OLD.ticker AND day = (OLD.timestamp AT TIME ZONE 'Asia/Kolkata')::date
+                  AND sentiment = OLD.sentiment AND event_type = COALESCE(OLD.event_type, '');
+                DELETE FROM insight_daily_rollup
+                WHERE ticker = OLD.ticker AND day = (OLD.timestamp AT TIME ZONE 'Asia/Kolkata')::date
+                  AND sentiment = OLD.sentiment AND event_type = COALESCE(OLD.event_type, '') AND n <= 0;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO insight_daily_rollup AS r
+                    (ticker, day, sentiment, event_type, n, confidence_sum, impact_sum)
+                VALUES (NEW.ticker, (NEW.timestamp AT TIME ZONE 'Asia/Kolkata')::date, NEW.sentiment,
+                        COALESCE(NEW.event_type, ''), 1, NEW.confidence, COALESCE(NEW.impact_score, 0))
+                ON CONFLICT (ticker, day, sentiment, event_type) DO UPDATE
+                SET n = r.n + 1, confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum,
+                    impact_sum = r.impact_sum + EXCLUDED.impact_sum;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        "DROP TRIGGER IF EXISTS insights_rollup ON insights",
+        "CREATE TRIGGER insights_rollup AFTER INSERT OR UPDATE OR DELETE ON insights"
+        " FOR EACH ROW EXECUTE FUNCTION insights_rollup_apply()",
+        "DELETE FROM insight_daily_rollup",
+        _ROLLUP_REBUILD_SQL,
+    ]),
+    (6, "monthly partitions", [
+        # Postgres cannot turn a table into a partitioned one in place: rename it, create
+        # the partitioned table, copy the rows over and drop the old one. Partitions cover
+        # IST calendar months, so whole rollup days always live in the same partition.
+        "LOCK TABLE insights IN ACCESS EXCLUSIVE MODE",
+        "ALTER TABLE insights RENAME TO insights_unpartitioned",
+        "ALTER TABLE insights_unpartitioned RENAME CONSTRAINT insights_pkey TO insights_unpartitioned_pkey",
+        "ALTER SEQUENCE insights_id_seq OWNED BY NONE",
+        # Unique constraints on a partitioned table must include the partition key, so
+        # (link, ticker) can no longer be one; the writer serializes its upserts instead
+        '''
+        CREATE TABLE insights (
+            id INTEGER NOT NULL DEFAULT nextval('insights_id_seq'), timestamp TIMESTAMPTZ NOT NULL,
+            article_title TEXT NOT NULL, link TEXT, company_name TEXT NOT NULL,
+            ticker TEXT NOT NULL, sentiment TEXT NOT NULL, confidence REAL NOT NULL,
+            event_type TEXT, impact_score REAL, key_figures JSONB,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        ''',
+        '''
+        CREATE OR REPLACE FUNCTION insights_ensure_partition(month_start DATE) RETURNS TEXT AS $$
+        DECLARE
+            part TEXT := format('insights_p%s', to_char(month_start, 'YYYY_MM'));
+        BEGIN
+            IF to_regclass(part) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I PARTITION OF insights FOR VALUES FROM (%L) TO (%L)', part,
+                               month_start::text || ' 00:00:00+05:30',
+                               (month_start + INTERVAL '1 month')::date::text || ' 00:00:00+05:30');
+            END IF;
+            RETURN part;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        f'''
+        DO $$
+        DECLARE
+            part_month DATE := date_trunc('month', COALESCE((SELECT MIN(timestamp) FROM insights_unpartitioned), NOW())
+                                              AT TIME ZONE 'Asia/Kolkata')::date;
+        BEGIN
+            WHILE part_month <= (date_trunc('month', NOW() AT TIME ZONE 'Asia/Kolkata')
+                                 + INTERVAL '{int(INSIGHTS_PARTITION_MONTHS_AHEAD)} months')::date LOOP
+                PERFORM insights_ensure_partition(part_month);
+                part_month := (part_month + INTERVAL '1 month')::date;
+            END LOOP;
+        END
+        $$
+        ''',
+        # Copied before the rollup trigger exists on the new table: the rollup already counts these rows
+        '''
+        INSERT INTO insights (id, timestamp, article_title, link, company_name, ticker, sentiment,
+                              confidence, event_type, impact_score, key_figures)
+        SELECT id, timestamp, article_title, link, company_name, ticker, sentiment,
+               confidence, event_type, impact_score, key_figures
+        FROM insights_unpartitioned
+        ''',
+        "DROP TABLE insights_unpartitioned",
+        "ALTER SEQUENCE insights_id_seq OWNED BY insights.id",
+        "CREATE INDEX idx_insights_ticker_timestamp_id ON insights (ticker, timestamp DESC, id DESC)",
+        "CREATE INDEX idx_insights_timestamp ON insights (timestamp)",
+        "CREATE INDEX idx_insights_actionable_timestamp ON insights (timestamp) WHERE sentiment <> 'Neutral'",
+        "CREATE INDEX idx_insights_link_ticker ON insights (link, ticker)",
+        "CREATE TRIGGER insights_rollup AFTER INSERT OR UPDATE OR DELETE ON insights"
+        " FOR EACH ROW EXECUTE FUNCTION insights_rollup_apply()",
+        "ANALYZE insights",
+    ]),
+    (7, "insight change notifications", [
+        # Statement-level, so a batch sends one notification; Postgres delivers it on commit
+        # and folds duplicates within a transaction. Every write path is covered, like the rollup.
+        f'''
+        CREATE OR REPLACE FUNCTION insights_notify() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{INSIGHTS_NOTIFY_CHANNEL}', TG_OP);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        "DROP TRIGGER IF EXISTS insights_notify ON insights",
+        "CREATE TRIGGER insights_notify AFTER INSERT OR UPDATE OR DELETE ON insights"
+        " FOR EACH STATEMENT EXECUTE FUNCTION insights_notify()",
+    ]),
+    (8, "unpartitioned (link, ticker) key table", [
+        # Brings back the database-enforced key migration 6 had to give up. insight_keys
+        # holds one row per (link, ticker) naming the insights row that owns it, and the
+        # foreign key makes every insights row point at its own key: a second row for a
+        # key, from any writer, has no key row to match and is rejected. Keys outlive
+        # their partition, so an archived article is not inserted again.
+        "LOCK TABLE insights IN SHARE MODE",
+        '''
+        DELETE FROM insights a USING insights b
+        WHERE a.link = b.link AND a.ticker = b.ticker AND a.id < b.id
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS insight_keys (
+            link TEXT NOT NULL, ticker TEXT NOT NULL,
+            id INTEGER NOT NULL, timestamp TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (link, ticker),
+            UNIQUE (id, timestamp, link, ticker)
+        )
+        ''',
+        '''
+        INSERT INTO insight_keys (link, ticker, id, timestamp)
+        SELECT link, ticker, id, timestamp FROM insights WHERE link IS NOT NULL
+        ON CONFLICT DO NOTHING
+        ''',
+        # MATCH SIMPLE: rows without a link are not keyed, as under the old unique index
+        "ALTER TABLE insights ADD CONSTRAINT insights_key_fkey FOREIGN KEY (id, timestamp, link, ticker)"
+        " REFERENCES insight_keys (id, timestamp, link, ticker)",
+        # The upsert now finds existing rows through insight_keys and the primary key
+        "DROP INDEX IF EXISTS idx_insights_link_ticker",
+    ]),
+]
+
+# Arbitrary constant: serializes migration runs from concurrent processes (worker + dashboard)
+_MIGRATION_LOCK_ID = 815_001
+
+def run_migrations(conn) -> list:
+    """Applies every pending migration on `conn`; returns the versions applied."""
+    applied_now = []
+    with conn.cursor() as cursor:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY, description TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        ''')
+        conn.commit()
+        cursor.execute("SELECT pg_advisory_lock(%s)", (_MIGRATION_LOCK_ID,))
+        try:
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+            for version, description, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                try:
+                    for statement in statements:
+                        cursor.execute(statement)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                        (version, description),
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    logging.error(f"Migration {version} ({description}) failed; later migrations not applied.")
+                    raise
+                logging.info(f"Applied migration {version}: {description}")
+                applied_now.append(version)
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (_MIGRATION_LOCK_ID,))
+            conn.commit()
+    return applied_now
+
+def rebuild_rollup(conn) -> int:
+    """
+    Recomputes insight_daily_rollup from the insights table (e.g. after a bulk load or
+    manual edits); returns the number of rows written. Days before the oldest remaining
+    insight belong to archived partitions and are kept as they are.
+    """
+    with conn.cursor() as cursor:
+        try:
+            # Writers wait for the rebuild instead of updating buckets that are being replaced
+            cursor.execute("LOCK TABLE insights IN SHARE MODE")
+            cursor.execute('''
+                DELETE FROM insight_daily_rollup WHERE day >= COALESCE(
+                    (SELECT MIN((timestamp AT TIME ZONE 'Asia/Kolkata')::date) FROM insights), '-infinity')
+            ''')
+            cursor.execute(_ROLLUP_REBUILD_SQL)
+            rows = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    logging.info(f"Rebuilt insight_daily_rollup: {rows} row(s).")
+    return rows
 
 def initialize_db():
-    """Creates the 'insights' table in PostgreSQL if it doesn't exist."""
+    """
+    Brings the PostgreSQL schema up to date (creates the 'insights' table on first run).
+
+    Since migration 6 'insights' is partitioned by month and cannot carry a unique
+    (link, ticker) key itself; migration 8 keeps that key in the unpartitioned
+    insight_keys table instead, and a foreign key ties every insights row with a link
+    to its key, so the database rejects a duplicate from any writer. Keys are never
+    archived: an article whose month was dropped is not inserted again.
+    """
     if not connection_pool:
         logging.warning("initialize_db: skipped — no DB connection available.")
         return
     conn = get_db_connection()
     try:
-        with conn.cursor() as cursor:
-            # Note the data type changes for PostgreSQL (SERIAL, TIMESTAMPTZ, JSONB)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS insights (
-                    id SERIAL PRIMARY KEY, timestamp TIMESTAMPTZ NOT NULL,
-                    article_title TEXT NOT NULL, link TEXT, company_name TEXT NOT NULL,
-                    ticker TEXT NOT NULL, sentiment TEXT NOT NULL, confidence REAL NOT NULL,
-                    event_type TEXT, impact_score REAL, key_figures JSONB
-                );
-            ''')
-            conn.commit()
+        run_migrations(conn)
+        ensure_partitions(conn)
         logging.info("PostgreSQL database initialized successfully.")
     finally:
         release_db_connection(conn)
 
+# --- Partitions, retention and the Parquet archive ---
+# insights is partitioned by IST calendar month (migration 6). Partitions are created
+# INSIGHTS_PARTITION_MONTHS_AHEAD months in advance; partitions older than
+# INSIGHTS_HOT_MONTHS are exported to INSIGHTS_ARCHIVE_DIR as zstd-compressed Parquet
+# (one file per month) and dropped, so hot queries only ever touch recent months.
+# Dropping a partition does not fire row triggers: the daily rollup keeps the history.
+
+_PARTITION_NAME = re.compile(r"^insights_p(\d{4})_(\d{2})$")
+_ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), INSIGHTS_ARCHIVE_DIR)
+
+def _current_month() -> pd.Timestamp:
+    return pd.Timestamp.now(tz="Asia/Kolkata").tz_localize(None).to_period("M").to_timestamp()
+
+def ensure_partitions(conn, months_ahead: int = INSIGHTS_PARTITION_MONTHS_AHEAD) -> list:
+    """Creates any missing partition from the current month to `months_ahead` months out; returns their names."""
+    start = _current_month()
+    names = []
+    with conn.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            cursor.execute("SELECT insights_ensure_partition(%s)", ((start + pd.DateOffset(months=offset)).date(),))
+            names.append(cursor.fetchone()[0])
+    conn.commit()
+    return names
+
+def list_partitions(conn) -> list:
+    """[(partition name, month start as a Timestamp)] for every insights partition, oldest first."""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+            " WHERE i.inhparent = 'insights'::regclass"
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, pd.Timestamp(year=int(match.group(1)), month=int(match.group(2)), day=1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+def archive_path(month: pd.Timestamp, archive_dir: str = _ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"insights_{month:%Y_%m}.parquet")
+
+def archive_cold_partitions(conn, hot_months: int = INSIGHTS_HOT_MONTHS, archive_dir: str = _ARCHIVE_DIR) -> list:
+    """
+    Exports every partition older than `hot_months` months to Parquet, then drops it.
+    A partition is only dropped after its file is written and re-read with the same row
+    count. Returns the paths written.
+    """
+    cutoff = _current_month() - pd.DateOffset(months=hot_months)
+    written = []
+    for name, month in list_partitions(conn):
+        if month >= cutoff:
+            break
+        # `name` matched _PARTITION_NAME, so it is safe to interpolate
+        df = pd.read_sql_query(f"SELECT * FROM {name} ORDER BY timestamp", conn)
+        path = archive_path(month, archive_dir)
+        os.makedirs(archive_dir, exist_ok=True)
+        if os.path.exists(path):
+            # Re-archiving a month (e.g. after a restore): keep whatever the old file had too
+            df = pd.concat([pd.read_parquet(path), df]).drop_duplicates(subset=["id"], keep="last")
+        df["key_figures"] = df["key_figures"].map(lambda v: v if v is None or isinstance(v, str) else json.dumps(v))
+        tmp_path = path + ".tmp"
+        df.to_parquet(tmp_path, compression="zstd", index=False)
+        if len(pd.read_parquet(tmp_path, columns=["id"])) != len(df):
+            os.remove(tmp_path)
+            raise RuntimeError(f"Archive of {name} failed verification; partition kept.")
+        os.replace(tmp_path, path)
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE insights DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+        conn.commit()
+        logging.info(f"Archived {len(df)} insight(s) from {name} to {path} and dropped the partition.")
+        written.append(path)
+    return written
+
+def maintain_storage():
+    """Per-cycle upkeep for long-running processes: upcoming partitions, then retention. Never raises."""
+    if not connection_pool:
+        return
+    conn = get_db_connection()
+    try:
+        ensure_partitions(conn)
+        archive_cold_partitions(conn)
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Storage maintenance failed: {e}")
+    finally:
+        release_db_connection(conn)
+
+def _as_utc(t) -> pd.Timestamp:
+    t = pd.Timestamp(t)
+    return t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+
+def read_archived_insights(columns=None, since=None, until=None, archive_dir: str = _ARCHIVE_DIR) -> pd.DataFrame:
+    """
+    Insights from the Parquet archive, in the same shape as the insights table.
+    Only files for months overlapping [since, until) are opened, and only `columns` are read.
+    """
+    if not os.path.isdir(archive_dir):
+        return pd.DataFrame(columns=list(columns or INSIGHT_COLUMNS))
+    since, until = (None if t is None else _as_utc(t) for t in (since, until))
+    frames = []
+    for filename in sorted(os.listdir(archive_dir)):
+        match = re.match(r"^insights_(\d{4})_(\d{2})\.parquet$", filename)
+        if not match:
+            continue
+        month = pd.Timestamp(year=int(match.group(1)), month=int(match.group(2)), day=1, tz="Asia/Kolkata")
+        if (until is not None and month >= until) or (since is not None and month + pd.DateOffset(months=1) <= since):
+            continue
+        filters = []
+        if since is not None:
+            filters.append(("timestamp", ">=", since))
+        if until is not None:
+            filters.append(("timestamp", "<", until))
+        frames.append(pd.read_parquet(os.path.join(archive_dir, filename),
+                                      columns=list(columns) if columns else None, filters=filters or None))
+    if not frames:
+        return pd.DataFrame(columns=list(columns or INSIGHT_COLUMNS))
+    return pd.concat(frames, ignore_index=True)
+
+# --- Change notifications ---
+
+class InsightChangeListener:
+    """
+    LISTENs for migration 7's notifications on a dedicated autocommit connection (outside
+    the pool) in a daemon thread, and counts them. `version` is a number that changes
+    whenever insights were written; readers compare it with the one they last saw instead
+    of querying the table. Reconnects with backoff after errors and bumps `version` when
+    it does, since notifications sent while disconnected are lost.
+    """
+
+    def __init__(self, channel: str = INSIGHTS_NOTIFY_CHANNEL, connect=None, timeout: float = 5.0):
+        self.channel = channel
+        self.timeout = timeout
+        self._connect = connect or (lambda: psycopg2.connect(host=DB_HOST, port=DB_PORT, user=DB_USER,
+                                                             password=DB_PASSWORD, dbname=DB_NAME))
+        self._lock = threading.Lock()
+        self._version = 0
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def _bump(self):
+        with self._lock:
+            self._version += 1
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name="insight-change-listener", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _listen(self):
+        conn = self._connect()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        logging.info(f"Listening for insight changes on '{self.channel}'.")
+        return conn
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = self._listen()
+                self._bump()   # anything written while we were not listening
+                backoff = 1.0
+                while not self._stopped.is_set():
+                    if select.select([conn], [], [], self.timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self._bump()
+            except Exception as e:
+                logging.warning(f"Insight change listener disconnected ({e}); retrying in {backoff:.0f}s.")
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+# Insights are keyed by (link, ticker). A repeat keeps the first-seen timestamp (when the
+# news was picked up, which the backtester measures returns from) and takes the newest analysis.
+# New keys are claimed in insight_keys (migration 8) with ON CONFLICT DO NOTHING and their
+# rows inserted under the claimed id and timestamp; keys that already existed update their
+# row through that id. A key whose row was archived updates nothing and is not re-inserted.
+# Rows without a link are not keyed and are always inserted.
+_UPSERT_SQL = '''
+    WITH v (article_title, link, company_name, ticker, sentiment, confidence, event_type, impact_score, key_figures)
+    AS (VALUES %s),
+    claimed AS (
+        INSERT INTO insight_keys (link, ticker, id, timestamp)
+        SELECT link, ticker, nextval('insights_id_seq'), NOW() FROM v WHERE link IS NOT NULL
+        ON CONFLICT (link, ticker) DO NOTHING
+        RETURNING link, ticker, id, timestamp
+    ),
+    updated AS (
+        UPDATE insights i SET
+            article_title = v.article_title, company_name = v.company_name,
+            sentiment = v.sentiment, confidence = v.confidence,
+            event_type = v.event_type, impact_score = v.impact_score, key_figures = v.key_figures
+        FROM v JOIN insight_keys k ON k.link = v.link AND k.ticker = v.ticker
+        WHERE i.id = k.id AND i.timestamp = k.timestamp
+    )
+    INSERT INTO insights (id, timestamp, article_title, link, company_name, ticker, sentiment,
+                          confidence, event_type, impact_score, key_figures)
+    SELECT c.id, c.timestamp, v.* FROM v JOIN claimed c ON c.link = v.link AND c.ticker = v.ticker
+    UNION ALL
+    SELECT nextval('insights_id_seq'), NOW(), v.* FROM v WHERE v.link IS NULL
+'''
+_UPSERT_TEMPLATE = "(%s, %s, %s, %s, %s, %s::real, %s, %s::real, %s::jsonb)"
+# Arbitrary constant, like _MIGRATION_LOCK_ID
+_INSIGHT_WRITE_LOCK_ID = 815_002
+
+def _upsert_rows(cursor, rows: list, page_size: int = INSIGHT_BATCH_SIZE):
+    """Upserts `rows` (see _insight_row) in the cursor's transaction; the caller commits."""
+    # An upsert cannot apply two rows for the same key in one statement: keep the last row per key
+    rows = list({(row[1], row[3]): row for row in rows}.values())
+    # insight_keys already rules out duplicates. The lock only orders concurrent writers:
+    # without it, a key claimed by a transaction that commits mid-statement is neither
+    # inserted nor updated here, and that newer analysis would be lost
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_INSIGHT_WRITE_LOCK_ID,))
+    execute_values(cursor, _UPSERT_SQL, rows, template=_UPSERT_TEMPLATE, page_size=page_size)
+    return len(rows)
+
 def save_specific_insight(article_title, link, company_name, ticker, sentiment_result, event_type, impact_score, key_figures_json):
     """Saves a single, enriched insight into the PostgreSQL database."""
     if not connection_pool:
@@ -77,17 +762,239 @@ def save_specific_insight(article_title, link, company_name, ticker, sentiment_r
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            # PostgreSQL uses %s for placeholders, not ?
-            cursor.execute('''
-                INSERT INTO insights (timestamp, article_title, link, company_name, ticker, sentiment, confidence, event_type, impact_score, key_figures)
-                VALUES (NOW(), %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''', (article_title, link, company_name, ticker, 
-                  sentiment_result.get('sentiment', 'Neutral'), sentiment_result.get('confidence', 0.0), 
-                  event_type, impact_score, key_figures_json))
+            _upsert_rows(cursor, [_insight_row(article_title, link, company_name, ticker, sentiment_result,
+                                               event_type, impact_score, key_figures_json)])
             conn.commit()
     finally:
         release_db_connection(conn)
 
+def write_insight_rows(rows: list) -> int:
+    """
+    Upserts `rows` (see _insight_row) in one transaction on a pooled connection; returns
+    how many were written. A connection-level error discards the connection before it is
+    raised, so a retry gets a fresh one; with no pool at all it raises OperationalError too.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            written = _upsert_rows(cursor, rows)
+        conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        release_db_connection(conn, close=True)
+        raise
+    except Exception:
+        conn.rollback()
+        release_db_connection(conn)
+        raise
+    release_db_connection(conn)
+    return written
+
+def _insight_row(article_title, link, company_name, ticker, sentiment_result, event_type, impact_score, key_figures_json):
+    return (article_title, link, company_name, ticker,
+            sentiment_result.get('sentiment', 'Neutral'), sentiment_result.get('confidence', 0.0),
+            event_type, impact_score, key_figures_json)
+
+class InsightWriter:
+    """
+    Buffers insights and writes them in batches: one multi-row upsert (execute_values)
+    and one commit per batch instead of a transaction per row. Rows are upserted on
+    (link, ticker), so writing a batch again — a retry, or two overlapping runs — never
+    creates duplicates.
+
+    add() takes the same arguments as save_specific_insight and flushes automatically
+    once `batch_size` rows are buffered or the oldest buffered row is `flush_interval`
+    seconds old; call flush() to write whatever is buffered right away (e.g. at the end
+    of a cycle). write() takes a whole batch of insights at once and bypasses the buffer,
+    so a caller that must know exactly which rows were committed (the worker's persist
+    stage) never has rows of a failed batch left behind to go out with a later one.
+    A batch is a single transaction, so a failed attempt leaves nothing
+    behind and is retried on a fresh connection; connection-level errors are retried up
+    to `max_retries` times, anything else is raised at once.
+
+    Batches go to PostgreSQL (write_insight_rows) unless `write_batch` is given: any
+    callable that writes a list of rows in one transaction and returns the count, such
+    as a storage backend's write_rows. `retryable` is then the exception types that
+    callable fails with transiently (storage's InsightStore.retryable); it defaults to
+    psycopg2's connection-level errors.
+    """
+    _RETRYABLE = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+    def __init__(self, batch_size: int = INSIGHT_BATCH_SIZE, flush_interval: float = INSIGHT_FLUSH_SECONDS,
+                 max_retries: int = INSIGHT_WRITE_RETRIES, backoff_base: float = 0.5, write_batch=None,
+                 retryable: tuple = None):
+        self.batch_size = batch_size
+        self.write_batch = write_batch
+        self.retryable = self._RETRYABLE if retryable is None else tuple(retryable)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def add(self, article_title, link, company_name, ticker, sentiment_result, event_type, impact_score, key_figures_json):
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(_insight_row(article_title, link, company_name, ticker, sentiment_result,
+                                             event_type, impact_score, key_figures_json))
+            due = (len(self._buffer) >= self.batch_size
+                   or time.monotonic() - self._oldest >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def write(self, insights) -> int:
+        """Writes `insights` (tuples of add()'s arguments) as one batch, bypassing the buffer;
+        returns how many were written. Raises if the batch could not be saved."""
+        return self._write_rows([_insight_row(*insight) for insight in insights])
+
+    def flush(self) -> int:
+        """Writes every buffered row; returns how many were written. Raises if the batch could not be saved."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        return self._write_rows(rows)
+
+    def _write_rows(self, rows: list) -> int:
+        if not rows:
+            return 0
+        write_batch = self.write_batch or write_insight_rows
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                written = write_batch(rows)
+                logging.info(f"InsightWriter: saved {written} insight(s) in one transaction.")
+                return written
+            except self.retryable as e:
+                if attempt == self.max_retries:
+                    logging.error(f"InsightWriter: giving up on {len(rows)} insight(s) after {attempt + 1} attempts: {e}")
+                    raise
+                logging.warning(f"InsightWriter: batch write failed ({e}), retrying...")
+                time.sleep(self.backoff_base * (2 ** attempt))
+
+# Columns query_insights may return (also the whitelist that keeps caller input out of the SQL)
+INSIGHT_COLUMNS = ("id", "timestamp", "article_title", "link", "company_name", "ticker", "sentiment",
+                   "confidence", "event_type", "impact_score", "key_figures")
+# What the dashboard's sentiment history needs
+HISTORY_COLUMNS = ("timestamp", "sentiment", "confidence")
+_SENTIMENT_CATEGORIES = ["Positive", "Negative", "Neutral"]
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Low-cardinality text as category, scores as float32."""
+    if "sentiment" in df:
+        df["sentiment"] = pd.Categorical(df["sentiment"], categories=_SENTIMENT_CATEGORIES)
+    for column in ("ticker", "event_type", "company_name"):
+        if column in df:
+            df[column] = df[column].astype("category")
+    for column in ("confidence", "impact_score"):
+        if column in df:
+            df[column] = df[column].astype("float32")
+    if "timestamp" in df:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+    return df
+
+def query_insights(ticker: str = None, columns=HISTORY_COLUMNS, since=None, until=None,
+                   limit: int = HISTORY_PAGE_SIZE, after: tuple = None):
+    """
+    One page of insights, newest first: returns (DataFrame, next_cursor).
+
+    `columns` selects what is read (None = every column); `since`/`until` bound the
+    timestamp (inclusive/exclusive); `limit` caps the page size. Pages are keyset-paginated:
+    pass the returned `next_cursor` as `after` to get the next page, which costs the same
+    however deep into the history it is. `next_cursor` is None on the last page.
+    """
+    columns = _insight_columns(columns)
+    if not connection_pool:
+        logging.warning("query_insights: skipped — no DB connection available.")
+        return pd.DataFrame(columns=columns), None
+
+    query, params = _insights_query(columns, ticker, since, until, limit, after)
+    conn = get_db_connection()
+    try:
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        release_db_connection(conn)
+    return _compact(df[columns].copy()), _next_cursor(df, limit)
+
+# The query builders below are shared with the embedded backend in storage.py, which
+# only differs in its placeholder style.
+
+def _insight_columns(columns) -> list:
+    columns = list(INSIGHT_COLUMNS if columns is None else columns)
+    unknown = set(columns) - set(INSIGHT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown insight column(s): {sorted(unknown)}")
+    return columns
+
+def _insights_query(columns: list, ticker, since, until, limit: int, after, placeholder: str = "%s") -> tuple:
+    """(SQL, params) for one query_insights page; `columns` must already be validated."""
+    p = placeholder
+    # timestamp and id are always read: together they are the (unique) pagination key
+    selected = columns + [c for c in ("timestamp", "id") if c not in columns]
+    where, params = [], []
+    if ticker is not None:
+        where.append(f"ticker = {p}"); params.append(ticker)
+    if since is not None:
+        where.append(f"timestamp >= {p}"); params.append(since)
+    if until is not None:
+        where.append(f"timestamp < {p}"); params.append(until)
+    if after is not None:
+        where.append(f"(timestamp, id) < ({p}, {p})"); params.extend(after)
+    query = f"SELECT {', '.join(selected)} FROM insights"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += f" ORDER BY timestamp DESC, id DESC LIMIT {p}"
+    params.append(limit)
+    return query, tuple(params)
+
+def _next_cursor(df: pd.DataFrame, limit: int):
+    if len(df) < limit or df.empty:
+        return None
+    last = df.iloc[-1]
+    return (pd.Timestamp(last["timestamp"]).to_pydatetime(), int(last["id"]))
+
+def query_sentiment_rollup(ticker: str, since=None, until=None) -> pd.DataFrame:
+    """
+    Daily per-sentiment, per-event-type aggregates for `ticker` (oldest day first):
+    day, sentiment, event_type, count, mean_confidence, impact_sum. `since`/`until`
+    bound the day (inclusive/exclusive). One row per bucket, however many insights it holds.
+    """
+    if not connection_pool:
+        logging.warning("query_sentiment_rollup: skipped — no DB connection available.")
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    query, params = _rollup_query(ticker, since, until)
+    conn = get_db_connection()
+    try:
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        release_db_connection(conn)
+    return _compact_rollup(df)
+
+ROLLUP_COLUMNS = ("day", "sentiment", "event_type", "count", "mean_confidence", "impact_sum")
+
+def _rollup_query(ticker: str, since, until, placeholder: str = "%s") -> tuple:
+    p = placeholder
+    query = ("SELECT day, sentiment, event_type, n AS count, confidence_sum / n AS mean_confidence, impact_sum"
+             f" FROM insight_daily_rollup WHERE ticker = {p}")
+    params = [ticker]
+    if since is not None:
+        query += f" AND day >= {p}"; params.append(since)
+    if until is not None:
+        query += f" AND day < {p}"; params.append(until)
+    query += " ORDER BY day"
+    return query, tuple(params)
+
+def _compact_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    df = _compact(df)
+    df["count"] = df["count"].astype("int32")
+    df["mean_confidence"] = df["mean_confidence"].astype("float32")
+    df["impact_sum"] = df["impact_sum"].astype("float32")
+    return df
+
 def get_historical_sentiment(ticker: str):
     """Fetches historical sentiment data for a specific ticker from PostgreSQL."""
     if not connection_pool:
@@ -0,0 +1,82 @@
+# db_admin.py
+"""
+Database maintenance commands.
+
+Usage:
+    python db_admin.py migrate          # apply pending schema migrations
+    python db_admin.py rebuild-rollup   # recompute insight_daily_rollup from insights
+    python db_admin.py partitions       # create upcoming monthly partitions and list them
+    python db_admin.py archive          # export partitions past retention to Parquet and drop them
+"""
+
+import sys
+import logging
+import argparse
+from database import (get_db_connection, release_db_connection, connection_pool, run_migrations, rebuild_rollup,
+                      ensure_partitions, list_partitions, archive_cold_partitions)
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+
+
+def _with_connection(action):
+    if not connection_pool:
+        logging.error("No database connection available.")
+        return 1
+    conn = get_db_connection()
+    try:
+        action(conn)
+        return 0
+    except Exception as e:
+        logging.error(f"Command failed: {e}")
+        return 1
+    finally:
+        release_db_connection(conn)
+
+
+def cmd_migrate(args) -> int:
+    def migrate(conn):
+        applied = run_migrations(conn)
+        logging.info(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+    return _with_connection(migrate)
+
+
+def cmd_rebuild_rollup(args) -> int:
+    # Migrate first so the rollup table exists on a database that has never been initialized
+    return _with_connection(lambda conn: (run_migrations(conn), rebuild_rollup(conn)))
+
+
+def cmd_partitions(args) -> int:
+    def partitions(conn):
+        run_migrations(conn)
+        ensure_partitions(conn)
+        for name, month in list_partitions(conn):
+            print(f"{name}\t{month:%Y-%m}")
+    return _with_connection(partitions)
+
+
+def cmd_archive(args) -> int:
+    def archive(conn):
+        written = archive_cold_partitions(conn)
+        logging.info(f"Archived {len(written)} partition(s)." if written else "No partitions past retention.")
+    return _with_connection(archive)
+
+
+COMMANDS = {
+    "migrate": (cmd_migrate, "apply pending schema migrations"),
+    "rebuild-rollup": (cmd_rebuild_rollup, "recompute the daily sentiment rollup from the insights table"),
+    "partitions": (cmd_partitions, "create upcoming monthly insights partitions and list them"),
+    "archive": (cmd_archive, "export insights partitions past retention to Parquet and drop them"),
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Stock Insight Agent database maintenance.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (handler, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text).set_defaults(handler=handler)
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# feed_state.py
+"""
+Per-feed polling state, persisted between runs in feed_state.json.
+
+For every feed URL we remember:
+  • the HTTP validators from the last 200 response (ETag / Last-Modified), so the
+    next poll is a conditional GET and an unchanged feed costs one 304 round trip;
+  • a bounded watermark of recently processed entry GUIDs, so only entries that
+    are new since the last cycle are scraped.
+
+Validators must only be saved once every new entry of that response has been
+processed: otherwise the next poll gets a 304 and the leftovers are never fetched.
+defer_validators() holds them back until mark_seen() has covered the response's
+entries; entries that are never marked (dropped downstream) keep the feed on full
+GETs, and filter_new() offers them again.
+"""
+
+import os
+import json
+import logging
+import threading
+from config import FEED_STATE_MAX_GUIDS
+
+_DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "feed_state.json")
+
+
+def entry_guid(entry) -> str:
+    """Stable identifier for an RSS entry: its <guid>/<id>, falling back to the link."""
+    return entry.get('id') or entry.get('guid') or entry.get('link') or ''
+
+
+class FeedStateStore:
+    def __init__(self, path: str = _DEFAULT_PATH, max_guids: int = FEED_STATE_MAX_GUIDS):
+        self.path = path
+        self.max_guids = max_guids
+        self._lock = threading.Lock()
+        self._dirty = False
+        # feed_url -> (etag, modified, GUIDs still to be marked seen); in memory only, so a
+        # restart simply re-polls without validators
+        self._pending = {}
+        try:
+            with open(self.path) as f:
+                self._state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._state = {}
+
+    def _feed(self, feed_url: str) -> dict:
+        return self._state.setdefault(feed_url, {'etag': None, 'modified': None, 'seen': []})
+
+    # --- Conditional GET ---
+
+    def validators(self, feed_url: str) -> tuple:
+        """(etag, modified) from the last successful fetch, either may be None."""
+        with self._lock:
+            feed = self._state.get(feed_url, {})
+            return feed.get('etag'), feed.get('modified')
+
+    def conditional_headers(self, feed_url: str) -> dict:
+        etag, modified = self.validators(feed_url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if modified:
+            headers['If-Modified-Since'] = modified
+        return headers
+
+    def update_validators(self, feed_url: str, etag: str = None, modified: str = None):
+        with self._lock:
+            self._set_validators(feed_url, etag, modified)
+
+    def _set_validators(self, feed_url: str, etag: str, modified: str):
+        feed = self._feed(feed_url)
+        if (feed['etag'], feed['modified']) != (etag, modified):
+            feed['etag'], feed['modified'] = etag, modified
+            self._dirty = True
+
+    def defer_validators(self, feed_url: str, etag: str = None, modified: str = None, entries: list = ()):
+        """Saves the validators once every one of `entries` has been marked seen (at once if there are none)."""
+        guids = {g for g in (entry_guid(e) for e in entries) if g}
+        with self._lock:
+            if guids:
+                self._pending[feed_url] = (etag, modified, guids)
+            else:
+                self._pending.pop(feed_url, None)
+                self._set_validators(feed_url, etag, modified)
+
+    # --- Entry watermark ---
+
+    def filter_new(self, feed_url: str, entries: list) -> list:
+        """Returns the entries whose GUID has not been processed yet, in feed order."""
+        with self._lock:
+            seen = set(self._state.get(feed_url, {}).get('seen', []))
+        return [e for e in entries if entry_guid(e) not in seen]
+
+    def mark_seen(self, feed_url: str, entries: list):
+        self.mark_guids(feed_url, [entry_guid(e) for e in entries])
+
+    def mark_guids(self, feed_url: str, guids: list):
+        """Records entries as processed (stored, or deliberately skipped)."""
+        guids = [g for g in guids if g]
+        if not guids:
+            return
+        with self._lock:
+            feed = self._feed(feed_url)
+            seen = [g for g in feed['seen'] if g not in set(guids)] + guids
+            feed['seen'] = seen[-self.max_guids:]
+            self._dirty = True
+            pending = self._pending.get(feed_url)
+            if pending:
+                pending[2].difference_update(guids)
+                if not pending[2]:
+                    del self._pending[feed_url]
+                    self._set_validators(feed_url, pending[0], pending[1])
+
+    def save(self):
+        """Writes the state file atomically. No-op when nothing changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(self._state, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logging.error(f"Failed to persist feed state to {self.path}: {e}")
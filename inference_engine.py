@@ -4,6 +4,8 @@ from core_nlp import analyze_sentiment_core, classify_event_type_core
 
 # lru_cache is used instead of @st.cache_data so this module works both in
 # Streamlit and in standalone scripts (app.py, worker.py) without errors.
+# It is only an in-process layer: core_nlp already caches Groq answers on disk,
+# shared across processes and restarts (llm_cache.py).
 @lru_cache(maxsize=512)
 def analyze_sentiment(text: str) -> dict:
     return analyze_sentiment_core(text)
@@ -0,0 +1,116 @@
+# llm_cache.py
+"""
+Disk-backed cache of Groq responses, shared by every process that imports core_nlp
+(worker, app.py, backfills, the dashboard).
+
+Entries are content-addressed: the key is a hash of the task, the model name, the
+task's prompt version and the whitespace-normalized input text, so a changed model
+or prompt never serves a stale answer. Entries expire after a TTL and the table is
+trimmed to a maximum size, least recently used first.
+
+Only successful responses are stored — a failed or rate-limited call is retried the
+next time the same text comes in.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from config import LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES
+
+_DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "llm_cache.db")
+
+# Size-based eviction runs once every this many writes rather than on each one
+_EVICT_EVERY = 100
+
+
+def cache_key(task: str, model: str, prompt_version: str, text: str) -> str:
+    normalized = re.sub(r'\s+', ' ', text or '').strip()
+    payload = "\x1f".join((task, model, prompt_version, normalized))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str = _DEFAULT_PATH, ttl: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Several processes share the file, so wait on their locks instead of failing
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, task TEXT NOT NULL, value TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+
+    def get(self, key: str):
+        """The cached value for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] > self.ttl:
+                    with self._conn:
+                        self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    return None
+                with self._conn:
+                    self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                logging.error(f"LLM cache read failed: {e}")
+                return None
+        return json.loads(row[0])
+
+    def set(self, key: str, task: str, value):
+        now = time.time()
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, task, value, created, last_used)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (key, task, json.dumps(value), now, now),
+                    )
+                self._writes += 1
+                if self._writes % _EVICT_EVERY == 0:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                logging.error(f"LLM cache write failed: {e}")
+
+    def _evict(self, now: float):
+        with self._conn:
+            self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def evict(self):
+        """Drops expired entries and trims the cache to max_entries right away."""
+        with self._lock:
+            try:
+                self._evict(time.time())
+            except sqlite3.Error as e:
+                logging.error(f"LLM cache eviction failed: {e}")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,174 @@
+# llm_client.py
+"""
+Async, rate-limited Groq chat client used by core_nlp's async inference functions.
+
+  • Token buckets for requests/min and tokens/min keep us under the account limits
+    instead of discovering them through 429s.
+  • A semaphore bounds the number of calls in flight.
+  • 429s and transient server/connection errors are retried with jittered
+    exponential backoff (honouring Retry-After when the API sends it).
+  • Identical in-flight requests are coalesced into one API call (single-flight).
+
+When retries are exhausted the error is raised as LLMUnavailableError — callers
+decide what to do, nothing is quietly turned into a Neutral result. Any other error
+(a 400 such as a failed JSON-mode validation, a missing API key) is not a matter of
+availability and propagates unchanged, so callers can fall back as they would for a
+malformed reply.
+
+Synchronous code (including several pipeline threads at once) runs its coroutines
+with run_sync(), which schedules them on one shared background event loop, so the
+limits and single-flight map apply across all callers in the process.
+"""
+
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from groq import AsyncGroq, RateLimitError, APIConnectionError, InternalServerError
+from config import (GROQ_MODEL, GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE,
+                    GROQ_MAX_CONCURRENCY, GROQ_MAX_RETRIES)
+
+_RETRYABLE = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+class LLMUnavailableError(RuntimeError):
+    """The LLM call could not be completed (rate limited or failing) after all retries."""
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute` units per minute, holding at most one minute's worth."""
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+def _estimate_tokens(messages: list, max_tokens: int) -> int:
+    # ~4 characters per token is close enough for budgeting
+    return sum(len(m.get("content", "")) for m in messages) // 4 + max_tokens
+
+
+class AsyncLLMClient:
+    def __init__(self, client=None, requests_per_minute: float = GROQ_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = GROQ_TOKENS_PER_MINUTE,
+                 max_concurrency: int = GROQ_MAX_CONCURRENCY, max_retries: int = GROQ_MAX_RETRIES,
+                 backoff_base: float = 1.0):
+        # The SDK's own retries are disabled so the limiter sees (and paces) every attempt
+        self._client = client
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._loop = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = AsyncGroq(max_retries=0)
+        return self._client
+
+    def _bind_loop(self):
+        # asyncio primitives belong to one event loop; each asyncio.run() gets fresh ones,
+        # while the bucket levels carry over so limits hold across batches
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket_lock = asyncio.Lock()
+            self._inflight = {}
+
+    async def complete(self, messages: list, max_tokens: int, **kwargs) -> str:
+        """Returns the message content of a chat completion; raises LLMUnavailableError once retryable
+        failures are exhausted, any other error as is."""
+        self._bind_loop()
+        key = hashlib.sha256(json.dumps(
+            [GROQ_MODEL, messages, max_tokens, kwargs], sort_keys=True, default=str
+        ).encode('utf-8')).hexdigest()
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._complete(messages, max_tokens, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one cancelled waiter must not cancel the call other waiters share
+        return await asyncio.shield(task)
+
+    async def _acquire(self, tokens: int):
+        async with self._bucket_lock:
+            while True:
+                wait = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(tokens))
+                if wait <= 0:
+                    self.request_bucket.take(1)
+                    self.token_bucket.take(tokens)
+                    return
+                await asyncio.sleep(wait)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+        delay = self.backoff_base * (2 ** attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay * random.uniform(0.5, 1.5)   # jitter so parallel callers don't retry in lockstep
+
+    async def _complete(self, messages: list, max_tokens: int, **kwargs) -> str:
+        tokens = _estimate_tokens(messages, max_tokens)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(tokens)
+            try:
+                async with self._semaphore:
+                    completion = await self.client.chat.completions.create(
+                        messages=messages, model=GROQ_MODEL, temperature=0.0, max_tokens=max_tokens, **kwargs
+                    )
+                return completion.choices[0].message.content
+            except _RETRYABLE as e:
+                if attempt == self.max_retries:
+                    raise LLMUnavailableError(f"Groq call failed after {attempt + 1} attempts: {e}") from e
+                delay = self._backoff(attempt, e)
+                logging.warning(f"Groq call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+class _BackgroundLoop:
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def run(self, coro):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-client-loop", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+
+_background = _BackgroundLoop()
+
+
+def run_sync(coro):
+    """Runs `coro` on the shared background event loop and returns its result (blocks the calling thread)."""
+    return _background.run(coro)
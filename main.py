@@ -11,7 +11,8 @@ Usage:
 import logging
 import sys
 from config import FEEDS_TO_PROCESS
-from worker import process_feed
+from storage import get_store
+from worker import process_feeds
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,13 +28,10 @@ def main():
         logging.error("No feeds configured in config.FEEDS_TO_PROCESS. Exiting.")
         sys.exit(1)
 
+    get_store().initialize()   # applies any pending schema migrations
     for source_name, feed_config in FEEDS_TO_PROCESS.items():
-        logging.info(f"  → Processing: {source_name} ({feed_config['url']})")
-        process_feed(
-            feed_url=feed_config["url"],
-            source_weight=feed_config.get("weight", 1.0),
-            article_limit=3,
-        )
+        logging.info(f"  → Queued: {source_name} ({feed_config['url']})")
+    process_feeds(FEEDS_TO_PROCESS, article_limit=3)
 
     logging.info("✅ Pipeline run complete. New insights saved to database.")
 
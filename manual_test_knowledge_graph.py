@@ -1,16 +1,14 @@
 # test_knowledge_graph.py
 import logging
-import spacy
 import json
 
 # Import the specific functions we need to test
-from nlp_processor import extract_tickers
+from nlp_processor import ArticleAnalysis
 from core_nlp import analyze_sentiment_core as analyze_sentiment # Use the core, non-cached version for testing
 from worker import get_competitors_from_graph, COMPETITIVE_KEYWORDS
 
 # --- Setup ---
 logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s: %(message)s')
-nlp = spacy.load("en_core_web_lg")
 
 def test_competitive_logic(article: dict):
     """
@@ -19,23 +17,22 @@ def test_competitive_logic(article: dict):
     title = article.get("title", "")
     content = article.get("content", "")
     
-    # Extract all tickers found in the article
-    primary_tickers = extract_tickers(title) or extract_tickers(content)
+    # Extract all tickers found in the article (title and content are each parsed once)
+    analysis = ArticleAnalysis(title, content)
+    primary_tickers = analysis.tickers
     if not primary_tickers:
         logging.warning("Test failed: No tickers were extracted from the sample article.")
         return
 
     # --- This is the core logic from your worker ---
     sentiment_results = {}
-    doc = nlp(content)
     for company_name, data in primary_tickers.items():
-        ner_name = data['ner_name']
-        relevant_sentences = [sent.text for sent in doc.sents if ner_name in sent.text]
+        relevant_sentences = analysis.sentences_mentioning(data['ner_name'])
         if relevant_sentences:
             sentiment_results[data['ticker']] = analyze_sentiment(" ".join(relevant_sentences))
 
     # Rule Engine: Check for competitive context
-    tickers_in_headline = {data['ticker'] for data in (extract_tickers(title) or {}).values()}
+    tickers_in_headline = {data['ticker'] for data in analysis.title_tickers.values()}
     if len(tickers_in_headline) > 1 and any(kw in title.lower() for kw in COMPETITIVE_KEYWORDS):
         logging.info("Competitive context detected. Applying relationship rules.")
         
@@ -1,16 +1,45 @@
 import spacy
 import logging
 import re
+import threading
+from functools import cached_property
 from ticker_utils import load_nse_tickers
-from thefuzz import fuzz
-from config import FUZZY_MATCH_THRESHOLD, ENTITY_BLOCKLIST
+from company_matcher import CompanyNameMatcher, MentionScanner
+from config import FUZZY_MATCH_THRESHOLD, ENTITY_BLOCKLIST, TICKER_SCAN_MODE
+from config import NLP_BATCH_SIZE, NLP_N_PROCESS, SPACY_MODEL, SPACY_PROFILE, SPACY_PROFILES
 
 # --- INITIALIZATION ---
-try:
-    nlp = spacy.load("en_core_web_lg")
-except OSError:
-    logging.error("spaCy model 'en_core_web_lg' not found. Run 'python -m spacy download en_core_web_lg'")
-    nlp = None
+# The spaCy pipeline is loaded on first use (see get_nlp), not at import time.
+# `nlp` holds the shared instance once loaded, or None if the model is unavailable.
+_UNLOADED = object()
+nlp = _UNLOADED
+_nlp_lock = threading.Lock()
+
+def _load_pipeline(profile_name: str):
+    profile = SPACY_PROFILES.get(profile_name)
+    if profile is None:
+        logging.error("Unknown SPACY_PROFILE '%s'; using 'full'", profile_name)
+        profile = SPACY_PROFILES["full"]
+    model = profile.get("model", SPACY_MODEL)
+    try:
+        pipeline = spacy.load(model, exclude=profile.get("exclude", []))
+    except OSError:
+        logging.error("spaCy model '%s' not found. Run 'python -m spacy download %s'", model, model)
+        return None
+    for name in profile.get("enable", []):
+        if name in pipeline.disabled:
+            pipeline.enable_pipe(name)
+    logging.info("Loaded spaCy model '%s' (profile '%s'): %s", model, profile_name, pipeline.pipe_names)
+    return pipeline
+
+def get_nlp():
+    """The shared spaCy pipeline, loaded once on first call. None if the model is not installed."""
+    global nlp
+    if nlp is _UNLOADED:
+        with _nlp_lock:
+            if nlp is _UNLOADED:
+                nlp = _load_pipeline(SPACY_PROFILE)
+    return nlp
 
 # Load NSE mapping (official_name -> ticker)
 NSE_TICKER_MAP = load_nse_tickers() or {}
@@ -40,8 +69,97 @@ _sensible_pattern = re.compile(r'^[\w\s.&-]+$')  # allow letters, numbers, space
 def _normalize_text(s: str) -> str:
     return re.sub(r'[^\w\s]', ' ', s).lower().strip()
 
-def extract_tickers(text: str) -> dict:
+_matcher = None
+_scanner = None
+
+def _get_matcher() -> CompanyNameMatcher:
+    """Indexed fuzzy matcher over NSE_TICKER_MAP, rebuilt if the map is replaced."""
+    global _matcher
+    if _matcher is None or _matcher.source is not NSE_TICKER_MAP:
+        _matcher = CompanyNameMatcher(NSE_TICKER_MAP)
+    return _matcher
+
+def _get_scanner() -> MentionScanner:
+    """Aho-Corasick automaton over NORMALIZED_INDEX, rebuilt if the index is replaced."""
+    global _scanner
+    if _scanner is None or _scanner.source is not NORMALIZED_INDEX:
+        _scanner = MentionScanner(NORMALIZED_INDEX)
+    return _scanner
+
+def _lookup_best_match(ner_name: str):
+    """Tries an exact normalized lookup first, then fuzzy matching."""
+    norm = _normalize_text(ner_name)
+    # exact normalized match in index
+    if norm in NORMALIZED_INDEX:
+        official_name, ticker = NORMALIZED_INDEX[norm]
+        return official_name, ticker, 100  # perfect score
+
+    matcher = _get_matcher()
+    # acronym exact match attempt: check NSE_TICKER_MAP keys for a direct match (case-insensitive)
+    if len(ner_name) <= 5 and re.fullmatch(r'[A-Za-z]+', ner_name):
+        exact = matcher.exact(ner_name)
+        if exact:
+            return exact[0], exact[1], 100
+
+    # fallback: indexed fuzzy match — same result as a token_set_ratio scan over
+    # NSE_TICKER_MAP (shorter official name wins ties), but only scores names that
+    # can reach the threshold
+    return matcher.best_match(ner_name, score_cutoff=FUZZY_MATCH_THRESHOLD)
+
+def _record_match(found_tickers: dict, ner_name: str, official_name: str, ticker: str, score: int):
+    prev = found_tickers.get(official_name)
+    # If we've already found this official_name, keep the one with better score
+    if not prev or score > prev.get('score', 0):
+        found_tickers[official_name] = {
+            'ticker': ticker,
+            'ner_name': ner_name,
+            'score': score
+        }
+        logging.info("Validated ticker: '%s' -> %s (Match: '%s', score=%s)", ner_name, ticker, official_name, score)
+
+def _validate_candidates(ner_candidates: set, found_tickers: dict):
+    """Evaluates each candidate and adds it to found_tickers if it passes the threshold."""
+    for ner_name in ner_candidates:
+        if not ner_name or len(ner_name.strip()) <= 1:
+            continue
+        if not _sensible_pattern.match(ner_name):
+            continue
+
+        official_name, ticker, score = _lookup_best_match(ner_name)
+        if official_name and score and score >= FUZZY_MATCH_THRESHOLD:
+            _record_match(found_tickers, ner_name, official_name, ticker, score)
+
+def _extract_with_automaton(text: str, ner_candidates: set) -> dict:
+    """
+    Single linear pass over the text with the company-name automaton. Every exact
+    mention of a normalized name / short name is found directly; only NER ORG spans
+    that no automaton hit accounts for go through exact/fuzzy lookup.
+    """
+    found_tickers = {}
+    matched = set()   # whitespace-collapsed, space-padded keys of every hit
+    for key, start, end in _get_scanner().scan(text):
+        if key in BLOCKLIST:
+            continue
+        official_name, ticker = NORMALIZED_INDEX[key]
+        _record_match(found_tickers, text[start:end], official_name, ticker, 100)
+        matched.add(f" {' '.join(key.split())} ")
+
+    def _covered(cand: str) -> bool:
+        # an ORG span is accounted for if it contains a hit or lies inside one
+        padded = f" {' '.join(_normalize_text(cand).split())} "
+        return any(key in padded or padded in key for key in matched)
+
+    leftovers = {cand for cand in ner_candidates
+                 if _normalize_text(cand) not in BLOCKLIST and not _covered(cand)}
+    _validate_candidates(leftovers, found_tickers)
+    return found_tickers
+
+def extract_tickers(text: str, doc=None, mode: str = None) -> dict:
     """Extracts validated tickers using spaCy NER + fallback token/ngram + fuzzy matching.
+    Pass `doc` to reuse an already-parsed spaCy Doc of `text` instead of parsing it again.
+    `mode` overrides config.TICKER_SCAN_MODE: "ngram" fuzzy-matches every unigram and
+    2-4-gram, "automaton" finds exact name mentions in one Aho-Corasick pass and only
+    fuzzy-matches leftover NER ORG spans.
     Returns a dict: {official_name: {'ticker': ticker, 'ner_name': matched_span, 'score': score}}.
     """
     if not text or not NSE_TICKER_MAP:
@@ -51,9 +169,11 @@ def extract_tickers(text: str) -> dict:
 
     # 1) Try spaCy NER if available to get ORG entities
     ner_candidates = set()
-    if nlp:
+    nlp = get_nlp() if doc is None else None
+    if doc is not None or nlp:
         try:
-            doc = nlp(text)
+            if doc is None:
+                doc = nlp(text)
             for ent in doc.ents:
                 if ent.label_ == "ORG":
                     cand = ent.text.strip()
@@ -63,6 +183,9 @@ def extract_tickers(text: str) -> dict:
             logging.exception("spaCy failed during NER; falling back to token scan. Err: %s", e)
             ner_candidates = set()
 
+    if (mode or TICKER_SCAN_MODE) == "automaton":
+        return _extract_with_automaton(text, ner_candidates)
+
     # 2) Token / n-gram scan fallback & to catch single-word mentions + acronyms
     # Tokenize using a regex so it works even if spaCy unavailable
     tokens = re.findall(r"\b[A-Za-z0-9&\.-]+\b", text)
@@ -85,65 +208,26 @@ def extract_tickers(text: str) -> dict:
     # Normalize and remove blocklisted entries
     ner_candidates = {cand for cand in ner_candidates if _normalize_text(cand) not in BLOCKLIST}
 
-    # Helper: try exact normalized lookup first, then fuzzy match
-    def _lookup_best_match(ner_name: str):
-        norm = _normalize_text(ner_name)
-        # exact normalized match in index
-        if norm in NORMALIZED_INDEX:
-            official_name, ticker = NORMALIZED_INDEX[norm]
-            return official_name, ticker, 100  # perfect score
-
-        # acronym exact match attempt: check NSE_TICKER_MAP keys for a direct match (case-insensitive)
-        if len(ner_name) <= 5 and re.fullmatch(r'[A-Za-z]+', ner_name):
-            for official_name, ticker in NSE_TICKER_MAP.items():
-                if official_name.strip().lower() == ner_name.strip().lower():
-                    return official_name, ticker, 100
-
-        # fallback: fuzzy match across NSE_TICKER_MAP
-        best_name, best_ticker, best_score = None, None, 0
-        for official_name, ticker in NSE_TICKER_MAP.items():
-            score = fuzz.token_set_ratio(ner_name.lower(), official_name.lower())
-            if score > best_score:
-                best_score = score
-                best_name = official_name
-                best_ticker = ticker
-            elif score == best_score and best_name and len(official_name) < len(best_name):
-                # prefer shorter official name on ties
-                best_name, best_ticker = official_name, ticker
-        return best_name, best_ticker, best_score
-
-    # Evaluate each candidate and add to found_tickers if passes threshold
-    for ner_name in ner_candidates:
-        if not ner_name or len(ner_name.strip()) <= 1:
-            continue
-        if not _sensible_pattern.match(ner_name):
-            continue
-
-        official_name, ticker, score = _lookup_best_match(ner_name)
-        if official_name and score and score >= FUZZY_MATCH_THRESHOLD:
-            prev = found_tickers.get(official_name)
-            # If we've already found this official_name, keep the one with better score
-            if not prev or score > prev.get('score', 0):
-                found_tickers[official_name] = {
-                    'ticker': ticker,
-                    'ner_name': ner_name,
-                    'score': score
-                }
-                logging.info("Validated ticker: '%s' -> %s (Match: '%s', score=%s)", ner_name, ticker, official_name, score)
-
+    _validate_candidates(ner_candidates, found_tickers)
     return found_tickers
 
-def extract_key_figures(text: str) -> dict:
-    """Uses spaCy to extract and prioritize key numerical figures."""
-    if not nlp or not text:
+def extract_key_figures(text: str, doc=None) -> dict:
+    """Uses spaCy to extract and prioritize key numerical figures.
+    Pass `doc` to reuse an already-parsed spaCy Doc of `text`.
+    """
+    if not text:
+        return {}
+    nlp = get_nlp() if doc is None else None
+    if doc is None and not nlp:
         return {}
 
     # Using spaCy doc for entity detection
-    try:
-        doc = nlp(text)
-    except Exception as e:
-        logging.exception("spaCy failed while parsing text for key figures: %s", e)
-        return {}
+    if doc is None:
+        try:
+            doc = nlp(text)
+        except Exception as e:
+            logging.exception("spaCy failed while parsing text for key figures: %s", e)
+            return {}
 
     figures = {}
 
@@ -179,3 +263,100 @@ def extract_key_figures(text: str) -> dict:
         figures['other_noteworthy_figures'] = other_monies
 
     return figures
+
+
+_sentence_split = re.compile(r'(?<=[.!?])\s+')
+
+class ArticleAnalysis:
+    """
+    Per-article NLP results built on a single spaCy parse of the title and of the content.
+    Ticker extraction, key-figure extraction and sentence lookup all share those Docs,
+    and every result is computed lazily and at most once.
+    Pre-parsed Docs (e.g. from nlp.pipe) can be passed in to skip parsing entirely.
+    """
+    def __init__(self, title: str, content: str, title_doc=None, content_doc=None):
+        self.title = title or ""
+        self.content = content or ""
+        self._docs = {'title': title_doc, 'content': content_doc}
+
+    def _doc(self, field: str):
+        if self._docs[field] is None:
+            text = getattr(self, field)
+            nlp = get_nlp() if text else None
+            if nlp:
+                try:
+                    self._docs[field] = nlp(text)
+                except Exception as e:
+                    logging.exception("spaCy failed while parsing article %s: %s", field, e)
+        return self._docs[field]
+
+    @property
+    def title_doc(self):
+        return self._doc('title')
+
+    @property
+    def content_doc(self):
+        return self._doc('content')
+
+    @cached_property
+    def title_tickers(self) -> dict:
+        return extract_tickers(self.title, doc=self.title_doc)
+
+    @cached_property
+    def content_tickers(self) -> dict:
+        return extract_tickers(self.content, doc=self.content_doc)
+
+    @property
+    def tickers(self) -> dict:
+        """Primary tickers: those in the headline, else those in the body."""
+        return self.title_tickers or self.content_tickers
+
+    @cached_property
+    def key_figures(self) -> dict:
+        return extract_key_figures(self.content, doc=self.content_doc)
+
+    @cached_property
+    def sentences(self) -> list:
+        doc = self.content_doc
+        if doc is not None:
+            try:
+                return [sent.text for sent in doc.sents]
+            except ValueError:
+                pass  # pipeline has no sentence boundaries; fall back to punctuation split
+        return [s for s in _sentence_split.split(self.content) if s]
+
+    def sentences_mentioning(self, name: str) -> list:
+        return [sent for sent in self.sentences if name in sent]
+
+
+def analyze_articles(articles: list, batch_size: int = NLP_BATCH_SIZE, n_process: int = NLP_N_PROCESS) -> list:
+    """
+    Parses a batch of articles ({'title', 'content', ...} dicts) with a single nlp.pipe
+    run and returns one ArticleAnalysis per article, in order, each holding its
+    pre-parsed Docs. `n_process` > 1 (or -1 for every core) spreads parsing over worker
+    processes; it only kicks in when the batch is larger than `batch_size`, since
+    starting the workers costs more than parsing a handful of articles.
+    """
+    fields = [(a.get('title') or "", a.get('content') or "") for a in articles]
+    nlp = get_nlp()
+    if not nlp:
+        return [ArticleAnalysis(title, content) for title, content in fields]
+
+    # Only non-empty texts are parsed; slots maps each one back to (article, field)
+    texts, slots = [], []
+    for i, (title, content) in enumerate(fields):
+        for field, text in (('title_doc', title), ('content_doc', content)):
+            if text:
+                texts.append(text)
+                slots.append((i, field))
+
+    docs = [{} for _ in fields]
+    try:
+        workers = n_process if len(texts) > batch_size else 1
+        for (i, field), doc in zip(slots, nlp.pipe(texts, batch_size=batch_size, n_process=workers)):
+            docs[i][field] = doc
+    except Exception as e:
+        logging.exception("spaCy batch parse failed; articles will be parsed one at a time. Err: %s", e)
+        docs = [{} for _ in fields]
+
+    return [ArticleAnalysis(title, content, **docs[i]) for i, (title, content) in enumerate(fields)]
@@ -0,0 +1,129 @@
+# pipeline.py
+"""
+Minimal threaded staged pipeline.
+
+Stages run concurrently, each with its own pool of worker threads, and are connected
+by bounded queues: when a downstream stage falls behind, its input queue fills up and
+upstream workers block on put() (backpressure) instead of piling work up in memory.
+Network waits (feeds, LLM), CPU work (spaCy) and DB writes therefore overlap.
+
+A stage function receives one item — or, when the stage has a batch_size > 1, a list
+of up to batch_size items gathered from its queue — and returns:
+  • None            to drop the item(s),
+  • a single item   to pass downstream (fan_out=False),
+  • an iterable     whose elements are each passed downstream (fan_out=True or batched stages).
+A generator's elements are passed on as they are produced, so a fan-out stage that
+yields as it goes (e.g. one feed at a time) lets the next stage start right away.
+An exception drops the item(s), is logged and counted; the rest of the run continues
+(elements a generator yielded before raising have already gone downstream).
+"""
+
+import time
+import queue
+import logging
+import threading
+
+_DONE = object()   # end-of-stream marker, one per worker of the receiving stage
+
+
+class Stage:
+    def __init__(self, name: str, fn, workers: int = 1, batch_size: int = 1,
+                 batch_wait: float = 0.2, fan_out: bool = False):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait   # max seconds to wait for a batch to fill once it has one item
+        self.fan_out = fan_out or self.batch_size > 1
+
+
+class StagedPipeline:
+    def __init__(self, stages: list, queue_size: int = 64):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items) -> dict:
+        """
+        Feeds `items` through every stage and blocks until all of them have drained.
+        Returns per-stage counters: {stage name: {'in', 'out', 'dropped', 'errors', 'busy_s'}}.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        stats = {s.name: {'in': 0, 'out': 0, 'dropped': 0, 'errors': 0, 'busy_s': 0.0} for s in self.stages}
+        lock = threading.Lock()
+        remaining = [s.workers for s in self.stages]   # live workers per stage
+
+        def emit(index, item):
+            if index + 1 < len(queues):
+                queues[index + 1].put(item)   # blocks while the next stage is saturated
+
+        def next_batch(stage, q):
+            first = q.get()
+            if first is _DONE or stage.batch_size == 1:
+                return first, []
+            batch, deadline = [first], time.monotonic() + stage.batch_wait
+            while len(batch) < stage.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    return batch, [_DONE]
+                batch.append(item)
+            return batch, []
+
+        def work(index):
+            stage, q = self.stages[index], queues[index]
+            while True:
+                payload, pending = next_batch(stage, q)
+                if payload is _DONE:
+                    break
+                count = len(payload) if stage.batch_size > 1 else 1
+                started = time.perf_counter()
+                emitted = 0
+                try:
+                    result = stage.fn(payload)
+                    outputs = [] if result is None else (result if stage.fan_out else [result])
+                    for output in outputs:
+                        emit(index, output)
+                        emitted += 1
+                    with lock:
+                        stats[stage.name]['dropped'] += max(0, count - emitted)
+                except Exception as e:
+                    logging.error(f"Pipeline stage '{stage.name}' failed on {count} item(s): {e}", exc_info=True)
+                    with lock:
+                        stats[stage.name]['errors'] += count
+                finally:
+                    with lock:
+                        stats[stage.name]['out'] += emitted
+                        stats[stage.name]['in'] += count
+                        stats[stage.name]['busy_s'] += time.perf_counter() - started
+                if pending:
+                    break
+
+            # Last worker out of this stage tells every worker of the next one to stop
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and index + 1 < len(queues):
+                for _ in range(self.stages[index + 1].workers):
+                    queues[index + 1].put(_DONE)
+
+        threads = [threading.Thread(target=work, args=(i,), name=f"pipeline-{s.name}-{n}", daemon=True)
+                   for i, s in enumerate(self.stages) for n in range(s.workers)]
+        for t in threads:
+            t.start()
+
+        try:
+            for item in items:
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+            for t in threads:
+                t.join()
+        return stats
@@ -1,7 +1,8 @@
 # scheduler.py
 import time
 import logging
-from worker import process_feed
+from storage import get_store
+from worker import process_feeds
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s: %(message)s')
 
@@ -15,11 +16,14 @@ RUN_INTERVAL_SECONDS = 900 # 15 minutes
 
 if __name__ == '__main__':
     logging.info("--- Starting Scheduler ---")
+    store = get_store()
+    store.initialize()   # applies any pending schema migrations
     while True:
         logging.info(f"--- Starting new processing cycle ---")
         
-        for name, config in FEEDS_TO_PROCESS.items():
-            process_feed(feed_url=config['url'], source_weight=config['weight'])
+        process_feeds(FEEDS_TO_PROCESS)
+        store.maintain()   # next months' partitions; archives months past retention
+        logging.info(f"Storage ({store.name}): {store.stats()}")
         
         logging.info(f"--- Cycle complete. Waiting for {RUN_INTERVAL_SECONDS} seconds... ---")
         time.sleep(RUN_INTERVAL_SECONDS)
\ No newline at end of file
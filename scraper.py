@@ -1,23 +1,70 @@
 import feedparser
 import requests
+import httpx
+import asyncio
 from bs4 import BeautifulSoup
 import logging
 import time
+from collections import defaultdict
 from typing import Optional, List, Dict
 from urllib.parse import urlparse
 import re
+from config import SCRAPER_MAX_CONCURRENCY, SCRAPER_PER_HOST_CONCURRENCY, SCRAPER_PER_HOST_DELAY
+from feed_state import FeedStateStore, entry_guid
+from seen_store import SeenArticleStore
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
 
+class _HostLimiter:
+    """
+    Per-host politeness for the async fetch path: caps in-flight requests to each
+    host and spaces request starts to the same host at least `delay` seconds apart.
+    Requests to different hosts never wait on each other.
+    """
+    def __init__(self, per_host: int, delay: float):
+        self.per_host = per_host
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._last_start: Dict[str, float] = {}
+
+    def slot(self, url: str) -> asyncio.Semaphore:
+        return self._semaphores[urlparse(url).netloc]
+
+    async def wait_turn(self, url: str):
+        host = urlparse(url).netloc
+        async with self._locks[host]:
+            loop = asyncio.get_running_loop()
+            wait = self._last_start.get(host, float('-inf')) + self.delay - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_start[host] = loop.time()
+
 class NewsArticleScraper:
     """
     A robust, industry-grade news scraper that fetches content from RSS feeds,
     handles anti-bot measures, and uses multiple strategies to extract clean article text.
+
+    When a FeedStateStore is supplied, feeds are polled with conditional GETs
+    (ETag / Last-Modified) and only entries not seen in earlier runs are scraped.
+    When a SeenArticleStore is supplied, links the worker has already processed
+    (from any feed) are skipped before they are downloaded.
+
+    By default fetched entries are marked seen in the FeedStateStore right away. With
+    `mark_fetched=False` the caller marks them (state_store.mark_guids with each
+    article's 'guid') once they are processed, as worker.py does after persisting, so
+    an article dropped downstream is offered again on the next poll.
     """
-    def __init__(self, timeout: int = 20, retry_attempts: int = 2, delay: float = 1.5):
+    def __init__(self, timeout: int = 20, retry_attempts: int = 2, delay: float = 1.5,
+                 state_store: Optional[FeedStateStore] = None,
+                 seen_store: Optional[SeenArticleStore] = None,
+                 mark_fetched: bool = True):
         self.timeout = timeout
         self.retry_attempts = retry_attempts
         self.delay = delay
+        self.state_store = state_store
+        self.seen_store = seen_store
+        self.mark_fetched = mark_fetched
         self.min_content_length = 150
         
         try:
@@ -53,6 +100,69 @@ class NewsArticleScraper:
             for element in soup.find_all(unwanted):
                 element.decompose()
 
+    def _extract_content(self, html: str, url: str) -> Optional[str]:
+        """Pulls the article body out of raw HTML. Shared by the sync and async fetch paths."""
+        soup = BeautifulSoup(html, 'html.parser')
+        self._remove_unwanted_elements(soup)
+        
+        article_body = None
+        for selector in self.content_selectors:
+            article_body = soup.select_one(selector)
+            if article_body:
+                text = self._clean_text(article_body.get_text(separator=' '))
+                if len(text) >= self.min_content_length:
+                    logging.info(f"✓ Successfully scraped {len(text)} chars using selector '{selector}'")
+                    return text
+        
+        logging.warning(f"No specific selector worked for {url}. Falling back to paragraph extraction.")
+        paragraphs = soup.find_all('p')
+        text = ' '.join([p.get_text(strip=True) for p in paragraphs])
+        cleaned_text = self._clean_text(text)
+        
+        if len(cleaned_text) >= self.min_content_length:
+            return cleaned_text
+        
+        logging.warning(f"Could not extract valid content from {url}")
+        return None
+
+    def _summary_fallback(self, entry) -> str:
+        summary_html = entry.get('summary', '<p>No content available.</p>')
+        summary_soup = BeautifulSoup(summary_html, 'html.parser')
+        return self._clean_text(summary_soup.get_text(separator=' ', strip=True))
+
+    def _select_entries(self, feed_url: str, entries: list, limit: int, etag: str = None,
+                        modified: str = None) -> list:
+        """
+        Applies the GUID watermark, the seen-article index and the per-feed limit, and
+        hands the response's validators to the state store. They are only kept when every
+        new entry made the cut: after a 304 the entries left over would never be fetched.
+        """
+        if self.state_store:
+            fresh = self.state_store.filter_new(feed_url, entries)
+            logging.info(f"{len(fresh)} of {len(entries)} entries are new since the last poll.")
+            entries = fresh
+        if self.seen_store:
+            unseen = [e for e in entries if not self.seen_store.seen_link(e.get('link'))]
+            if len(unseen) < len(entries):
+                logging.info(f"Skipping {len(entries) - len(unseen)} already-processed articles.")
+            entries = unseen
+        selected = entries[:limit]
+        if self.state_store:
+            if len(selected) < len(entries):
+                logging.info(f"{len(entries) - len(selected)} new entries left for the next poll; "
+                             f"not caching validators for {feed_url}.")
+            else:
+                self.state_store.defer_validators(feed_url, etag, modified, selected)
+        return selected
+
+    def _finish_entries(self, feed_url: str, selected: list, linkless: list):
+        """Marks entries seen: link-less ones always (they are skipped for good), the rest unless deferred."""
+        if not self.state_store:
+            return
+        self.state_store.mark_seen(feed_url, linkless)
+        if self.mark_fetched:
+            self.state_store.mark_seen(feed_url, selected)
+
     def _get_article_content(self, url: str) -> Optional[str]:
         if 'videoshow' in url.lower():
             logging.warning(f"Skipping video article: {url}")
@@ -68,28 +178,7 @@ class NewsArticleScraper:
                 response.raise_for_status()
 
                 # Use response.text to let 'requests' handle character encoding
-                soup = BeautifulSoup(response.text, 'html.parser')
-                self._remove_unwanted_elements(soup)
-                
-                article_body = None
-                for selector in self.content_selectors:
-                    article_body = soup.select_one(selector)
-                    if article_body:
-                        text = self._clean_text(article_body.get_text(separator=' '))
-                        if len(text) >= self.min_content_length:
-                            logging.info(f"✓ Successfully scraped {len(text)} chars using selector '{selector}'")
-                            return text
-                
-                logging.warning(f"No specific selector worked for {url}. Falling back to paragraph extraction.")
-                paragraphs = soup.find_all('p')
-                text = ' '.join([p.get_text(strip=True) for p in paragraphs])
-                cleaned_text = self._clean_text(text)
-                
-                if len(cleaned_text) >= self.min_content_length:
-                    return cleaned_text
-                
-                logging.warning(f"Could not extract valid content from {url}")
-                return None
+                return self._extract_content(response.text, url)
             
             except requests.RequestException as e:
                 logging.warning(f"Request error on attempt {attempt + 1} for {url}: {e}")
@@ -101,36 +190,181 @@ class NewsArticleScraper:
     def run(self, feed_url: str, limit: int = 3) -> List[Dict[str, str]]:
         try:
             logging.info(f"Attempting to fetch RSS feed from: {feed_url}")
-            feed = feedparser.parse(feed_url)
+            etag, modified = self.state_store.validators(feed_url) if self.state_store else (None, None)
+            feed = feedparser.parse(feed_url, etag=etag, modified=modified)
         except Exception as e:
             logging.error(f"Failed to parse RSS feed: {e}"); return []
+
+        if feed.get('status') == 304:
+            logging.info(f"Feed unchanged since last poll (304): {feed_url}"); return []
             
         if feed.bozo or not feed.entries:
             logging.warning("No articles found or feed is malformed."); return []
 
         logging.info(f"RSS successful. Found {len(feed.entries)} entries. Processing up to {limit}.")
-        articles = []
+        articles, linkless = [], []
+        entries = self._select_entries(feed_url, feed.entries, limit, feed.get('etag'), feed.get('modified'))
         
-        for entry in feed.entries[:limit]:
+        for entry in entries:
             title = entry.get('title', 'No Title')
             link = entry.get('link')
             
             if not link:
-                logging.warning(f"Skipping article with no link: \"{title}\""); continue
+                logging.warning(f"Skipping article with no link: \"{title}\"")
+                linkless.append(entry); continue
             
             content = self._get_article_content(link)
             
             if not content:
-                summary_html = entry.get('summary', '<p>No content available.</p>')
-                summary_soup = BeautifulSoup(summary_html, 'html.parser')
-                content = self._clean_text(summary_soup.get_text(separator=' ', strip=True))
+                content = self._summary_fallback(entry)
                 logging.warning(f"✗ Using RSS summary for: \"{title}\"")
             
-            articles.append({"title": title, "link": link, "content": content})
+            articles.append({"title": title, "link": link, "content": content, "guid": entry_guid(entry)})
             time.sleep(self.delay)
+
+        if self.state_store:
+            self._finish_entries(feed_url, [e for e in entries if e.get('link')], linkless)
+            self.state_store.save()
         
         return articles
 
+    # --- ASYNC FETCH MODE ---
+    # Downloads articles from many feeds at once. Politeness is enforced per host
+    # (see _HostLimiter) instead of a global sleep after every article.
+
+    def _async_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers=dict(self.session.headers), timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=SCRAPER_MAX_CONCURRENCY),
+        )
+
+    async def _fetch_async(self, client: httpx.AsyncClient, limiter: _HostLimiter, url: str,
+                           headers: Optional[dict] = None) -> httpx.Response:
+        async with limiter.slot(url):
+            await limiter.wait_turn(url)
+            response = await client.get(url, headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+    async def _get_article_content_async(self, client: httpx.AsyncClient, limiter: _HostLimiter, url: str) -> Optional[str]:
+        if 'videoshow' in url.lower():
+            logging.warning(f"Skipping video article: {url}")
+            return None
+
+        for attempt in range(self.retry_attempts):
+            try:
+                if attempt > 0:
+                    await asyncio.sleep(self.delay * attempt)
+
+                logging.info(f"Fetching content from: {url} (Attempt {attempt + 1})")
+                response = await self._fetch_async(client, limiter, url)
+                return self._extract_content(response.text, url)
+
+            except httpx.HTTPError as e:
+                logging.warning(f"Request error on attempt {attempt + 1} for {url}: {e}")
+
+        logging.error(f"All retry attempts failed for {url}")
+        return None
+
+    async def _build_article_async(self, client: httpx.AsyncClient, limiter: _HostLimiter, entry) -> Dict[str, str]:
+        title, link = entry.get('title', 'No Title'), entry.get('link')
+        try:
+            content = await self._get_article_content_async(client, limiter, link)
+        except Exception as e:
+            # A malformed link (httpx.InvalidURL, UnicodeError, ...) must not fail the other articles
+            logging.error(f"Could not fetch {link!r}: {e}")
+            content = None
+        if not content:
+            content = self._summary_fallback(entry)
+            logging.warning(f"✗ Using RSS summary for: \"{title}\"")
+        return {"title": title, "link": link, "content": content, "guid": entry_guid(entry)}
+
+    async def _run_async(self, client: httpx.AsyncClient, limiter: _HostLimiter, feed_url: str, limit: int) -> List[Dict[str, str]]:
+        try:
+            logging.info(f"Attempting to fetch RSS feed from: {feed_url}")
+            headers = self.state_store.conditional_headers(feed_url) if self.state_store else None
+            response = await self._fetch_async(client, limiter, feed_url, headers=headers)
+            if response.status_code == 304:
+                logging.info(f"Feed unchanged since last poll (304): {feed_url}"); return []
+            feed = feedparser.parse(response.content)
+        except Exception as e:
+            logging.error(f"Failed to fetch RSS feed {feed_url}: {e}"); return []
+
+        if feed.bozo or not feed.entries:
+            logging.warning(f"No articles found or feed is malformed: {feed_url}"); return []
+
+        logging.info(f"RSS successful. Found {len(feed.entries)} entries. Processing up to {limit}.")
+        selected = self._select_entries(feed_url, feed.entries, limit,
+                                        response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        entries, linkless = [], []
+        for entry in selected:
+            if not entry.get('link'):
+                logging.warning(f"Skipping article with no link: \"{entry.get('title', 'No Title')}\"")
+                linkless.append(entry); continue
+            entries.append(entry)
+
+        articles = list(await asyncio.gather(*(self._build_article_async(client, limiter, e) for e in entries)))
+        self._finish_entries(feed_url, entries, linkless)
+        return articles
+
+    async def run_async(self, feed_url: str, limit: int = 3) -> List[Dict[str, str]]:
+        """Async counterpart of `run` for a single feed."""
+        results = await self.scrape_many([feed_url], limit=limit)
+        return results[feed_url]
+
+    async def iter_many(self, feed_urls: List[str], limit: int = 3):
+        """
+        Fetches several feeds and all their articles concurrently on one client and
+        _HostLimiter, yielding (feed_url, [articles]) as each feed finishes. A feed that
+        fails yields an empty list. Closing the generator early cancels the rest.
+        """
+        limiter = _HostLimiter(per_host=SCRAPER_PER_HOST_CONCURRENCY, delay=SCRAPER_PER_HOST_DELAY)
+
+        async def scrape(client, url):
+            try:
+                return url, await self._run_async(client, limiter, url, limit)
+            except Exception as e:
+                logging.error(f"Failed to scrape feed {url}: {e}")
+                return url, []
+
+        try:
+            async with self._async_client() as client:
+                tasks = [asyncio.ensure_future(scrape(client, url)) for url in feed_urls]
+                try:
+                    for next_done in asyncio.as_completed(tasks):
+                        yield await next_done
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if self.state_store:
+                self.state_store.save()
+
+    def iter_feeds(self, feed_urls: List[str], limit: int = 3):
+        """Blocking iter_many for worker threads: yields (feed_url, [articles]) as each feed finishes."""
+        loop = asyncio.new_event_loop()
+        feeds = self.iter_many(feed_urls, limit=limit)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(feeds.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(feeds.aclose())
+            loop.close()
+
+    async def scrape_many(self, feed_urls: List[str], limit: int = 3) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Fetches several feeds and all their articles concurrently.
+        Returns {feed_url: [articles]} with the same article shape as `run`.
+        """
+        articles = {url: result async for url, result in self.iter_many(feed_urls, limit=limit)}
+        return {url: articles[url] for url in feed_urls}
+
 # --- CONVENIENCE FUNCTION ---
 # This is the only function your dashboard.py will see.
 # It creates an instance of the powerful scraper class and runs it.
@@ -139,6 +373,13 @@ def scrape_news(url: str, limit: int = 3) -> list:
     scraper = NewsArticleScraper()
     return scraper.run(feed_url=url, limit=limit)
 
+def scrape_many_feeds(urls: List[str], limit: int = 3,
+                      state_store: Optional[FeedStateStore] = None,
+                      seen_store: Optional[SeenArticleStore] = None) -> Dict[str, List[Dict[str, str]]]:
+    """Synchronous entry point for the async fetch mode: {feed_url: [articles]}."""
+    scraper = NewsArticleScraper(state_store=state_store, seen_store=seen_store)
+    return asyncio.run(scraper.scrape_many(urls, limit=limit))
+
 # Example usage for testing this file directly
 if __name__ == "__main__":
     test_urls = [
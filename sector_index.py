@@ -0,0 +1,159 @@
+# sector_index.py
+"""
+In-memory sector/competitor index: which companies share a sector with a ticker.
+
+This is the only relationship the worker reads from the knowledge graph
+((:Company)-[:IN_SECTOR]->(:Sector)), and the same ticker → sector pairs are
+already in the `stocks` table and nse_stocks_enriched.csv. Loading them once
+turns every competitor lookup into a dict access instead of a Neo4j round trip,
+and lets the worker run with no graph database at all.
+
+Load strategy (in order, first non-empty source wins):
+  1. Neo4j IN_SECTOR edges — only when SECTOR_INDEX_SOURCE == "graph" and a driver is given
+  2. PostgreSQL `stocks` table via the shared connection pool in database.py
+  3. nse_stocks_enriched.csv
+
+The index reloads itself on the first lookup after SECTOR_INDEX_RELOAD_SECONDS;
+call reload() to pick up changes right away (e.g. after enrich_data.py or from
+a change notification). A failed reload keeps serving the previous data.
+"""
+
+import os
+import time
+import logging
+import threading
+import pandas as pd
+from config import SECTOR_INDEX_SOURCE, SECTOR_INDEX_RELOAD_SECONDS
+
+_DIR = os.path.dirname(__file__)
+_ENRICHED_CSV = os.path.join(_DIR, "nse_stocks_enriched.csv")
+
+
+def _clean(pairs) -> dict:
+    sectors = {}
+    for ticker, sector in pairs:
+        if isinstance(ticker, str) and isinstance(sector, str) and ticker.strip() and sector.strip():
+            sectors[ticker.strip()] = sector.strip()
+    return sectors
+
+
+def _load_from_graph(driver) -> dict:
+    """{ticker: sector} from the graph's IN_SECTOR edges. Returns {} on any failure."""
+    try:
+        with driver.session() as session:
+            result = session.run(
+                "MATCH (c:Company)-[:IN_SECTOR]->(s:Sector) RETURN c.ticker AS ticker, s.name AS sector"
+            )
+            sectors = _clean((record["ticker"], record["sector"]) for record in result)
+        logging.info(f"Loaded {len(sectors)} ticker sectors from Neo4j.")
+        return sectors
+    except Exception as e:
+        logging.warning(f"Graph sector load skipped: {e}")
+        return {}
+
+
+def _load_from_db() -> dict:
+    """{ticker: sector} from the `stocks` table. Returns {} on any failure."""
+    try:
+        from database import get_db_connection, release_db_connection, connection_pool
+        if not connection_pool:
+            return {}
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT ticker, sector FROM stocks WHERE sector IS NOT NULL")
+                sectors = _clean(cursor.fetchall())
+            logging.info(f"Loaded {len(sectors)} ticker sectors from PostgreSQL.")
+            return sectors
+        finally:
+            release_db_connection(conn)
+    except Exception as e:
+        logging.warning(f"DB sector load skipped: {e}")
+        return {}
+
+
+def _load_from_csv(csv_path: str = _ENRICHED_CSV) -> dict:
+    """{ticker: sector} from the enriched NSE CSV. Returns {} on any failure."""
+    try:
+        df = pd.read_csv(csv_path)
+        df.columns = df.columns.str.strip().str.upper()
+        if "SYMBOL" not in df.columns or "SECTOR" not in df.columns:
+            logging.error(f"Expected SYMBOL and SECTOR columns in {csv_path}. Got: {list(df.columns)}")
+            return {}
+        sectors = _clean(zip(df["SYMBOL"], df["SECTOR"]))
+        logging.info(f"Loaded {len(sectors)} ticker sectors from {os.path.basename(csv_path)}.")
+        return sectors
+    except Exception as e:
+        logging.error(f"Failed to read {csv_path}: {e}")
+        return {}
+
+
+def load_sector_map(driver=None) -> dict:
+    """Return {ticker: sector} from the best available source."""
+    if SECTOR_INDEX_SOURCE == "graph" and driver is not None:
+        sectors = _load_from_graph(driver)
+        if sectors:
+            return sectors
+    return _load_from_db() or _load_from_csv()
+
+
+class SectorIndex:
+    def __init__(self, loader=None, reload_seconds: float = SECTOR_INDEX_RELOAD_SECONDS):
+        self._loader = loader or load_sector_map
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        # (ticker -> sector, sector -> tickers), replaced as one tuple on reload so
+        # readers never see a half-built index
+        self._index = ({}, {})
+
+    def reload(self) -> bool:
+        """Rebuilds the index from the loader; keeps the current data if it returns nothing."""
+        with self._lock:
+            return self._reload()
+
+    def _reload(self) -> bool:
+        try:
+            sectors = self._loader()
+        except Exception as e:
+            logging.error(f"Sector index reload failed: {e}")
+            sectors = {}
+        # Retry after the normal interval either way, not on every lookup
+        self._loaded_at = time.monotonic()
+        if not sectors:
+            logging.warning("Sector index reload returned no data; keeping the previous index.")
+            return False
+        members = {}
+        for ticker, sector in sectors.items():
+            members.setdefault(sector, []).append(ticker)
+        self._index = (dict(sectors), {sector: tuple(tickers) for sector, tickers in members.items()})
+        logging.info(f"Sector index loaded: {len(sectors)} tickers in {len(members)} sectors.")
+        return True
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_seconds
+
+    def _ensure_fresh(self):
+        if self._stale():
+            with self._lock:
+                if self._stale():   # another thread may have reloaded while we waited
+                    self._reload()
+
+    def sector_of(self, ticker: str):
+        self._ensure_fresh()
+        return self._index[0].get(ticker)
+
+    def competitors(self, ticker: str) -> list:
+        """Other tickers in `ticker`'s sector (what the IN_SECTOR graph query returns)."""
+        self._ensure_fresh()
+        sector_of, members = self._index
+        return [t for t in members.get(sector_of.get(ticker), ()) if t != ticker]
+
+    def are_competitors(self, ticker: str, other: str) -> bool:
+        self._ensure_fresh()
+        sector_of = self._index[0]
+        sector = sector_of.get(ticker)
+        return sector is not None and ticker != other and sector_of.get(other) == sector
+
+    def __len__(self):
+        return len(self._index[0])
@@ -0,0 +1,135 @@
+# seen_store.py
+"""
+Durable dedupe index of articles the worker has already processed.
+
+Articles are keyed two ways:
+  • canonical URL  — checked before an article is scraped at all;
+  • content hash   — checked before NLP / LLM calls, catching the same story
+                     syndicated under a different URL.
+
+Lookups go through a bounded in-memory LRU (the hot layer) before falling back
+to a local SQLite file (seen_articles.db), so the index survives restarts
+without needing the production database.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from config import SEEN_STORE_HOT_SIZE
+
+_DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "seen_articles.db")
+
+# Texts shorter than this (e.g. a generic RSS summary fallback) are too likely to
+# collide across unrelated articles, so they are not indexed by content hash
+_MIN_HASHED_CHARS = 150
+
+# Query parameters that never change which article a URL points to
+_TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|ref|source|from|cmp|ito)$', re.I)
+
+
+def canonicalize_url(url: str) -> str:
+    """Lowercases scheme/host, drops 'www.', fragments, tracking params and trailing slashes."""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if not host:
+        return ''
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not _TRACKING_PARAMS.match(k))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower() or 'https', host, path, urlencode(query), ''))
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the whitespace-collapsed, lowercased article text."""
+    normalized = re.sub(r'\s+', ' ', text or '').strip().lower()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class SeenArticleStore:
+    def __init__(self, path: str = _DEFAULT_PATH, hot_size: int = SEEN_STORE_HOT_SIZE):
+        self.path = path
+        self.hot_size = hot_size
+        self._hot: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_articles ("
+                " url_key TEXT PRIMARY KEY, content_hash TEXT, first_seen REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_seen_content_hash ON seen_articles (content_hash)"
+            )
+
+    def _remember(self, key: str):
+        self._hot[key] = True
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_size:
+            self._hot.popitem(last=False)
+
+    def _lookup(self, key: str, column: str, value: str) -> bool:
+        with self._lock:
+            if key in self._hot:
+                self._hot.move_to_end(key)
+                return True
+            row = self._conn.execute(
+                f"SELECT 1 FROM seen_articles WHERE {column} = ? LIMIT 1", (value,)
+            ).fetchone()
+            if row:
+                self._remember(key)
+            return row is not None
+
+    def seen_link(self, url: str) -> bool:
+        url_key = canonicalize_url(url)
+        return bool(url_key) and self._lookup(f"u:{url_key}", "url_key", url_key)
+
+    def seen_content(self, text: str) -> bool:
+        if not text or len(text) < _MIN_HASHED_CHARS:
+            return False
+        digest = content_hash(text)
+        return self._lookup(f"h:{digest}", "content_hash", digest)
+
+    @staticmethod
+    def keys(url: str, text: str = None) -> list:
+        """The index keys an article is recorded under (canonical URL, then content hash if long enough)."""
+        url_key = canonicalize_url(url)
+        if not url_key:
+            return []
+        keys = [f"u:{url_key}"]
+        if text and len(text) >= _MIN_HASHED_CHARS:
+            keys.append(f"h:{content_hash(text)}")
+        return keys
+
+    def mark(self, url: str, text: str = None):
+        """Records an article as processed under its canonical URL and content hash."""
+        url_key = canonicalize_url(url)
+        if not url_key:
+            return
+        digest = content_hash(text) if text and len(text) >= _MIN_HASHED_CHARS else None
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO seen_articles (url_key, content_hash, first_seen) VALUES (?, ?, ?)",
+                        (url_key, digest, time.time()),
+                    )
+            except sqlite3.Error as e:
+                logging.error(f"Failed to record seen article {url_key}: {e}")
+                return
+            self._remember(f"u:{url_key}")
+            if digest:
+                self._remember(f"h:{digest}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
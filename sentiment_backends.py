@@ -0,0 +1,52 @@
+# sentiment_backends.py
+"""
+Pluggable sentiment backends that core_nlp dispatches to.
+
+Every backend takes a text snippet and returns
+    {'sentiment': 'Positive' | 'Negative' | 'Neutral', 'confidence': float, 'backend': name}
+and raises when it cannot produce a real answer, so the caller can try the next
+backend instead of recording a placeholder.
+
+The Groq backend lives in core_nlp next to its prompts; this module holds the base
+class and the local CPU backend built on AdvancedSentimentAnalyzer (keyword weights
+plus TextBlob), which needs no network and answers in well under a millisecond.
+"""
+
+from config import LOCAL_SENTIMENT_MAX_CONFIDENCE
+
+
+class SentimentBackend:
+    name = "base"
+
+    def available(self) -> bool:
+        return True
+
+    def analyze(self, text: str) -> dict:
+        raise NotImplementedError
+
+
+class LocalSentimentBackend(SentimentBackend):
+    name = "local"
+
+    def __init__(self, analyzer=None):
+        self._analyzer = analyzer
+
+    @property
+    def analyzer(self):
+        # Imported lazily: advanced_analysis pulls in pandas and TextBlob
+        if self._analyzer is None:
+            from advanced_analysis import AdvancedSentimentAnalyzer
+            self._analyzer = AdvancedSentimentAnalyzer()
+        return self._analyzer
+
+    def analyze(self, text: str) -> dict:
+        result = self.analyzer.analyze_advanced_sentiment(text)
+        # |raw_score| is unbounded once impact multipliers apply; cap it so a keyword
+        # heuristic never reports more certainty than the LLM's answers
+        confidence = min(abs(float(result['raw_score'])), LOCAL_SENTIMENT_MAX_CONFIDENCE)
+        return {
+            'sentiment': result['sentiment'],
+            'confidence': round(confidence, 4),
+            'raw_score': float(result['raw_score']),
+            'backend': self.name,
+        }
@@ -0,0 +1,284 @@
+# storage.py
+"""
+Insight storage backends behind one interface, selected by STORAGE_BACKEND in config.py.
+
+  "postgres" — PostgresStore: the production database through database.py (connection
+               pool, migrations, partitions and archive).
+  "sqlite"   — SQLiteStore: a single local file (SQLITE_PATH), for running the whole
+               pipeline, the dashboard and benchmarks on a laptop with no external services.
+
+Both backends share the insights schema and (link, ticker) upsert semantics, the
+daily rollup (maintained by triggers, with IST days), the batched InsightWriter and
+the query API: query_insights() pages and query_sentiment_rollup() buckets come back
+with the same columns and dtypes whichever backend served them.
+
+Usage:
+    from storage import get_store
+    store = get_store()
+    store.initialize()
+    writer = store.writer()
+    df, cursor = store.query_insights("INFY", limit=50)
+"""
+
+import os
+import json
+import logging
+import sqlite3
+import threading
+import pandas as pd
+import database
+from database import (InsightWriter, HISTORY_COLUMNS, _insight_columns, _insights_query, _next_cursor,
+                      _rollup_query, _compact, _compact_rollup)
+from config import STORAGE_BACKEND, SQLITE_PATH, HISTORY_PAGE_SIZE
+
+_DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(__file__), SQLITE_PATH)
+
+
+class InsightStore:
+    """The storage interface used by the worker, the scheduler and the dashboard."""
+
+    name = None
+    # Exception types write_rows raises for transient failures; the writer retries these
+    retryable = ()
+
+    def initialize(self):
+        """Creates or migrates the schema. Safe to call on every start."""
+        raise NotImplementedError
+
+    def write_rows(self, rows: list) -> int:
+        """Upserts database._insight_row tuples on (link, ticker) in one transaction; returns the count."""
+        raise NotImplementedError
+
+    def query_insights(self, ticker: str = None, columns=HISTORY_COLUMNS, since=None, until=None,
+                       limit: int = HISTORY_PAGE_SIZE, after: tuple = None):
+        """One page of insights, newest first: (DataFrame, next_cursor). See database.query_insights."""
+        raise NotImplementedError
+
+    def query_sentiment_rollup(self, ticker: str, since=None, until=None) -> pd.DataFrame:
+        """Daily sentiment buckets for `ticker`. See database.query_sentiment_rollup."""
+        raise NotImplementedError
+
+    def change_version(self) -> int:
+        """
+        A number that changes whenever insights are written (by any process). Cheap enough
+        to call every few seconds: callers re-read insights only when it moves.
+        """
+        raise NotImplementedError
+
+    def maintain(self):
+        """Periodic upkeep (partitions, retention); a no-op where there is none. Never raises."""
+
+    def stats(self) -> dict:
+        return {}
+
+    def writer(self, **kwargs) -> InsightWriter:
+        """An InsightWriter whose batches go to this store."""
+        return InsightWriter(write_batch=self.write_rows, retryable=self.retryable, **kwargs)
+
+
+class PostgresStore(InsightStore):
+    name = "postgres"
+    retryable = InsightWriter._RETRYABLE   # connection-level psycopg2 errors
+
+    def __init__(self):
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def initialize(self):
+        database.initialize_db()
+
+    def write_rows(self, rows: list) -> int:
+        # Raises a retryable OperationalError when there is no pool, so nothing is marked processed
+        return database.write_insight_rows(rows)
+
+    def query_insights(self, ticker=None, columns=HISTORY_COLUMNS, since=None, until=None,
+                       limit=HISTORY_PAGE_SIZE, after=None):
+        return database.query_insights(ticker, columns, since, until, limit, after)
+
+    def query_sentiment_rollup(self, ticker, since=None, until=None):
+        return database.query_sentiment_rollup(ticker, since, until)
+
+    def change_version(self) -> int:
+        # One LISTEN connection per process, started on first use; the version is in memory
+        if not database.connection_pool:
+            return 0
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = database.InsightChangeListener().start()
+        return self._listener.version
+
+    def maintain(self):
+        database.maintain_storage()
+
+    def stats(self) -> dict:
+        return database.pool_stats()
+
+
+# The PostgreSQL schema (database.MIGRATIONS) in SQLite terms. Timestamps are UTC text in
+# one fixed format, so they sort and compare as strings; IST days are timestamp + 330 minutes.
+_SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+_SQLITE_DAY = "date({row}.timestamp, '+330 minutes')"
+_SQLITE_BUCKET = (f"ticker = {{row}}.ticker AND day = {_SQLITE_DAY} AND sentiment = {{row}}.sentiment"
+                  " AND event_type = COALESCE({row}.event_type, '')")
+_SQLITE_ROLLUP_REMOVE = f"""
+    UPDATE insight_daily_rollup
+    SET n = n - 1, confidence_sum = confidence_sum - OLD.confidence,
+        impact_sum = impact_sum - COALESCE(OLD.impact_score, 0)
+    WHERE {_SQLITE_BUCKET.format(row="OLD")};
+    DELETE FROM insight_daily_rollup WHERE {_SQLITE_BUCKET.format(row="OLD")} AND n <= 0;
+"""
+_SQLITE_CHANGED = "UPDATE insight_changes SET seq = seq + 1 WHERE id = 1;"
+_SQLITE_ROLLUP_ADD = f"""
+    INSERT INTO insight_daily_rollup (ticker, day, sentiment, event_type, n, confidence_sum, impact_sum)
+    VALUES (NEW.ticker, {_SQLITE_DAY.format(row="NEW")}, NEW.sentiment, COALESCE(NEW.event_type, ''),
+            1, NEW.confidence, COALESCE(NEW.impact_score, 0))
+    ON CONFLICT (ticker, day, sentiment, event_type) DO UPDATE
+    SET n = n + 1, confidence_sum = confidence_sum + excluded.confidence_sum,
+        impact_sum = impact_sum + excluded.impact_sum;
+"""
+_SQLITE_SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS insights (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL DEFAULT ({_SQLITE_NOW}),
+        article_title TEXT NOT NULL, link TEXT, company_name TEXT NOT NULL,
+        ticker TEXT NOT NULL, sentiment TEXT NOT NULL, confidence REAL NOT NULL,
+        event_type TEXT, impact_score REAL, key_figures TEXT
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS insights_link_ticker_key ON insights (link, ticker)",
+    "CREATE INDEX IF NOT EXISTS idx_insights_ticker_timestamp_id ON insights (ticker, timestamp DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_insights_timestamp ON insights (timestamp)",
+    """
+    CREATE TABLE IF NOT EXISTS insight_daily_rollup (
+        ticker TEXT NOT NULL, day TEXT NOT NULL, sentiment TEXT NOT NULL,
+        event_type TEXT NOT NULL DEFAULT '', n INTEGER NOT NULL,
+        confidence_sum REAL NOT NULL, impact_sum REAL NOT NULL,
+        PRIMARY KEY (ticker, day, sentiment, event_type)
+    )
+    """,
+    # The embedded counterpart of migration 7's NOTIFY: a one-row change sequence
+    "CREATE TABLE IF NOT EXISTS insight_changes (id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO insight_changes (id, seq) VALUES (1, 0)",
+    f"CREATE TRIGGER IF NOT EXISTS insights_rollup_insert AFTER INSERT ON insights BEGIN {_SQLITE_ROLLUP_ADD} END",
+    f"CREATE TRIGGER IF NOT EXISTS insights_rollup_delete AFTER DELETE ON insights BEGIN {_SQLITE_ROLLUP_REMOVE} END",
+    "CREATE TRIGGER IF NOT EXISTS insights_rollup_update AFTER UPDATE ON insights"
+    f" BEGIN {_SQLITE_ROLLUP_REMOVE} {_SQLITE_ROLLUP_ADD} END",
+] + [
+    f"CREATE TRIGGER IF NOT EXISTS insights_changed_{op.lower()} AFTER {op} ON insights BEGIN {_SQLITE_CHANGED} END"
+    for op in ("INSERT", "UPDATE", "DELETE")
+]
+_SQLITE_UPSERT = """
+    INSERT INTO insights (article_title, link, company_name, ticker, sentiment,
+                          confidence, event_type, impact_score, key_figures)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (link, ticker) DO UPDATE SET
+        article_title = excluded.article_title, company_name = excluded.company_name,
+        sentiment = excluded.sentiment, confidence = excluded.confidence,
+        event_type = excluded.event_type, impact_score = excluded.impact_score,
+        key_figures = excluded.key_figures
+"""
+
+
+def _sqlite_time(value) -> str:
+    """A timestamp in the stored UTC text format (naive values are taken as UTC)."""
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+class SQLiteStore(InsightStore):
+    """
+    Embedded backend: one SQLite file in WAL mode, so the dashboard can read while the
+    worker writes. Each thread gets its own connection; SQLite serializes the writers.
+    """
+
+    name = "sqlite"
+    # "database is locked" once the busy timeout runs out while another process writes
+    retryable = (sqlite3.OperationalError,)
+
+    def __init__(self, path: str = _DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def initialize(self):
+        with self._init_lock:
+            conn = self._conn()
+            with conn:
+                for statement in _SQLITE_SCHEMA:
+                    conn.execute(statement)
+            self._initialized = True
+        logging.info(f"SQLite insight store ready at {self.path}.")
+
+    def _ready(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.initialize()
+        return self._conn()
+
+    def write_rows(self, rows: list) -> int:
+        # One statement cannot apply two rows for the same key in PostgreSQL; keep the same result here
+        rows = list({(row[1], row[3]): row for row in rows}.values())
+        conn = self._ready()
+        with conn:   # one transaction: commits, or rolls back and re-raises
+            conn.executemany(_SQLITE_UPSERT, [
+                row[:8] + (row[8] if row[8] is None or isinstance(row[8], str) else json.dumps(row[8]),)
+                for row in rows
+            ])
+        return len(rows)
+
+    def query_insights(self, ticker=None, columns=HISTORY_COLUMNS, since=None, until=None,
+                       limit=HISTORY_PAGE_SIZE, after=None):
+        columns = _insight_columns(columns)
+        since, until = (None if t is None else _sqlite_time(t) for t in (since, until))
+        if after is not None:
+            after = (_sqlite_time(after[0]), after[1])
+        query, params = _insights_query(columns, ticker, since, until, limit, after, placeholder="?")
+        df = pd.read_sql_query(query, self._ready(), params=params)
+        next_cursor = _next_cursor(df, limit)
+        df = df[columns].copy()
+        if "key_figures" in df:
+            # JSONB comes back from PostgreSQL as dicts
+            df["key_figures"] = df["key_figures"].map(lambda v: json.loads(v) if isinstance(v, str) else v)
+        return _compact(df), next_cursor
+
+    def query_sentiment_rollup(self, ticker, since=None, until=None):
+        since, until = (None if d is None else pd.Timestamp(d).strftime("%Y-%m-%d") for d in (since, until))
+        query, params = _rollup_query(ticker, since, until, placeholder="?")
+        df = pd.read_sql_query(query, self._ready(), params=params)
+        df["day"] = pd.to_datetime(df["day"]).dt.date
+        return _compact_rollup(df)
+
+    def change_version(self) -> int:
+        return self._ready().execute("SELECT seq FROM insight_changes WHERE id = 1").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "path": self.path,
+                "size_mb": round(os.path.getsize(self.path) / 1e6, 2) if os.path.exists(self.path) else 0.0}
+
+
+BACKENDS = {"postgres": PostgresStore, "sqlite": SQLiteStore}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(backend: str = None) -> InsightStore:
+    """The process-wide store for `backend` (default: STORAGE_BACKEND)."""
+    global _store
+    backend = backend or STORAGE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected one of {sorted(BACKENDS)}")
+    with _store_lock:
+        if _store is None or _store.name != backend:
+            _store = BACKENDS[backend]()
+        return _store
@@ -0,0 +1,134 @@
+# tests/test_company_matcher.py
+"""Unit tests for company_matcher.py — the indexed matcher must agree with a full thefuzz scan,
+and the mention scanner must find every whole-token name occurrence."""
+
+import sys
+import os
+import random
+import pytest
+from thefuzz import fuzz
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from company_matcher import CompanyNameMatcher, MentionScanner
+from ticker_utils import _load_from_csv
+
+THRESHOLD = 90
+
+
+def _linear_scan(ner_name, nse_map):
+    """The original nlp_processor fuzzy lookup, kept here as the reference."""
+    best_name, best_ticker, best_score = None, None, 0
+    for official_name, ticker in nse_map.items():
+        score = fuzz.token_set_ratio(ner_name.lower(), official_name.lower())
+        if score > best_score:
+            best_name, best_ticker, best_score = official_name, ticker, score
+        elif score == best_score and best_name and len(official_name) < len(best_name):
+            best_name, best_ticker = official_name, ticker
+    return best_name, best_ticker, best_score
+
+
+def _expected(ner_name, nse_map, cutoff=THRESHOLD):
+    result = _linear_scan(ner_name, nse_map)
+    return result if result[2] >= cutoff else (None, None, 0)
+
+
+# ---------------------------------------------------------------------------
+# Small map
+# ---------------------------------------------------------------------------
+
+class TestCompanyNameMatcher:
+    def test_exact_is_case_insensitive(self, sample_nse_map):
+        matcher = CompanyNameMatcher(sample_nse_map)
+        assert matcher.exact("infosys limited") == ("Infosys Limited", "INFY")
+        assert matcher.exact("Infy") is None
+
+    def test_typo_matches(self, sample_nse_map):
+        matcher = CompanyNameMatcher(sample_nse_map)
+        name, ticker, score = matcher.best_match("Infosis Limited", score_cutoff=THRESHOLD)
+        assert ticker == "INFY" and score >= THRESHOLD
+
+    def test_below_cutoff_returns_none(self, sample_nse_map):
+        matcher = CompanyNameMatcher(sample_nse_map)
+        assert matcher.best_match("Quarterly results", score_cutoff=THRESHOLD) == (None, None, 0)
+
+    def test_ties_prefer_shorter_then_earlier_name(self):
+        nse_map = {"Alpha Beta Gamma Limited": "ABG", "Alpha Limited": "AL", "Alpha Corp": "AC"}
+        matcher = CompanyNameMatcher(nse_map)
+        # "alpha" is a token subset of every name → all score 100
+        assert matcher.best_match("Alpha", score_cutoff=THRESHOLD) == _expected("Alpha", nse_map)
+
+    def test_empty_query(self, sample_nse_map):
+        matcher = CompanyNameMatcher(sample_nse_map)
+        assert matcher.best_match("!!", score_cutoff=THRESHOLD) == (None, None, 0)
+
+
+# ---------------------------------------------------------------------------
+# Agreement with today's linear scan on the real NSE list
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def nse_map():
+    path = os.path.join(os.path.dirname(__file__), "..", "nse_stocks_enriched.csv")
+    nse_map = _load_from_csv(path)
+    if not nse_map:
+        pytest.skip("nse_stocks_enriched.csv not available")
+    return nse_map
+
+
+class TestAgreementWithLinearScan:
+    def _queries(self, nse_map, n=150):
+        rng = random.Random(42)
+        names = list(nse_map)
+        queries = ["Limited", "Reliance", "HDFC Bank", "Tata Motors", "the", "₹500 crore", "L&T", "Q3"]
+        for _ in range(n):
+            tokens = rng.choice(names).split()
+            query = " ".join(tokens[: rng.randint(1, len(tokens))])
+            if rng.random() < 0.5 and len(query) > 3:   # inject a typo
+                i = rng.randrange(len(query))
+                query = query[:i] + rng.choice("aeiouxyz") + query[i + 1:]
+            queries.append(query)
+        return queries
+
+    def test_same_results_as_linear_scan(self, nse_map):
+        matcher = CompanyNameMatcher(nse_map)
+        for query in self._queries(nse_map):
+            assert matcher.best_match(query, score_cutoff=THRESHOLD) == _expected(query, nse_map), query
+
+    def test_shortlist_is_much_smaller_than_map(self, nse_map):
+        from company_matcher import _process
+        matcher = CompanyNameMatcher(nse_map)
+        assert len(matcher.shortlist(_process("Infosys"), THRESHOLD)) < len(matcher) // 10
+
+
+# ---------------------------------------------------------------------------
+# MentionScanner — Aho-Corasick over normalized names
+# ---------------------------------------------------------------------------
+
+class TestMentionScanner:
+    NAMES = ["state bank of india", "bank of india", "india", "hdfc bank", "larsen   toubro"]
+
+    def _scan(self, text):
+        return [(name, text[start:end]) for name, start, end in MentionScanner(self.NAMES).scan(text)]
+
+    def test_finds_overlapping_and_nested_names(self):
+        hits = self._scan("State Bank of India raised rates")
+        assert ("state bank of india", "State Bank of India") in hits
+        assert ("bank of india", "Bank of India") in hits
+        assert ("india", "India") in hits
+
+    def test_spans_point_into_original_text(self):
+        assert self._scan("Shares of HDFC-Bank fell") == [("hdfc bank", "HDFC-Bank")]
+
+    def test_name_is_returned_as_given(self):
+        assert self._scan("Larsen & Toubro won an order") == [("larsen   toubro", "Larsen & Toubro")]
+
+    def test_does_not_match_inside_longer_words(self):
+        assert self._scan("Indiana and HDFCBank") == []
+
+    def test_failure_links_recover_after_partial_match(self):
+        assert self._scan("state bank hdfc bank") == [("hdfc bank", "hdfc bank")]
+
+    def test_empty_inputs(self):
+        assert self._scan("") == []
+        assert list(MentionScanner([]).scan("State Bank of India")) == []
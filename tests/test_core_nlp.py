@@ -0,0 +1,418 @@
+# tests/test_core_nlp.py
+"""Unit tests for core_nlp.py — the combined article analysis call and its fallback (Groq is mocked)."""
+
+import sys
+import os
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import core_nlp
+from core_nlp import _parse_article_analysis
+
+
+def _completion(text):
+    message = MagicMock()
+    message.content = text
+    return MagicMock(choices=[MagicMock(message=message)])
+
+
+@pytest.fixture
+def groq_client():
+    """A mocked Groq client with the disk cache switched off."""
+    client = MagicMock()
+    with patch.object(core_nlp, "client", client), patch.object(core_nlp, "llm_cache", None):
+        yield client
+
+
+# ---------------------------------------------------------------------------
+# _parse_article_analysis — strict schema check
+# ---------------------------------------------------------------------------
+
+class TestParseArticleAnalysis:
+    def test_valid_response(self):
+        raw = json.dumps({"event_type": "Earnings Report", "sentiments": {"TCS": "positive", "INFY": "Neutral"}})
+        result = _parse_article_analysis(raw, ["TCS", "INFY"])
+        assert result["event_type"] == "Earnings Report"
+        assert result["sentiments"]["TCS"] == {"sentiment": "Positive", "confidence": 0.9, "backend": "groq"}
+        assert result["sentiments"]["INFY"]["sentiment"] == "Neutral"
+
+    @pytest.mark.parametrize("raw", [
+        "Positive",                                                                   # not JSON
+        json.dumps(["Earnings Report"]),                                              # not an object
+        json.dumps({"event_type": "Earnings Report"}),                                # missing sentiments
+        json.dumps({"event_type": "Stock Split", "sentiments": {"TCS": "Positive"}}),  # unknown category
+        json.dumps({"event_type": "Partnership", "sentiments": {}}),                  # ticker missing
+        json.dumps({"event_type": "Partnership", "sentiments": {"TCS": "Positive", "WIPRO": "Negative"}}),
+        json.dumps({"event_type": "Partnership", "sentiments": {"TCS": "Bullish"}}),   # bad label
+        json.dumps({"event_type": "Partnership", "sentiments": {"TCS": 1}}),
+    ])
+    def test_rejects_malformed_responses(self, raw):
+        with pytest.raises(ValueError):
+            _parse_article_analysis(raw, ["TCS"])
+
+
+# ---------------------------------------------------------------------------
+# analyze_article_core
+# ---------------------------------------------------------------------------
+
+class TestAnalyzeArticleCore:
+    def test_single_call_for_all_tickers(self, groq_client):
+        groq_client.chat.completions.create.return_value = _completion(json.dumps({
+            "event_type": "Partnership", "sentiments": {"TCS": "Positive", "INFY": "Negative"},
+        }))
+        result = core_nlp.analyze_article_core("TCS wins deal over Infosys", {"TCS": "TCS wins.", "INFY": "Infosys loses."})
+        assert groq_client.chat.completions.create.call_count == 1
+        assert result["event_type"] == "Partnership"
+        assert result["sentiments"]["INFY"] == {"sentiment": "Negative", "confidence": 0.9, "backend": "groq"}
+
+    def test_falls_back_to_per_call_path_on_bad_json(self, groq_client):
+        groq_client.chat.completions.create.side_effect = [
+            _completion("Sure! Here is the analysis: ..."),   # combined call
+            _completion("Earnings Report"),                   # event type
+            _completion("Positive"),                          # TCS
+            _completion("Negative"),                          # INFY
+        ]
+        result = core_nlp.analyze_article_core("Q3 results", {"TCS": "TCS beat.", "INFY": "Infosys missed."})
+        assert groq_client.chat.completions.create.call_count == 4
+        assert result == {
+            "event_type": "Earnings Report",
+            "sentiments": {"TCS": {"sentiment": "Positive", "confidence": 0.9, "backend": "groq"},
+                           "INFY": {"sentiment": "Negative", "confidence": 0.9, "backend": "groq"}},
+        }
+
+    def test_no_client_returns_defaults(self):
+        with patch.object(core_nlp, "client", None), patch.object(core_nlp, "SENTIMENT_BACKEND", "groq"):
+            result = core_nlp.analyze_article_core("headline", {"TCS": "text"})
+        assert result == {"event_type": "General News",
+                          "sentiments": {"TCS": {"sentiment": "Neutral", "confidence": 0.5}}}
+
+    def test_no_client_uses_local_backend_in_auto_mode(self):
+        with patch.object(core_nlp, "client", None), patch.object(core_nlp, "SENTIMENT_BACKEND", "auto"):
+            result = core_nlp.analyze_article_core("headline", {"TCS": "TCS reports record profit and strong growth"})
+        assert result["sentiments"]["TCS"]["sentiment"] == "Positive"
+        assert result["sentiments"]["TCS"]["backend"] == "local"
+
+    def test_combined_result_is_cached(self, tmp_path):
+        from llm_cache import LLMCache
+        cache = LLMCache(path=str(tmp_path / "llm.db"))
+        client = MagicMock()
+        client.chat.completions.create.return_value = _completion(json.dumps({
+            "event_type": "General News", "sentiments": {"TCS": "Neutral"},
+        }))
+        with patch.object(core_nlp, "client", client), patch.object(core_nlp, "llm_cache", cache):
+            core_nlp.analyze_article_core("headline", {"TCS": "text"})
+            core_nlp.analyze_article_core("headline", {"TCS": "text"})
+        cache.close()
+        assert client.chat.completions.create.call_count == 1
+
+
+# ---------------------------------------------------------------------------
+# Async path — analyze_articles_concurrently
+# ---------------------------------------------------------------------------
+
+class TestAnalyzeArticlesConcurrently:
+    def _async_client(self, replies):
+        client = MagicMock()
+
+        async def complete(messages, max_tokens, **kwargs):
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+        client.complete = complete
+        return client
+
+    def test_results_come_back_in_order(self):
+        replies = [
+            json.dumps({"event_type": "Partnership", "sentiments": {"TCS": "Positive"}}),
+            json.dumps({"event_type": "Earnings Report", "sentiments": {"INFY": "Negative"}}),
+        ]
+        with (
+            patch.object(core_nlp, "async_client", self._async_client(replies)),
+            patch.object(core_nlp, "llm_cache", None),
+        ):
+            results = core_nlp.analyze_articles_concurrently([("a", {"TCS": "x"}), ("b", {"INFY": "y"})])
+        assert [r["event_type"] for r in results] == ["Partnership", "Earnings Report"]
+
+    def test_unavailable_llm_is_reported_not_degraded(self):
+        from llm_client import LLMUnavailableError
+        with (
+            patch.object(core_nlp, "async_client", self._async_client([LLMUnavailableError("429")])),
+            patch.object(core_nlp, "llm_cache", None),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", "groq"),
+        ):
+            (result,) = core_nlp.analyze_articles_concurrently([("a", {"TCS": "x"})])
+        assert isinstance(result, LLMUnavailableError)
+
+    def test_auto_mode_answers_unavailable_requests_locally(self):
+        from llm_client import LLMUnavailableError
+        with (
+            patch.object(core_nlp, "async_client", self._async_client([LLMUnavailableError("429")])),
+            patch.object(core_nlp, "llm_cache", None),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", "auto"),
+        ):
+            (result,) = core_nlp.analyze_articles_concurrently([("a", {"TCS": "TCS shares plunge on fraud probe"})])
+        assert result["event_type"] == "General News"
+        assert result["sentiments"]["TCS"]["sentiment"] == "Negative"
+        assert result["sentiments"]["TCS"]["backend"] == "local"
+
+    def test_local_mode_makes_no_api_calls(self):
+        client = self._async_client([])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "SENTIMENT_BACKEND", "local"):
+            (result,) = core_nlp.analyze_articles_concurrently([("a", {"TCS": "TCS posts strong profit growth"})])
+        assert result["sentiments"]["TCS"]["backend"] == "local"
+
+    def test_malformed_reply_falls_back_to_per_call(self):
+        replies = ["not json", "Product Launch", "Positive"]
+        with (
+            patch.object(core_nlp, "async_client", self._async_client(replies)),
+            patch.object(core_nlp, "llm_cache", None),
+        ):
+            (result,) = core_nlp.analyze_articles_concurrently([("launch", {"TCS": "TCS launches"})])
+        assert result == {"event_type": "Product Launch",
+                          "sentiments": {"TCS": {"sentiment": "Positive", "confidence": 0.9, "backend": "groq"}}}
+
+    def test_rejected_combined_call_falls_back_to_per_call(self):
+        import httpx
+        from groq import BadRequestError
+        response = httpx.Response(400, request=httpx.Request("POST", "https://api.groq.com"))
+        replies = [BadRequestError("json_validate_failed", response=response, body=None),
+                   "Product Launch", RuntimeError("boom")]
+        with (
+            patch.object(core_nlp, "async_client", self._async_client(replies)),
+            patch.object(core_nlp, "llm_cache", None),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", "groq"),
+        ):
+            (result,) = core_nlp.analyze_articles_concurrently([("launch", {"TCS": "TCS launches"})])
+        # With nothing behind Groq the failed per-call sentiment degrades to Neutral, as in the sync path
+        assert result == {"event_type": "Product Launch",
+                          "sentiments": {"TCS": {"sentiment": "Neutral", "confidence": 0.5}}}
+
+    def test_failed_per_call_sentiment_uses_local_backend_in_auto_mode(self):
+        replies = ["not json", "Earnings Report", RuntimeError("boom")]
+        with (
+            patch.object(core_nlp, "async_client", self._async_client(replies)),
+            patch.object(core_nlp, "llm_cache", None),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", "auto"),
+        ):
+            (result,) = core_nlp.analyze_articles_concurrently(
+                [("results", {"TCS": "TCS reports record profit and strong growth"})])
+        assert result["sentiments"]["TCS"]["sentiment"] == "Positive"
+        assert result["sentiments"]["TCS"]["backend"] == "local"
+
+    def test_missing_key_answers_offline_in_auto_mode(self):
+        client = self._async_client([])
+        with (
+            patch.object(core_nlp, "client", None),
+            patch.object(core_nlp, "async_client", client),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", "auto"),
+        ):
+            (result,) = core_nlp.analyze_articles_concurrently([("a", {"TCS": "TCS reports record profit and strong growth"})])
+        assert result["sentiments"]["TCS"]["sentiment"] == "Positive"
+        assert result["sentiments"]["TCS"]["backend"] == "local"
+
+    def test_missing_key_is_reported_unavailable_in_groq_mode(self):
+        from llm_client import LLMUnavailableError
+        with patch.object(core_nlp, "client", None), patch.object(core_nlp, "SENTIMENT_BACKEND", "groq"):
+            (result,) = core_nlp.analyze_articles_concurrently([("a", {"TCS": "x"})])
+        assert isinstance(result, LLMUnavailableError)
+
+
+# ---------------------------------------------------------------------------
+# Batched sentiment prompts
+# ---------------------------------------------------------------------------
+
+class TestParseSentimentBatch:
+    def test_valid_reply(self):
+        result = core_nlp._parse_sentiment_batch("1: Positive\n2. negative\n\n3) Neutral", 3)
+        assert [r["sentiment"] for r in result] == ["Positive", "Negative", "Neutral"]
+
+    def test_out_of_order_lines_are_mapped_by_number(self):
+        result = core_nlp._parse_sentiment_batch("2: Negative\n1: Positive", 2)
+        assert [r["sentiment"] for r in result] == ["Positive", "Negative"]
+
+    @pytest.mark.parametrize("reply", [
+        "1: Positive",                         # missing a label
+        "1: Positive\n2: Bullish",             # invalid label
+        "1: Positive\n1: Negative",            # duplicate number
+        "1: Positive\n2: Negative\n3: Neutral",  # extra label
+        "Here you go:\n1: Positive\n2: Negative",
+    ])
+    def test_rejects_malformed_replies(self, reply):
+        with pytest.raises(ValueError):
+            core_nlp._parse_sentiment_batch(reply, 2)
+
+
+class TestAnalyzeSentimentsBatch:
+    def _async_client(self, replies):
+        client = MagicMock()
+        client.calls = []
+
+        async def complete(messages, max_tokens, **kwargs):
+            client.calls.append(messages[-1]["content"])
+            return replies.pop(0)
+        client.complete = complete
+        return client
+
+    def test_packs_snippets_into_batches(self):
+        client = self._async_client(["1: Positive\n2: Negative", "1: Neutral"])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", None):
+            results = core_nlp.analyze_sentiments_batch(["up", "down", "flat"], batch_size=2)
+        assert [r["sentiment"] for r in results] == ["Positive", "Negative", "Neutral"]
+        assert len(client.calls) == 2
+        assert client.calls[0] == "1: up\n\n2: down"
+
+    def test_output_budget_grows_with_the_batch(self):
+        budgets = []
+
+        async def complete(messages, max_tokens, **kwargs):
+            budgets.append(max_tokens)
+            return "\n".join(f"{i}: Neutral" for i in range(1, messages[-1]["content"].count("\n\n") + 2))
+        client = MagicMock(complete=complete)
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", None):
+            core_nlp.analyze_sentiments_batch([f"s{i}" for i in range(40)], batch_size=30, max_tokens=120)
+        assert budgets == [240, 120]
+
+    def test_malformed_batch_is_retried_one_by_one(self):
+        client = self._async_client(["1: Positive", "Negative", "Positive"])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", None):
+            results = core_nlp.analyze_sentiments_batch(["down", "up"], batch_size=5)
+        assert [r["sentiment"] for r in results] == ["Negative", "Positive"]
+        assert len(client.calls) == 3
+
+    def test_cached_and_empty_texts_are_not_sent(self, tmp_path):
+        from llm_cache import LLMCache, cache_key
+        cache = LLMCache(path=str(tmp_path / "llm.db"))
+        cache.set(cache_key("sentiment", core_nlp.GROQ_MODEL, core_nlp.SENTIMENT_PROMPT_VERSION, "known"),
+                  "sentiment", {"sentiment": "Negative", "confidence": 0.9})
+        client = self._async_client(["1: Positive"])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", cache):
+            results = core_nlp.analyze_sentiments_batch(["known", "", "new"])
+        assert [r["sentiment"] for r in results] == ["Negative", "Neutral", "Positive"]
+        assert client.calls == ["1: new"]
+        # the batched answer is cached for single-snippet calls too
+        assert cache.get(cache_key("sentiment", core_nlp.GROQ_MODEL, core_nlp.SENTIMENT_PROMPT_VERSION, "new"))
+        cache.close()
+
+
+# ---------------------------------------------------------------------------
+# Two-tier cascade
+# ---------------------------------------------------------------------------
+
+class TestClassifyEventTypeLocal:
+    @pytest.mark.parametrize("title, expected", [
+        ("TCS Q3 results: net profit rises 8%", "Earnings Report"),
+        ("Adani Ports acquires stake in Gopalpur port", "Merger or Acquisition"),
+        ("SEBI imposes penalty on brokerage", "Legal or Regulatory Issue"),
+        ("Infosys appoints new CFO", "Executive Change"),
+        ("Markets open flat", "General News"),
+    ])
+    def test_keyword_rules(self, title, expected):
+        assert core_nlp.classify_event_type_local(title) == expected
+
+
+class TestCascade:
+    CONFIDENT = "Record profit, strong growth and a bullish rally"
+    UNCERTAIN = "The company said the meeting took place on Monday"
+
+    @pytest.fixture(autouse=True)
+    def fresh_stats(self):
+        with patch.object(core_nlp, "cascade_stats", core_nlp.CascadeStats()):
+            yield
+
+    def _async_client(self, replies):
+        client = MagicMock()
+        client.calls = []
+
+        async def complete(messages, max_tokens, **kwargs):
+            client.calls.append(json.loads(messages[-1]["content"]))
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+        client.complete = complete
+        return client
+
+    def test_confident_article_makes_no_llm_call(self):
+        client = self._async_client([])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", None):
+            (result,) = core_nlp.cascade_analyze_articles([("TCS wins", {"TCS": self.CONFIDENT})], audit_rate=0)
+        assert client.calls == []
+        assert result["decided_by"] == "local"
+        assert result["sentiments"]["TCS"]["tier"] == "local"
+        assert result["sentiments"]["TCS"]["sentiment"] == "Positive"
+        assert result["timings"]["llm_ms"] == 0.0
+
+    def test_only_uncertain_snippets_are_escalated(self):
+        reply = json.dumps({"event_type": "Partnership", "sentiments": {"INFY": "Negative"}})
+        client = self._async_client([reply])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", None):
+            (result,) = core_nlp.cascade_analyze_articles(
+                [("TCS and Infosys", {"TCS": self.CONFIDENT, "INFY": self.UNCERTAIN})], audit_rate=0
+            )
+        assert list(client.calls[0]["companies"]) == ["INFY"]
+        assert result["sentiments"]["TCS"]["tier"] == "local"
+        assert result["sentiments"]["INFY"] == {"sentiment": "Negative", "confidence": 0.9, "backend": "groq", "tier": "llm"}
+        assert result["event_type"] == "Partnership"
+        assert result["decided_by"] == "mixed"
+        assert set(result["timings"]) == {"local_ms", "llm_ms"}
+        assert core_nlp.cascade_stats.escalated == 1 and core_nlp.cascade_stats.decided_local == 1
+
+    def test_failed_escalation_keeps_local_answer(self):
+        from llm_client import LLMUnavailableError
+        client = self._async_client([LLMUnavailableError("429")])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", None):
+            (result,) = core_nlp.cascade_analyze_articles([("x", {"INFY": self.UNCERTAIN})], audit_rate=0)
+        assert result["sentiments"]["INFY"]["tier"] == "local"
+        assert core_nlp.cascade_stats.escalation_failures == 1
+
+    @pytest.mark.parametrize("backend, groq_client", [("local", MagicMock()), ("auto", None)])
+    def test_nothing_is_escalated_without_the_llm(self, backend, groq_client):
+        client = self._async_client([])
+        with (
+            patch.object(core_nlp, "async_client", client),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", backend),
+            patch.object(core_nlp, "client", groq_client),
+        ):
+            (result,) = core_nlp.cascade_analyze_articles([("x", {"INFY": self.UNCERTAIN})], audit_rate=1.0)
+        assert client.calls == []
+        assert result["decided_by"] == "local"
+        assert result["sentiments"]["INFY"]["tier"] == "local"
+
+    def test_unanswered_escalated_snippet_keeps_local_answer(self):
+        replies = ["not json", "General News", RuntimeError("400")]
+
+        async def complete(messages, max_tokens, **kwargs):
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+        client = MagicMock(complete=complete)
+        with (
+            patch.object(core_nlp, "async_client", client),
+            patch.object(core_nlp, "llm_cache", None),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", "groq"),
+        ):
+            (result,) = core_nlp.cascade_analyze_articles([("x", {"INFY": self.UNCERTAIN})], audit_rate=0)
+        assert replies == []
+        assert result["sentiments"]["INFY"]["tier"] == "local"
+        assert core_nlp.cascade_stats.escalation_failures == 1
+
+    def test_audit_tracks_agreement(self):
+        reply = json.dumps({"event_type": "General News", "sentiments": {"TCS": "Negative"}})
+        client = self._async_client([reply])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", None):
+            (result,) = core_nlp.cascade_analyze_articles([("TCS", {"TCS": self.CONFIDENT})], audit_rate=1.0)
+        assert core_nlp.cascade_stats.audited == 1
+        assert core_nlp.cascade_stats.agreement_rate == 0.0
+        assert result["decided_by"] == "llm"
+        assert "audit agreement 0%" in core_nlp.cascade_stats.summary()
+
+    def test_band_is_configurable(self):
+        client = self._async_client([json.dumps({"event_type": "General News", "sentiments": {"TCS": "Positive"}})])
+        with patch.object(core_nlp, "async_client", client), patch.object(core_nlp, "llm_cache", None):
+            core_nlp.cascade_analyze_articles([("TCS", {"TCS": self.CONFIDENT})], band=(-5, 5), audit_rate=0)
+        assert len(client.calls) == 1
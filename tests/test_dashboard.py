@@ -0,0 +1,48 @@
+# tests/test_dashboard.py
+"""Unit tests for dashboard.py — chart builders on frames loaded from a real (SQLite) store."""
+
+import sys
+import os
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import dashboard
+from storage import SQLiteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "insights.db"))
+    store.initialize()
+    writer = store.writer()
+    writer.add("Infosys wins deal", "https://x.com/1", "Infosys", "INFY",
+               {"sentiment": "Positive", "confidence": 0.9}, "Partnership", 0.9, "{}")
+    writer.flush()
+    return store
+
+
+def _load(store):
+    dashboard.load_insights.clear()
+    with patch("dashboard.get_store", return_value=store):
+        return dashboard.load_insights(limit=10)
+
+
+# ---------------------------------------------------------------------------
+# Insight charts
+# ---------------------------------------------------------------------------
+
+class TestInsightCharts:
+    def test_loaded_insights_have_plain_text_columns(self, store):
+        df = _load(store)
+        assert len(df) == 1
+        assert df["sentiment"].dtype == object and df["event_type"].dtype == object
+
+    def test_event_bar_builds_from_loaded_insights(self, store):
+        fig = dashboard.build_event_bar(_load(store))
+        assert list(fig.data[0].y) == ["Partnership"]
+
+    def test_donut_shows_only_sentiments_present(self, store):
+        fig = dashboard.build_donut(_load(store)["sentiment"].value_counts())
+        assert list(fig.data[0].labels) == ["Positive"]
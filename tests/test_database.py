@@ -0,0 +1,551 @@
+# tests/test_database.py
+"""Unit tests for database.py — the connection pool, batched insight writes, migrations and queries."""
+
+import sys
+import os
+import time
+import threading
+import pytest
+import psycopg2
+import pandas as pd
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import (InsightWriter, initialize_db, run_migrations, query_insights,
+                      query_sentiment_rollup, rebuild_rollup, archive_cold_partitions,
+                      read_archived_insights, save_specific_insight, HealthCheckedPool, PoolMetrics,
+                      InsightChangeListener)
+
+
+def _insight(ticker="RELIANCE"):
+    return ("Title", "https://x.com/1", "Company", ticker,
+            {"sentiment": "Positive", "confidence": 0.9}, "General News", 0.9, "{}")
+
+
+@pytest.fixture
+def mock_pool():
+    """A pool handing out one mock connection; yields (pool, connection)."""
+    conn = MagicMock()
+    pool = MagicMock()
+    pool.getconn.return_value = conn
+    with patch("database.connection_pool", pool):
+        yield pool, conn
+
+
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+
+class TestHealthCheckedPool:
+    @pytest.fixture(autouse=True)
+    def opened(self):
+        """Every connection the pool opens, as mocks."""
+        opened = []
+        def connect(*args, **kw):
+            conn = MagicMock(closed=0)
+            conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            opened.append(conn)
+            return conn
+        with patch("psycopg2.pool.psycopg2.connect", side_effect=connect):
+            yield opened
+
+    def _pool(self, maxconn=2, **kwargs):
+        return HealthCheckedPool(1, maxconn, metrics=PoolMetrics(), **kwargs)
+
+    def test_waits_for_a_connection_and_counts_exhaustion(self):
+        db_pool = self._pool(maxconn=1, timeout=5)
+        conn = db_pool.getconn()
+        threading.Timer(0.05, db_pool.putconn, args=(conn,)).start()
+        assert db_pool.getconn() is conn
+        stats = db_pool.metrics.snapshot()
+        assert stats["exhausted"] == 1 and stats["timeouts"] == 0
+        assert stats["checkout_wait_max_ms"] >= 40
+
+    def test_times_out_when_pool_stays_exhausted(self):
+        db_pool = self._pool(maxconn=1, timeout=0.01)
+        db_pool.getconn()
+        with pytest.raises(psycopg2.pool.PoolError):
+            db_pool.getconn()
+        assert db_pool.metrics.snapshot()["timeouts"] == 1
+
+    def test_stale_idle_connection_is_replaced(self, opened):
+        db_pool = self._pool(healthcheck_seconds=0)
+        conn = db_pool.getconn()
+        db_pool.putconn(conn)
+        conn.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError("gone")
+        time.sleep(0.001)
+
+        fresh = db_pool.getconn()
+        assert fresh is not conn and fresh is opened[-1]
+        conn.close.assert_called_once()
+        assert db_pool.metrics.snapshot()["reconnects"] == 1
+
+    def test_healthy_idle_connection_is_reused(self):
+        db_pool = self._pool(healthcheck_seconds=0)
+        conn = db_pool.getconn()
+        db_pool.putconn(conn)
+        assert db_pool.getconn() is conn
+
+    def test_only_idle_connections_keep_a_return_time(self):
+        db_pool = self._pool(maxconn=3)
+        conns = [db_pool.getconn() for _ in range(3)]
+        for conn in conns:
+            db_pool.putconn(conn)
+        # minconn=1: psycopg2 keeps one and closes the rest on return
+        assert list(db_pool._returned_at) == [id(db_pool._pool[0])]
+
+    def test_metrics_summarize_query_latency(self):
+        metrics = PoolMetrics()
+        for seconds in (0.001, 0.002, 0.003):
+            metrics.record_query(seconds)
+        stats = metrics.snapshot()
+        assert stats["queries"] == 3
+        assert stats["query_max_ms"] == 3.0 and stats["query_avg_ms"] == 2.0
+
+
+# ---------------------------------------------------------------------------
+# InsightWriter
+# ---------------------------------------------------------------------------
+
+class TestInsightWriter:
+    def test_flush_writes_all_rows_in_one_commit(self, mock_pool):
+        pool, conn = mock_pool
+        writer = InsightWriter(batch_size=100, flush_interval=60)
+        with patch("database.execute_values") as mock_values:
+            writer.add(*_insight("RELIANCE"))
+            writer.add(*_insight("INFY"))
+            assert mock_values.call_count == 0
+            assert writer.flush() == 2
+
+        rows = mock_values.call_args.args[2]
+        assert [row[3] for row in rows] == ["RELIANCE", "INFY"]
+        assert rows[0][4:6] == ("Positive", 0.9)
+        conn.commit.assert_called_once()
+        assert len(writer) == 0
+
+    def test_flushes_automatically_at_batch_size(self, mock_pool):
+        writer = InsightWriter(batch_size=2, flush_interval=60)
+        with patch("database.execute_values") as mock_values:
+            writer.add(*_insight())
+            writer.add(*_insight())
+            writer.add(*_insight())
+        assert mock_values.call_count == 1
+        assert len(writer) == 1
+
+    def test_flushes_automatically_when_oldest_row_is_due(self, mock_pool):
+        writer = InsightWriter(batch_size=100, flush_interval=5)
+        with (
+            patch("database.execute_values") as mock_values,
+            patch("database.time.monotonic", side_effect=[100.0, 100.0, 106.0]),
+        ):
+            writer.add(*_insight())
+            writer.add(*_insight())
+        assert mock_values.call_count == 1
+
+    def test_connection_error_is_retried_on_a_fresh_connection(self, mock_pool):
+        pool, conn = mock_pool
+        writer = InsightWriter(backoff_base=0)
+        with patch("database.execute_values", side_effect=[psycopg2.OperationalError("gone"), None]) as mock_values:
+            writer.add(*_insight())
+            assert writer.flush() == 1
+        assert mock_values.call_count == 2
+        pool.putconn.assert_any_call(conn, close=True)
+
+    def test_gives_up_after_max_retries(self, mock_pool):
+        writer = InsightWriter(max_retries=1, backoff_base=0)
+        with patch("database.execute_values", side_effect=psycopg2.OperationalError("gone")) as mock_values:
+            writer.add(*_insight())
+            with pytest.raises(psycopg2.OperationalError):
+                writer.flush()
+        assert mock_values.call_count == 2
+
+    def test_write_commits_a_batch_without_touching_the_buffer(self, mock_pool):
+        writer = InsightWriter(batch_size=100, flush_interval=60, backoff_base=0)
+        with patch("database.execute_values", side_effect=[psycopg2.OperationalError("gone"), None]) as mock_values:
+            assert writer.write([_insight("RELIANCE"), _insight("INFY")]) == 2
+        assert [row[3] for row in mock_values.call_args.args[2]] == ["RELIANCE", "INFY"]
+        assert len(writer) == 0
+
+    def test_failed_write_leaves_nothing_behind(self, mock_pool):
+        writer = InsightWriter(max_retries=0)
+        with patch("database.execute_values", side_effect=psycopg2.OperationalError("gone")):
+            with pytest.raises(psycopg2.OperationalError):
+                writer.write([_insight()])
+        assert len(writer) == 0
+
+    def test_data_error_rolls_back_without_retry(self, mock_pool):
+        pool, conn = mock_pool
+        writer = InsightWriter(backoff_base=0)
+        with patch("database.execute_values", side_effect=psycopg2.DataError("bad row")) as mock_values:
+            writer.add(*_insight())
+            with pytest.raises(psycopg2.DataError):
+                writer.flush()
+        assert mock_values.call_count == 1
+        conn.rollback.assert_called_once()
+
+    def test_fails_without_pool_instead_of_skipping(self):
+        writer = InsightWriter(max_retries=1, backoff_base=0)
+        with (
+            patch("database.connection_pool", None),
+            patch("database._pool_retry_at", float("inf")),
+        ):
+            writer.add(*_insight())
+            # A connection-level error, so callers leave the batch unprocessed for the next cycle
+            with pytest.raises(psycopg2.OperationalError):
+                writer.flush()
+
+    def test_missing_pool_is_recreated(self, mock_pool):
+        pool, conn = mock_pool
+        with (
+            patch("database.connection_pool", None),
+            patch("database._pool_retry_at", 0.0),
+            patch("database._create_pool", return_value=pool) as mock_create,
+            patch("database.execute_values"),
+        ):
+            assert InsightWriter().write([_insight()]) == 1
+        mock_create.assert_called_once()
+        conn.commit.assert_called_once()
+
+    def test_batch_is_an_upsert_on_link_and_ticker(self, mock_pool):
+        pool, conn = mock_pool
+        cursor = conn.cursor.return_value.__enter__.return_value
+        writer = InsightWriter()
+        with patch("database.execute_values") as mock_values:
+            writer.add(*_insight("RELIANCE"))
+            writer.flush()
+        sql = " ".join(mock_values.call_args.args[1].split())
+        # New keys are claimed in insight_keys; existing ones update the row they point at
+        assert "INSERT INTO insight_keys (link, ticker, id, timestamp)" in sql
+        assert "ON CONFLICT (link, ticker) DO NOTHING RETURNING link, ticker, id, timestamp" in sql
+        assert "FROM v JOIN insight_keys k ON k.link = v.link AND k.ticker = v.ticker" in sql
+        assert "WHERE i.id = k.id AND i.timestamp = k.timestamp" in sql
+        assert "SELECT c.id, c.timestamp, v.* FROM v JOIN claimed c" in sql
+        # The lock orders concurrent writers so a repeat of a just-claimed key is not dropped
+        assert cursor.execute.call_args_list[0].args[0] == "SELECT pg_advisory_xact_lock(%s)"
+
+    def test_single_insight_uses_the_same_upsert(self, mock_pool):
+        pool, conn = mock_pool
+        with patch("database.execute_values") as mock_values:
+            save_specific_insight(*_insight("INFY"))
+        assert [row[3] for row in mock_values.call_args.args[2]] == ["INFY"]
+        conn.commit.assert_called_once()
+
+    def test_writing_the_same_keys_twice_leaves_one_row(self, mock_pool):
+        from database import write_insight_rows, _insight_row
+        pool, conn = mock_pool
+        cursor = conn.cursor.return_value.__enter__.return_value
+        table = {}
+
+        def upsert(cursor, sql, rows, **kwargs):
+            # Mirrors _UPSERT_SQL: claim new keys, UPDATE the rows of the existing ones
+            assert "ON CONFLICT (link, ticker) DO NOTHING" in sql and "UPDATE insights" in sql
+            for row in rows:
+                table[(row[1], row[3])] = row
+
+        first = _insight_row(*_insight("RELIANCE"))
+        second = list(_insight("RELIANCE"))
+        second[4] = {"sentiment": "Negative", "confidence": 0.7}
+        with patch("database.execute_values", side_effect=upsert):
+            write_insight_rows([first])
+            write_insight_rows([_insight_row(*second)])
+
+        assert list(table) == [("https://x.com/1", "RELIANCE")]
+        assert table[("https://x.com/1", "RELIANCE")][4] == "Negative"
+        # Each transaction takes the writer lock before its upsert
+        locks = [c for c in cursor.execute.call_args_list if c.args[0] == "SELECT pg_advisory_xact_lock(%s)"]
+        assert len(locks) == 2 and conn.commit.call_count == 2
+
+    def test_repeated_key_in_one_batch_keeps_the_latest_row(self, mock_pool):
+        writer = InsightWriter()
+        updated = list(_insight("RELIANCE"))
+        updated[4] = {"sentiment": "Negative", "confidence": 0.7}
+        with patch("database.execute_values") as mock_values:
+            writer.add(*_insight("RELIANCE"))
+            writer.add(*_insight("INFY"))
+            writer.add(*updated)
+            assert writer.flush() == 2
+        rows = mock_values.call_args.args[2]
+        assert [(row[3], row[4]) for row in rows] == [("RELIANCE", "Negative"), ("INFY", "Positive")]
+
+
+# ---------------------------------------------------------------------------
+# Schema migrations
+# ---------------------------------------------------------------------------
+
+class TestRunMigrations:
+    def _cursor(self, conn, applied):
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [(v,) for v in applied]
+        return cursor
+
+    def _statements(self, cursor):
+        return [" ".join(c.args[0].split()) for c in cursor.execute.call_args_list]
+
+    def test_fresh_database_applies_every_migration_in_order(self):
+        from database import MIGRATIONS
+        conn = MagicMock()
+        cursor = self._cursor(conn, applied=[])
+        assert run_migrations(conn) == [v for v, _, _ in MIGRATIONS]
+
+        statements = self._statements(cursor)
+        assert "CREATE UNIQUE INDEX IF NOT EXISTS insights_link_ticker_key ON insights (link, ticker)" in statements
+        assert any("ON insights (ticker, timestamp DESC)" in s for s in statements)
+        assert any("WHERE sentiment <> 'Neutral'" in s for s in statements)
+        recorded = [c.args[1][0] for c in cursor.execute.call_args_list
+                    if c.args[0].startswith("INSERT INTO schema_migrations")]
+        assert recorded == [v for v, _, _ in MIGRATIONS]
+
+    def test_applied_migrations_are_skipped(self):
+        from database import MIGRATIONS
+        conn = MagicMock()
+        cursor = self._cursor(conn, applied=[v for v, _, _ in MIGRATIONS])
+        assert run_migrations(conn) == []
+        assert not any(s.startswith(("CREATE INDEX", "CREATE UNIQUE", "DELETE")) for s in self._statements(cursor))
+
+    def test_failed_migration_rolls_back_and_releases_lock(self):
+        conn = MagicMock()
+        cursor = self._cursor(conn, applied=[1])
+        cursor.execute.side_effect = lambda sql, *args: (_ for _ in ()).throw(
+            psycopg2.ProgrammingError("boom")) if sql.lstrip().startswith("DELETE") else None
+        with pytest.raises(psycopg2.ProgrammingError):
+            run_migrations(conn)
+        conn.rollback.assert_called_once()
+        assert self._statements(cursor)[-1] == "SELECT pg_advisory_unlock(%s)"
+
+    def test_initialize_db_runs_migrations(self, mock_pool):
+        pool, conn = mock_pool
+        with patch("database.run_migrations") as mock_run, patch("database.ensure_partitions") as mock_parts:
+            initialize_db()
+        mock_run.assert_called_once_with(conn)
+        mock_parts.assert_called_once_with(conn)
+        pool.putconn.assert_called_once()
+
+
+# ---------------------------------------------------------------------------
+# query_insights
+# ---------------------------------------------------------------------------
+
+class TestQueryInsights:
+    def _rows(self, n, start_id=100):
+        return pd.DataFrame({
+            "timestamp": pd.date_range("2026-01-10", periods=n, freq="-1h", tz="UTC"),
+            "sentiment": ["Positive", "Negative", "Neutral"] * (n // 3) + ["Positive"] * (n % 3),
+            "confidence": [0.9] * n,
+            "id": range(start_id, start_id - n, -1),
+        })
+
+    def test_reads_only_requested_columns_with_compact_dtypes(self, mock_pool):
+        with patch("database.pd.read_sql_query", return_value=self._rows(3)) as mock_read:
+            df, cursor = query_insights("INFY", columns=("timestamp", "sentiment", "confidence"), limit=10)
+
+        sql = mock_read.call_args.args[0]
+        assert sql.startswith("SELECT timestamp, sentiment, confidence, id FROM insights WHERE ticker = %s")
+        assert sql.endswith("ORDER BY timestamp DESC, id DESC LIMIT %s")
+        assert mock_read.call_args.kwargs["params"] == ("INFY", 10)
+        assert list(df.columns) == ["timestamp", "sentiment", "confidence"]
+        assert isinstance(df["sentiment"].dtype, pd.CategoricalDtype)
+        assert df["confidence"].dtype == "float32"
+        assert cursor is None   # fewer rows than the limit: last page
+
+    def test_full_page_returns_keyset_cursor_for_the_next_page(self, mock_pool):
+        with patch("database.pd.read_sql_query", return_value=self._rows(3)):
+            _, cursor = query_insights("INFY", limit=3)
+        assert cursor[1] == 98
+        assert cursor[0] == pd.Timestamp("2026-01-09 22:00", tz="UTC")
+
+        with patch("database.pd.read_sql_query", return_value=self._rows(0)) as mock_read:
+            query_insights("INFY", since="2026-01-01", limit=3, after=cursor)
+        sql = mock_read.call_args.args[0]
+        assert "timestamp >= %s AND (timestamp, id) < (%s, %s)" in sql
+        assert mock_read.call_args.kwargs["params"][-3:] == (cursor[0], 98, 3)
+
+    def test_rejects_unknown_columns(self, mock_pool):
+        with pytest.raises(ValueError):
+            query_insights("INFY", columns=("timestamp", "1; DROP TABLE insights"))
+
+    def test_returns_empty_frame_without_pool(self):
+        with patch("database.connection_pool", None):
+            df, cursor = query_insights("INFY")
+        assert df.empty and cursor is None
+
+
+# ---------------------------------------------------------------------------
+# Daily sentiment rollup
+# ---------------------------------------------------------------------------
+
+class TestSentimentRollup:
+    def test_migration_installs_trigger_and_backfills(self):
+        from database import MIGRATIONS
+        statements = [" ".join(sql.split()) for version, _, sqls in MIGRATIONS if version == 5 for sql in sqls]
+        assert statements[0] == "LOCK TABLE insights IN SHARE MODE"
+        assert any("AFTER INSERT OR UPDATE OR DELETE ON insights" in sql for sql in statements)
+        assert statements[-1].startswith("INSERT INTO insight_daily_rollup")
+
+    def test_query_returns_compact_daily_buckets(self, mock_pool):
+        rows = pd.DataFrame({
+            "day": ["2026-01-09", "2026-01-10"], "sentiment": ["Positive", "Negative"],
+            "event_type": ["Earnings Report", ""], "count": [3, 1],
+            "mean_confidence": [0.8, 0.6], "impact_sum": [3.3, 0.6],
+        })
+        with patch("database.pd.read_sql_query", return_value=rows) as mock_read:
+            df = query_sentiment_rollup("INFY", since="2026-01-01")
+        sql = mock_read.call_args.args[0]
+        assert "FROM insight_daily_rollup WHERE ticker = %s AND day >= %s" in sql
+        assert mock_read.call_args.kwargs["params"] == ("INFY", "2026-01-01")
+        assert isinstance(df["sentiment"].dtype, pd.CategoricalDtype)
+        assert df["count"].dtype == "int32" and df["mean_confidence"].dtype == "float32"
+
+    def test_rebuild_replaces_rollup_in_one_transaction(self):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.rowcount = 42
+        assert rebuild_rollup(conn) == 42
+        statements = [" ".join(c.args[0].split()) for c in cursor.execute.call_args_list]
+        assert statements[0] == "LOCK TABLE insights IN SHARE MODE"
+        # Days that only exist in the archive keep their rollup rows
+        assert statements[1].startswith("DELETE FROM insight_daily_rollup WHERE day >= COALESCE(")
+        conn.commit.assert_called_once()
+
+    def test_failed_rebuild_rolls_back(self):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = [None, None, psycopg2.OperationalError("gone")]
+        with pytest.raises(psycopg2.OperationalError):
+            rebuild_rollup(conn)
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Partitions and the Parquet archive
+# ---------------------------------------------------------------------------
+
+class TestPartitionsAndArchive:
+    def _partitions_conn(self, names):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [(name,) for name in names]
+        return conn, cursor
+
+    def _month(self, month):
+        return pd.DataFrame({
+            "id": [1, 2], "timestamp": pd.to_datetime([f"{month}-03", f"{month}-20"]).tz_localize("UTC"),
+            "article_title": ["a", "b"], "link": ["l1", "l2"], "company_name": ["C", "C"],
+            "ticker": ["INFY", "INFY"], "sentiment": ["Positive", "Neutral"], "confidence": [0.9, 0.5],
+            "event_type": ["General News", None], "impact_score": [0.9, None],
+            "key_figures": [{"revenue": "1 cr"}, None],
+        })
+
+    def test_migration_moves_rows_into_a_partitioned_table(self):
+        from database import MIGRATIONS
+        statements = [" ".join(sql.split()) for version, _, sqls in MIGRATIONS if version == 6 for sql in sqls]
+        assert statements[0] == "LOCK TABLE insights IN ACCESS EXCLUSIVE MODE"
+        create = next(s for s in statements if s.startswith("CREATE TABLE insights ("))
+        assert create.endswith("PRIMARY KEY (id, timestamp) ) PARTITION BY RANGE (timestamp)")
+        copy = statements.index(next(s for s in statements if s.startswith("INSERT INTO insights")))
+        trigger = statements.index(next(s for s in statements if s.startswith("CREATE TRIGGER insights_rollup")))
+        # The rollup already counts the copied rows
+        assert copy < trigger
+        assert "DROP TABLE insights_unpartitioned" in statements
+
+    def test_key_table_enforces_one_row_per_link_and_ticker(self):
+        from database import MIGRATIONS
+        statements = [" ".join(sql.split()) for version, _, sqls in MIGRATIONS if version == 8 for sql in sqls]
+        assert statements[0] == "LOCK TABLE insights IN SHARE MODE"
+        dedupe = statements.index(next(s for s in statements if s.startswith("DELETE FROM insights a")))
+        create = statements.index(next(s for s in statements if s.startswith("CREATE TABLE IF NOT EXISTS insight_keys")))
+        backfill = statements.index(next(s for s in statements if s.startswith("INSERT INTO insight_keys")))
+        fkey = statements.index(next(s for s in statements if "FOREIGN KEY" in s))
+        # Duplicates written since migration 6 go before the keys are backfilled and enforced
+        assert dedupe < create < backfill < fkey
+        assert "PRIMARY KEY (link, ticker)" in statements[create]
+        # insight_keys is not partitioned, so dropping a month keeps its keys
+        assert "PARTITION BY" not in statements[create]
+        assert statements[fkey].endswith("FOREIGN KEY (id, timestamp, link, ticker)"
+                                         " REFERENCES insight_keys (id, timestamp, link, ticker)")
+
+    def test_old_partitions_are_exported_then_dropped(self, tmp_path):
+        conn, cursor = self._partitions_conn(["insights_p2020_02", "insights_p2020_01", "insights_p2999_01"])
+        with patch("database.pd.read_sql_query", side_effect=[self._month("2020-01"), self._month("2020-02")]):
+            written = archive_cold_partitions(conn, hot_months=12, archive_dir=str(tmp_path))
+
+        assert [os.path.basename(p) for p in written] == ["insights_2020_01.parquet", "insights_2020_02.parquet"]
+        statements = [c.args[0] for c in cursor.execute.call_args_list]
+        assert "ALTER TABLE insights DETACH PARTITION insights_p2020_01" in statements
+        assert "DROP TABLE insights_p2020_02" in statements
+        assert not any("insights_p2999_01" in s for s in statements)
+        archived = pd.read_parquet(written[0])
+        assert len(archived) == 2 and archived["key_figures"][0] == '{"revenue": "1 cr"}'
+
+    def test_unexpected_partition_names_are_ignored(self, tmp_path):
+        conn, cursor = self._partitions_conn(["insights_p2020_01; DROP TABLE stocks"])
+        with patch("database.pd.read_sql_query") as mock_read:
+            assert archive_cold_partitions(conn, archive_dir=str(tmp_path)) == []
+        mock_read.assert_not_called()
+
+    def test_read_archive_prunes_files_and_columns(self, tmp_path):
+        for month in ("2020-01", "2020-02"):
+            self._month(month).assign(key_figures=None).to_parquet(
+                tmp_path / f"insights_{month.replace('-', '_')}.parquet")
+        df = read_archived_insights(columns=["timestamp", "sentiment"], since="2020-01-10",
+                                    until="2020-02-10", archive_dir=str(tmp_path))
+        assert list(df.columns) == ["timestamp", "sentiment"]
+        assert list(df["timestamp"].dt.day) == [20, 3]
+
+    def test_missing_archive_reads_as_empty(self, tmp_path):
+        df = read_archived_insights(archive_dir=str(tmp_path / "none"))
+        assert df.empty and "ticker" in df.columns
+
+
+# ---------------------------------------------------------------------------
+# Change notifications
+# ---------------------------------------------------------------------------
+
+class TestInsightChangeListener:
+    def _wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return condition()
+
+    def test_migration_notifies_once_per_statement(self):
+        from database import MIGRATIONS
+        statements = [" ".join(sql.split()) for version, _, sqls in MIGRATIONS if version == 7 for sql in sqls]
+        assert any("pg_notify('insights_changed', TG_OP)" in s for s in statements)
+        assert statements[-1].endswith("FOR EACH STATEMENT EXECUTE FUNCTION insights_notify()")
+
+    def test_notifications_bump_the_version(self):
+        conn = MagicMock()
+        conn.notifies = []
+        polls = iter([["n1"], [], ["n2", "n3"]])
+        conn.poll.side_effect = lambda: conn.notifies.extend(next(polls, []))
+        listener = InsightChangeListener(connect=lambda: conn, timeout=0.01)
+        with patch("database.select.select", return_value=([conn], [], [])):
+            listener.start()
+            try:
+                # 1 for connecting, then one per poll that returned notifications
+                assert self._wait_for(lambda: listener.version == 3)
+            finally:
+                listener.stop()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with('LISTEN "insights_changed"')
+        assert conn.autocommit is True
+
+    def test_reconnects_after_connection_loss(self):
+        conns = [MagicMock(), MagicMock()]
+        conns[0].poll.side_effect = psycopg2.OperationalError("server closed the connection")
+        conns[1].notifies = []
+        connect = MagicMock(side_effect=conns + [conns[1]] * 10)
+        listener = InsightChangeListener(connect=connect, timeout=0.01)
+        with (
+            patch("database.select.select", return_value=([], [], [])) as mock_select,
+            patch.object(listener._stopped, "wait"),
+        ):
+            mock_select.side_effect = lambda r, w, x, t: ([conns[0]], [], []) if r == [conns[0]] else ([], [], [])
+            listener.start()
+            try:
+                assert self._wait_for(lambda: connect.call_count >= 2 and listener.version >= 2)
+            finally:
+                listener.stop()
+        conns[0].close.assert_called_once()
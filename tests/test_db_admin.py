@@ -0,0 +1,61 @@
+# tests/test_db_admin.py
+"""Unit tests for db_admin.py — command dispatch with a mocked connection pool."""
+
+import sys
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import db_admin
+
+
+@pytest.fixture
+def mock_pool():
+    conn = MagicMock()
+    with (
+        patch("db_admin.connection_pool", MagicMock()),
+        patch("db_admin.get_db_connection", return_value=conn),
+        patch("db_admin.release_db_connection") as mock_release,
+    ):
+        yield conn, mock_release
+
+
+class TestDbAdmin:
+    def test_migrate(self, mock_pool):
+        conn, mock_release = mock_pool
+        with patch("db_admin.run_migrations", return_value=[5]) as mock_run:
+            assert db_admin.main(["migrate"]) == 0
+        mock_run.assert_called_once_with(conn)
+        mock_release.assert_called_once_with(conn)
+
+    def test_rebuild_rollup_migrates_first(self, mock_pool):
+        conn, _ = mock_pool
+        calls = []
+        with (
+            patch("db_admin.run_migrations", side_effect=lambda c: calls.append("migrate")),
+            patch("db_admin.rebuild_rollup", side_effect=lambda c: calls.append("rebuild")),
+        ):
+            assert db_admin.main(["rebuild-rollup"]) == 0
+        assert calls == ["migrate", "rebuild"]
+
+    def test_archive(self, mock_pool):
+        conn, _ = mock_pool
+        with patch("db_admin.archive_cold_partitions", return_value=["a.parquet"]) as mock_archive:
+            assert db_admin.main(["archive"]) == 0
+        mock_archive.assert_called_once_with(conn)
+
+    def test_failure_returns_nonzero_and_releases_connection(self, mock_pool):
+        conn, mock_release = mock_pool
+        with patch("db_admin.run_migrations", side_effect=Exception("boom")):
+            assert db_admin.main(["migrate"]) == 1
+        mock_release.assert_called_once_with(conn)
+
+    def test_no_pool(self):
+        with patch("db_admin.connection_pool", None):
+            assert db_admin.main(["migrate"]) == 1
+
+    def test_unknown_command_exits(self):
+        with pytest.raises(SystemExit):
+            db_admin.main(["vacuum-everything"])
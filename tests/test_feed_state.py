@@ -0,0 +1,100 @@
+# tests/test_feed_state.py
+"""Unit tests for feed_state.py — conditional GET validators and entry watermarks."""
+
+import sys
+import os
+import json
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from feed_state import FeedStateStore, entry_guid
+
+FEED = "https://example.com/rss"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeedStateStore(path=str(tmp_path / "feed_state.json"), max_guids=3)
+
+
+# ---------------------------------------------------------------------------
+# entry_guid
+# ---------------------------------------------------------------------------
+
+class TestEntryGuid:
+    def test_prefers_id(self):
+        assert entry_guid({"id": "guid-1", "link": "https://x/1"}) == "guid-1"
+
+    def test_falls_back_to_link(self):
+        assert entry_guid({"link": "https://x/1"}) == "https://x/1"
+
+    def test_empty_entry(self):
+        assert entry_guid({}) == ""
+
+
+# ---------------------------------------------------------------------------
+# Validators
+# ---------------------------------------------------------------------------
+
+class TestValidators:
+    def test_unknown_feed_has_no_headers(self, store):
+        assert store.conditional_headers(FEED) == {}
+
+    def test_headers_built_from_saved_validators(self, store):
+        store.update_validators(FEED, etag='"abc"', modified="Tue, 01 Oct 2024 10:00:00 GMT")
+        headers = store.conditional_headers(FEED)
+        assert headers["If-None-Match"] == '"abc"'
+        assert headers["If-Modified-Since"] == "Tue, 01 Oct 2024 10:00:00 GMT"
+
+    def test_persisted_between_instances(self, store):
+        store.update_validators(FEED, etag='"abc"')
+        store.save()
+        reloaded = FeedStateStore(path=store.path)
+        assert reloaded.validators(FEED) == ('"abc"', None)
+
+    def test_corrupt_state_file_starts_empty(self, tmp_path):
+        path = tmp_path / "feed_state.json"
+        path.write_text("{not json")
+        assert FeedStateStore(path=str(path)).validators(FEED) == (None, None)
+
+
+# ---------------------------------------------------------------------------
+# Watermark
+# ---------------------------------------------------------------------------
+
+class TestWatermark:
+    def test_filters_seen_entries(self, store):
+        entries = [{"id": "a"}, {"id": "b"}]
+        store.mark_seen(FEED, entries[:1])
+        assert store.filter_new(FEED, entries) == [{"id": "b"}]
+
+    def test_watermark_is_per_feed(self, store):
+        store.mark_seen(FEED, [{"id": "a"}])
+        assert store.filter_new("https://other.example.com/rss", [{"id": "a"}]) == [{"id": "a"}]
+
+    def test_watermark_is_bounded(self, store):
+        store.mark_seen(FEED, [{"id": g} for g in "abcde"])
+        # max_guids=3 → the two oldest GUIDs are forgotten
+        assert [e["id"] for e in store.filter_new(FEED, [{"id": g} for g in "abcde"])] == ["a", "b"]
+
+    def test_save_is_noop_when_clean(self, store):
+        store.save()
+        assert not os.path.exists(store.path)
+
+    def test_saved_file_is_json(self, store):
+        store.mark_seen(FEED, [{"id": "a"}])
+        store.save()
+        with open(store.path) as f:
+            assert json.load(f)[FEED]["seen"] == ["a"]
+
+    def test_deferred_validators_wait_for_every_guid(self, store):
+        store.defer_validators(FEED, etag='"v2"', entries=[{"id": "a"}, {"id": "b"}])
+        store.mark_guids(FEED, ["a"])
+        assert store.validators(FEED) == (None, None)
+        store.mark_guids(FEED, ["b"])
+        assert store.validators(FEED) == ('"v2"', None)
+
+    def test_deferred_validators_without_guids_are_cached_at_once(self, store):
+        store.defer_validators(FEED, etag='"v2"')
+        assert store.validators(FEED) == ('"v2"', None)
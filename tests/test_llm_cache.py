@@ -0,0 +1,126 @@
+# tests/test_llm_cache.py
+"""Unit tests for llm_cache.py and the cached Groq calls in core_nlp."""
+
+import sys
+import os
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from llm_cache import LLMCache, cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    store = LLMCache(path=str(tmp_path / "llm.db"))
+    yield store
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# cache_key
+# ---------------------------------------------------------------------------
+
+class TestCacheKey:
+    def test_whitespace_differences_share_a_key(self):
+        assert cache_key("sentiment", "m", "1", "Profit  rises\n") == cache_key("sentiment", "m", "1", "Profit rises")
+
+    def test_model_and_prompt_version_change_the_key(self):
+        base = cache_key("sentiment", "m", "1", "text")
+        assert cache_key("sentiment", "other", "1", "text") != base
+        assert cache_key("sentiment", "m", "2", "text") != base
+        assert cache_key("event_type", "m", "1", "text") != base
+
+
+# ---------------------------------------------------------------------------
+# LLMCache
+# ---------------------------------------------------------------------------
+
+class TestLLMCache:
+    def test_round_trip(self, cache):
+        cache.set("k", "sentiment", {"sentiment": "Positive", "confidence": 0.9})
+        assert cache.get("k") == {"sentiment": "Positive", "confidence": 0.9}
+
+    def test_missing_key_returns_none(self, cache):
+        assert cache.get("nope") is None
+
+    def test_expired_entry_is_dropped(self, cache):
+        cache.set("k", "event_type", "Earnings Report")
+        with patch("llm_cache.time.time", return_value=cache.ttl + 1e10):
+            assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "llm.db")
+        first = LLMCache(path=path)
+        first.set("k", "event_type", "Partnership")
+        first.close()
+        second = LLMCache(path=path)
+        assert second.get("k") == "Partnership"
+        second.close()
+
+    def test_evicts_least_recently_used_beyond_max_entries(self, tmp_path):
+        store = LLMCache(path=str(tmp_path / "llm.db"), max_entries=2)
+        now = time.time()
+        with patch("llm_cache.time.time", side_effect=[now + i for i in range(5)]):
+            store.set("a", "t", 1)
+            store.set("b", "t", 2)
+            store.get("a")         # "b" is now the least recently used
+            store.set("c", "t", 3)
+            store.evict()
+        assert store.get("b") is None
+        assert store.get("a") == 1 and store.get("c") == 3
+        store.close()
+
+
+# ---------------------------------------------------------------------------
+# core_nlp — Groq calls go through the cache
+# ---------------------------------------------------------------------------
+
+def _completion(text):
+    message = MagicMock()
+    message.content = text
+    return MagicMock(choices=[MagicMock(message=message)])
+
+
+class TestCoreNlpCaching:
+    def test_repeated_text_costs_one_groq_call(self, cache):
+        import core_nlp
+        client = MagicMock()
+        client.chat.completions.create.return_value = _completion("Positive")
+        with patch.object(core_nlp, "client", client), patch.object(core_nlp, "llm_cache", cache):
+            first = core_nlp.analyze_sentiment_core("Reliance profit jumps 20%")
+            second = core_nlp.analyze_sentiment_core("Reliance  profit jumps 20%")
+        assert first == second == {"sentiment": "Positive", "confidence": 0.9, "backend": "groq"}
+        assert client.chat.completions.create.call_count == 1
+
+    def test_event_type_is_cached(self, cache):
+        import core_nlp
+        client = MagicMock()
+        client.chat.completions.create.return_value = _completion("Earnings Report")
+        with patch.object(core_nlp, "client", client), patch.object(core_nlp, "llm_cache", cache):
+            core_nlp.classify_event_type_core("TCS Q3 results")
+            assert core_nlp.classify_event_type_core("TCS Q3 results") == "Earnings Report"
+        assert client.chat.completions.create.call_count == 1
+
+    def test_failures_are_not_cached(self, cache):
+        import core_nlp
+        client = MagicMock()
+        client.chat.completions.create.side_effect = [Exception("429 rate limited"), _completion("Negative")]
+        with (
+            patch.object(core_nlp, "client", client),
+            patch.object(core_nlp, "llm_cache", cache),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", "groq"),
+        ):
+            assert core_nlp.analyze_sentiment_core("Infosys misses estimates")["sentiment"] == "Neutral"
+            assert core_nlp.analyze_sentiment_core("Infosys misses estimates")["sentiment"] == "Negative"
+        assert client.chat.completions.create.call_count == 2
+
+    def test_works_without_cache(self):
+        import core_nlp
+        client = MagicMock()
+        client.chat.completions.create.return_value = _completion("Neutral")
+        with patch.object(core_nlp, "client", client), patch.object(core_nlp, "llm_cache", None):
+            assert core_nlp.analyze_sentiment_core("text")["sentiment"] == "Neutral"
@@ -0,0 +1,153 @@
+# tests/test_llm_client.py
+"""Unit tests for llm_client.py — rate limiting, retries and request coalescing (Groq is mocked)."""
+
+import sys
+import os
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch, MagicMock
+from groq import RateLimitError, BadRequestError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from llm_client import AsyncLLMClient, TokenBucket, LLMUnavailableError
+
+
+def _rate_limit_error(retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://api.groq.com"))
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def _completion(text):
+    message = MagicMock()
+    message.content = text
+    return MagicMock(choices=[MagicMock(message=message)])
+
+
+class FakeGroq:
+    """Async stand-in for AsyncGroq: replays `outcomes` and records concurrency."""
+    def __init__(self, outcomes=None, delay=0.0):
+        self.outcomes = list(outcomes or [])
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.chat = MagicMock()
+        self.chat.completions.create = self.create
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+            if isinstance(outcome, Exception):
+                raise outcome
+            return _completion(outcome)
+        finally:
+            self.active -= 1
+
+
+def _client(fake, **kwargs):
+    kwargs.setdefault("requests_per_minute", 6000)
+    kwargs.setdefault("tokens_per_minute", 10 ** 7)
+    kwargs.setdefault("backoff_base", 0.001)
+    return AsyncLLMClient(client=fake, **kwargs)
+
+
+MESSAGES = [{"role": "user", "content": "Reliance profit jumps"}]
+
+
+# ---------------------------------------------------------------------------
+# TokenBucket
+# ---------------------------------------------------------------------------
+
+class TestTokenBucket:
+    def test_full_bucket_has_no_wait(self):
+        assert TokenBucket(60).wait_time(1) == 0
+
+    def test_empty_bucket_waits_for_refill(self):
+        bucket = TokenBucket(60)   # one unit per second
+        bucket.take(60)
+        assert 0.9 < bucket.wait_time(1) <= 1.0
+
+    def test_requests_larger_than_capacity_are_capped(self):
+        bucket = TokenBucket(60)
+        assert bucket.wait_time(10_000) == 0
+
+
+# ---------------------------------------------------------------------------
+# AsyncLLMClient
+# ---------------------------------------------------------------------------
+
+class TestAsyncLLMClient:
+    def test_returns_message_content(self):
+        fake = FakeGroq(["Positive"])
+        assert asyncio.run(_client(fake).complete(MESSAGES, max_tokens=10)) == "Positive"
+
+    def test_identical_inflight_requests_are_coalesced(self):
+        fake = FakeGroq(delay=0.05)
+        client = _client(fake)
+
+        async def burst():
+            return await asyncio.gather(*(client.complete(MESSAGES, max_tokens=10) for _ in range(5)))
+        assert asyncio.run(burst()) == ["ok"] * 5
+        assert fake.calls == 1
+
+    def test_concurrency_is_bounded(self):
+        fake = FakeGroq(delay=0.02)
+        client = _client(fake, max_concurrency=2)
+
+        async def burst():
+            await asyncio.gather(*(
+                client.complete([{"role": "user", "content": f"headline {i}"}], max_tokens=10) for i in range(6)
+            ))
+        asyncio.run(burst())
+        assert fake.calls == 6
+        assert fake.max_active == 2
+
+    def test_retries_rate_limit_then_succeeds(self):
+        fake = FakeGroq([_rate_limit_error(), _rate_limit_error(), "Negative"])
+        assert asyncio.run(_client(fake).complete(MESSAGES, max_tokens=10)) == "Negative"
+        assert fake.calls == 3
+
+    def test_backoff_honours_retry_after(self):
+        client = _client(FakeGroq(), backoff_base=0.001)
+        assert client._backoff(0, _rate_limit_error(retry_after=2)) >= 1.0
+
+    def test_raises_when_retries_are_exhausted(self):
+        fake = FakeGroq([_rate_limit_error()] * 3)
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(_client(fake, max_retries=2).complete(MESSAGES, max_tokens=10))
+        assert fake.calls == 3
+
+    def test_non_retryable_error_is_not_retried(self):
+        response = httpx.Response(400, request=httpx.Request("POST", "https://api.groq.com"))
+        fake = FakeGroq([BadRequestError("bad request", response=response, body=None)])
+        # Not an availability problem: raised as is, so callers can fall back
+        with pytest.raises(BadRequestError):
+            asyncio.run(_client(fake).complete(MESSAGES, max_tokens=10))
+        assert fake.calls == 1
+
+    def test_request_budget_spaces_out_calls(self):
+        fake = FakeGroq()
+        client = _client(fake, requests_per_minute=60)   # bucket holds 60, refills 1/s
+        client.request_bucket.take(60)
+        sleeps = []
+        real_sleep = asyncio.sleep
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            client.request_bucket.tokens = client.request_bucket.capacity
+            await real_sleep(0)
+        with patch("llm_client.asyncio.sleep", fake_sleep):
+            asyncio.run(client.complete(MESSAGES, max_tokens=10))
+        assert sleeps and 0.9 < sleeps[0] <= 1.0
+
+    def test_client_is_reusable_across_event_loops(self):
+        client = _client(FakeGroq())
+        assert asyncio.run(client.complete(MESSAGES, max_tokens=10)) == "ok"
+        assert asyncio.run(client.complete(MESSAGES, max_tokens=10)) == "ok"
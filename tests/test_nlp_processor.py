@@ -56,7 +56,7 @@ class TestBuildNormalizedIndex:
 # ---------------------------------------------------------------------------
 
 class TestExtractTickers:
-    def _run_extraction(self, text, nse_map, ner_entities=None):
+    def _run_extraction(self, text, nse_map, ner_entities=None, mode=None):
         """Helper: patches NSE_TICKER_MAP and spaCy inside nlp_processor."""
         import nlp_processor
 
@@ -75,7 +75,7 @@ class TestExtractTickers:
                          _build_normalized_index(nse_map)),
             patch.object(nlp_processor, "nlp", mock_nlp),
         ):
-            return nlp_processor.extract_tickers(text)
+            return nlp_processor.extract_tickers(text, mode=mode)
 
     def test_exact_company_name_match(self, sample_nse_map):
         result = self._run_extraction(
@@ -115,6 +115,43 @@ class TestExtractTickers:
             assert "ner_name" in data
 
 
+class TestExtractTickersAutomaton(TestExtractTickers):
+    """Runs the TestExtractTickers cases again in automaton mode, plus mode-specific checks."""
+
+    def _run_extraction(self, text, nse_map, ner_entities=None, mode="automaton"):
+        return super()._run_extraction(text, nse_map, ner_entities, mode=mode)
+
+    def test_finds_mentions_without_ner(self, sample_nse_map):
+        result = self._run_extraction(
+            "HDFC Bank and State Bank of India both rallied.", sample_nse_map
+        )
+        assert {d["ticker"] for d in result.values()} == {"HDFCBANK", "SBIN"}
+        assert result["HDFC Bank Limited"]["ner_name"] == "HDFC Bank"
+
+    def test_leftover_ner_span_is_fuzzy_matched(self, sample_nse_map):
+        result = self._run_extraction(
+            "Infosis shares slipped.", sample_nse_map, ner_entities=["Infosis Limited"]
+        )
+        assert result["Infosys Limited"]["ticker"] == "INFY"
+        assert result["Infosys Limited"]["score"] < 100
+
+    def test_covered_ner_span_skips_fuzzy_lookup(self, sample_nse_map):
+        import nlp_processor
+        with patch.object(nlp_processor, "_lookup_best_match") as mock_lookup:
+            result = self._run_extraction(
+                "Wipro Limited posted results.", sample_nse_map, ner_entities=["Wipro Limited"]
+            )
+        mock_lookup.assert_not_called()
+        assert result["Wipro Limited"]["score"] == 100
+
+    def test_agrees_with_ngram_mode_on_exact_mentions(self, sample_nse_map):
+        text = "Reliance Industries and Tata Consultancy Services led gains; Wipro lagged."
+        ngram = self._run_extraction(text, sample_nse_map, mode="ngram")
+        automaton = self._run_extraction(text, sample_nse_map)
+        assert {d["ticker"] for d in automaton.values()} <= {d["ticker"] for d in ngram.values()}
+        assert {d["ticker"] for d in automaton.values()} == {"RELIANCE", "TCS", "WIPRO"}
+
+
 # ---------------------------------------------------------------------------
 # extract_key_figures — mocked spaCy entities
 # ---------------------------------------------------------------------------
@@ -148,3 +185,179 @@ class TestExtractKeyFigures:
         import nlp_processor
         with patch.object(nlp_processor, "nlp", MagicMock()):
             assert nlp_processor.extract_key_figures("") == {}
+
+
+# ---------------------------------------------------------------------------
+# ArticleAnalysis — one parse per text, shared across steps
+# ---------------------------------------------------------------------------
+
+class TestArticleAnalysis:
+    def _mock_nlp(self):
+        def parse(text):
+            doc = MagicMock()
+            doc.ents = []
+            doc.sents = [MagicMock(text=s) for s in text.split(". ")]
+            return doc
+        return MagicMock(side_effect=parse)
+
+    def test_each_text_parsed_once(self, sample_nse_map, sample_article):
+        import nlp_processor
+        mock_nlp = self._mock_nlp()
+        with (
+            patch.object(nlp_processor, "nlp", mock_nlp),
+            patch.object(nlp_processor, "NSE_TICKER_MAP", sample_nse_map),
+            patch.object(nlp_processor, "NORMALIZED_INDEX", _build_normalized_index(sample_nse_map)),
+        ):
+            analysis = nlp_processor.ArticleAnalysis(sample_article["title"], sample_article["content"])
+            analysis.tickers
+            analysis.title_tickers
+            analysis.content_tickers
+            analysis.key_figures
+            analysis.sentences_mentioning("Reliance")
+
+        assert mock_nlp.call_count == 2   # title + content
+
+    def test_pre_parsed_docs_are_not_reparsed(self):
+        import nlp_processor
+        mock_nlp = self._mock_nlp()
+        content_doc = MagicMock(sents=[MagicMock(text="Infosys wins deal")])
+        with patch.object(nlp_processor, "nlp", mock_nlp):
+            analysis = nlp_processor.ArticleAnalysis("t", "Infosys wins deal", content_doc=content_doc)
+            assert analysis.sentences_mentioning("Infosys") == ["Infosys wins deal"]
+        mock_nlp.assert_not_called()
+
+    def test_shared_doc_is_passed_to_extractors(self):
+        import nlp_processor
+        mock_nlp = self._mock_nlp()
+        with (
+            patch.object(nlp_processor, "nlp", mock_nlp),
+            patch.object(nlp_processor, "extract_key_figures", return_value={}) as mock_kf,
+        ):
+            analysis = nlp_processor.ArticleAnalysis("t", "Profit rose 10%.")
+            analysis.key_figures
+            analysis.sentences
+        assert mock_kf.call_args.kwargs["doc"] is analysis.content_doc
+
+    def test_sentence_fallback_without_spacy(self):
+        import nlp_processor
+        with patch.object(nlp_processor, "nlp", None):
+            analysis = nlp_processor.ArticleAnalysis("t", "Infosys wins. Wipro loses! TCS flat.")
+            assert analysis.sentences_mentioning("Wipro") == ["Wipro loses!"]
+
+    def test_empty_article(self):
+        import nlp_processor
+        with patch.object(nlp_processor, "nlp", self._mock_nlp()):
+            analysis = nlp_processor.ArticleAnalysis("", "")
+            assert analysis.tickers == {}
+            assert analysis.key_figures == {}
+
+
+# ---------------------------------------------------------------------------
+# analyze_articles — one nlp.pipe run per batch
+# ---------------------------------------------------------------------------
+
+class TestAnalyzeArticles:
+    def _mock_nlp(self):
+        mock_nlp = MagicMock()
+        mock_nlp.pipe.side_effect = lambda texts, **kwargs: [MagicMock(text=t) for t in texts]
+        return mock_nlp
+
+    def test_docs_are_mapped_back_to_their_articles(self):
+        import nlp_processor
+        mock_nlp = self._mock_nlp()
+        articles = [
+            {"title": "A title", "content": "A body"},
+            {"title": "", "content": "B body"},
+            {"title": "C title", "content": None},
+        ]
+        with patch.object(nlp_processor, "nlp", mock_nlp):
+            analyses = nlp_processor.analyze_articles(articles)
+            assert [a.title_doc.text if a.title_doc else None for a in analyses] == ["A title", None, "C title"]
+            assert [a.content_doc.text if a.content_doc else None for a in analyses] == ["A body", "B body", None]
+
+        mock_nlp.pipe.assert_called_once()
+        mock_nlp.assert_not_called()   # nothing parsed one-by-one
+
+    def test_small_batches_stay_in_process(self):
+        import nlp_processor
+        mock_nlp = self._mock_nlp()
+        articles = [{"title": "t", "content": "c"}] * 3
+        with patch.object(nlp_processor, "nlp", mock_nlp):
+            nlp_processor.analyze_articles(articles, batch_size=32, n_process=4)
+            nlp_processor.analyze_articles(articles * 10, batch_size=32, n_process=4)
+        workers = [c.kwargs["n_process"] for c in mock_nlp.pipe.call_args_list]
+        assert workers == [1, 4]
+
+    def test_pipe_failure_falls_back_to_lazy_parsing(self):
+        import nlp_processor
+        mock_nlp = MagicMock(return_value=MagicMock(text="parsed"))
+        mock_nlp.pipe.side_effect = RuntimeError("worker crashed")
+        with patch.object(nlp_processor, "nlp", mock_nlp):
+            (analysis,) = nlp_processor.analyze_articles([{"title": "t", "content": "c"}])
+            assert analysis.content_doc.text == "parsed"
+
+    def test_without_model_returns_unparsed_analyses(self):
+        import nlp_processor
+        with patch.object(nlp_processor, "nlp", None):
+            (analysis,) = nlp_processor.analyze_articles([{"title": "t", "content": "c"}])
+            assert analysis.content_doc is None
+            assert analysis.sentences == ["c"]
+
+
+# ---------------------------------------------------------------------------
+# get_nlp — lazy, shared, profile-trimmed spaCy pipeline
+# ---------------------------------------------------------------------------
+
+class TestGetNlp:
+    def _fake_pipeline(self):
+        pipeline = MagicMock()
+        pipeline.disabled = ["senter"]
+        pipeline.pipe_names = ["tok2vec", "ner"]
+        return pipeline
+
+    def test_model_is_loaded_once_on_first_use(self):
+        import nlp_processor
+        pipeline = self._fake_pipeline()
+        with (
+            patch.object(nlp_processor, "nlp", nlp_processor._UNLOADED),
+            patch("nlp_processor.spacy.load", return_value=pipeline) as mock_load,
+        ):
+            assert nlp_processor.get_nlp() is pipeline
+            assert nlp_processor.get_nlp() is pipeline
+        mock_load.assert_called_once()
+
+    def test_profile_excludes_components_and_enables_senter(self):
+        import nlp_processor
+        pipeline = self._fake_pipeline()
+        with (
+            patch.object(nlp_processor, "SPACY_PROFILE", "ner"),
+            patch("nlp_processor.spacy.load", return_value=pipeline) as mock_load,
+        ):
+            nlp_processor._load_pipeline("ner")
+        assert "parser" in mock_load.call_args.kwargs["exclude"]
+        assert "lemmatizer" in mock_load.call_args.kwargs["exclude"]
+        pipeline.enable_pipe.assert_called_once_with("senter")
+
+    def test_profile_can_switch_model(self):
+        import nlp_processor
+        with patch("nlp_processor.spacy.load", return_value=self._fake_pipeline()) as mock_load:
+            nlp_processor._load_pipeline("lite")
+        assert mock_load.call_args.args[0] == "en_core_web_sm"
+
+    def test_missing_model_yields_none(self):
+        import nlp_processor
+        with (
+            patch.object(nlp_processor, "nlp", nlp_processor._UNLOADED),
+            patch("nlp_processor.spacy.load", side_effect=OSError("not installed")),
+        ):
+            assert nlp_processor.get_nlp() is None
+            assert nlp_processor.extract_key_figures("Profit rose 10%.") == {}
+
+    def test_pre_parsed_doc_does_not_trigger_load(self):
+        import nlp_processor
+        with (
+            patch.object(nlp_processor, "nlp", nlp_processor._UNLOADED),
+            patch("nlp_processor.spacy.load") as mock_load,
+        ):
+            nlp_processor.extract_key_figures("Profit rose.", doc=MagicMock(ents=[]))
+        mock_load.assert_not_called()
@@ -0,0 +1,146 @@
+# tests/test_pipeline.py
+"""Unit tests for pipeline.py — the threaded staged pipeline behind worker.py."""
+
+import sys
+import os
+import time
+import threading
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pipeline import Stage, StagedPipeline
+
+
+def _collect(results, lock=None):
+    lock = lock or threading.Lock()
+    def sink(item):
+        with lock:
+            results.append(item)
+        return item
+    return sink
+
+
+# ---------------------------------------------------------------------------
+# Flow and counters
+# ---------------------------------------------------------------------------
+
+class TestStagedPipeline:
+    def test_items_pass_through_every_stage_in_order(self):
+        results = []
+        stats = StagedPipeline([
+            Stage("double", lambda x: x * 2),
+            Stage("inc", lambda x: x + 1),
+            Stage("sink", _collect(results)),
+        ]).run(range(5))
+
+        assert results == [1, 3, 5, 7, 9]
+        assert stats["double"]["in"] == stats["sink"]["out"] == 5
+
+    def test_returning_none_drops_the_item(self):
+        results = []
+        stats = StagedPipeline([
+            Stage("evens", lambda x: x if x % 2 == 0 else None),
+            Stage("sink", _collect(results)),
+        ]).run(range(6))
+
+        assert results == [0, 2, 4]
+        assert stats["evens"]["dropped"] == 3
+
+    def test_fan_out_stage_emits_each_element(self):
+        results = []
+        StagedPipeline([
+            Stage("split", lambda n: range(n), fan_out=True),
+            Stage("sink", _collect(results)),
+        ]).run([2, 3])
+
+        assert sorted(results) == [0, 0, 1, 1, 2]
+
+    def test_generator_elements_flow_on_before_the_stage_returns(self):
+        first_seen = threading.Event()
+
+        def produce(_):
+            yield "first"
+            # The next stage gets "first" while this one is still running
+            assert first_seen.wait(timeout=5)
+            yield "second"
+
+        def sink(item):
+            first_seen.set()
+            return item
+
+        stats = StagedPipeline([Stage("produce", produce, fan_out=True), Stage("sink", sink)]).run([None])
+        assert stats["produce"]["out"] == stats["sink"]["out"] == 2
+        assert stats["produce"]["errors"] == 0
+
+    def test_exception_drops_item_and_run_continues(self):
+        results = []
+        def fragile(x):
+            if x == 2:
+                raise ValueError("bad item")
+            return x
+        stats = StagedPipeline([Stage("fragile", fragile), Stage("sink", _collect(results))]).run(range(4))
+
+        assert results == [0, 1, 3]
+        assert stats["fragile"]["errors"] == 1
+
+    def test_multiple_workers_process_every_item(self):
+        results = []
+        stats = StagedPipeline([
+            Stage("slow", lambda x: (time.sleep(0.01), x)[1], workers=4),
+            Stage("sink", _collect(results)),
+        ]).run(range(20))
+
+        assert sorted(results) == list(range(20))
+        assert stats["sink"]["in"] == 20
+
+    def test_requires_at_least_one_stage(self):
+        with pytest.raises(ValueError):
+            StagedPipeline([])
+
+
+# ---------------------------------------------------------------------------
+# Micro-batching and backpressure
+# ---------------------------------------------------------------------------
+
+class TestBatchingAndBackpressure:
+    def test_batched_stage_receives_lists_up_to_batch_size(self):
+        batches, results = [], []
+        def record(batch):
+            batches.append(list(batch))
+            return batch
+        StagedPipeline([
+            Stage("batch", record, batch_size=4, batch_wait=1.0),
+            Stage("sink", _collect(results)),
+        ]).run(range(10))
+
+        assert all(len(b) <= 4 for b in batches)
+        assert sorted(x for b in batches for x in b) == list(range(10))
+        assert results == list(range(10))
+
+    def test_partial_batch_is_flushed_at_end_of_stream(self):
+        batches = []
+        StagedPipeline([Stage("batch", lambda b: batches.append(list(b)), batch_size=8, batch_wait=5.0)]).run([1, 2])
+        assert batches == [[1, 2]]
+
+    def test_slow_stage_bounds_items_in_flight(self):
+        produced, consumed = [], []
+        peak = [0]
+        lock = threading.Lock()
+
+        def source(x):
+            with lock:
+                produced.append(x)
+            return x
+
+        def slow_sink(x):
+            time.sleep(0.005)
+            with lock:
+                consumed.append(x)
+                peak[0] = max(peak[0], len(produced) - len(consumed))
+
+        StagedPipeline([Stage("source", source), Stage("sink", slow_sink)], queue_size=2).run(range(30))
+
+        assert len(consumed) == 30
+        # At most: queue capacity + the item being put + the item being consumed
+        assert peak[0] <= 4
@@ -3,6 +3,7 @@
 
 import sys
 import os
+import time
 import pytest
 from unittest.mock import patch, MagicMock
 from bs4 import BeautifulSoup
@@ -145,3 +146,284 @@ class TestScrapeNews:
         with patch("feedparser.parse", return_value=mock_feed):
             result = scrape_news("https://bad-feed.example.com/")
         assert result == []
+
+
+# ---------------------------------------------------------------------------
+# Async fetch mode — mocked transport, no real HTTP
+# ---------------------------------------------------------------------------
+
+RSS_TEMPLATE = """<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Test</title>
+{items}
+</channel></rss>"""
+
+
+def _rss(links):
+    items = "".join(
+        f"<item><title>Story {i}</title><link>{link}</link>"
+        f"<description>&lt;p&gt;summary {i}&lt;/p&gt;</description></item>"
+        for i, link in enumerate(links)
+    )
+    return RSS_TEMPLATE.format(items=items)
+
+
+class TestScrapeManyAsync:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.scraper = NewsArticleScraper()
+
+    def _patch_transport(self, handler):
+        import httpx
+        return patch.object(
+            NewsArticleScraper, "_async_client",
+            lambda self: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+    def test_returns_articles_keyed_by_feed(self):
+        import asyncio
+        import httpx
+
+        feeds = {
+            "https://a.example.com/feed.xml": _rss(["https://a.example.com/1", "https://a.example.com/2"]),
+            "https://b.example.com/feed.xml": _rss(["https://b.example.com/1"]),
+        }
+
+        def handler(request):
+            url = str(request.url)
+            if url in feeds:
+                return httpx.Response(200, content=feeds[url].encode())
+            return httpx.Response(200, text="<div class='artText'>{}</div>".format("B" * 200))
+
+        with self._patch_transport(handler):
+            result = asyncio.run(self.scraper.scrape_many(list(feeds), limit=5))
+
+        assert set(result) == set(feeds)
+        assert len(result["https://a.example.com/feed.xml"]) == 2
+        assert result["https://b.example.com/feed.xml"][0]["content"] == "B" * 200
+
+    def test_falls_back_to_summary_when_article_fetch_fails(self):
+        import asyncio
+        import httpx
+
+        feed_url = "https://a.example.com/feed.xml"
+
+        def handler(request):
+            if str(request.url) == feed_url:
+                return httpx.Response(200, content=_rss(["https://a.example.com/1"]).encode())
+            return httpx.Response(503)
+
+        with self._patch_transport(handler), patch("scraper.SCRAPER_PER_HOST_DELAY", 0):
+            self.scraper.delay = 0
+            articles = asyncio.run(self.scraper.run_async(feed_url, limit=1))
+
+        assert articles[0]["content"] == "summary 0"
+
+    def test_unreachable_feed_returns_empty_list(self):
+        import asyncio
+        import httpx
+
+        def handler(request):
+            raise httpx.ConnectError("down")
+
+        with self._patch_transport(handler):
+            result = asyncio.run(self.scraper.scrape_many(["https://down.example.com/rss"]))
+
+        assert result == {"https://down.example.com/rss": []}
+
+
+    def test_bad_link_falls_back_to_summary_without_failing_the_batch(self):
+        import asyncio
+        import httpx
+
+        feed_url = "https://a.example.com/feed.xml"
+
+        def handler(request):
+            if str(request.url) == feed_url:
+                return httpx.Response(200, content=_rss(["https://a.example.com/1", "https://a.example.com/2"]).encode())
+            if str(request.url).endswith("/1"):
+                raise httpx.InvalidURL("bad link")
+            return httpx.Response(200, text="<div class='artText'>{}</div>".format("B" * 200))
+
+        with self._patch_transport(handler), patch("scraper.SCRAPER_PER_HOST_DELAY", 0):
+            articles = asyncio.run(self.scraper.scrape_many([feed_url], limit=5))[feed_url]
+
+        assert [a["content"] for a in articles] == ["summary 0", "B" * 200]
+
+    def test_failing_feed_does_not_abort_the_others(self):
+        import asyncio
+
+        async def run_feed(client, limiter, url, limit):
+            if "a." in url:
+                raise UnicodeError("label too long")
+            return [{"title": "b"}]
+
+        with patch.object(self.scraper, "_run_async", side_effect=run_feed):
+            result = asyncio.run(self.scraper.scrape_many(["https://a.example.com/rss", "https://b.example.com/rss"]))
+
+        assert result == {"https://a.example.com/rss": [], "https://b.example.com/rss": [{"title": "b"}]}
+
+
+class TestIterFeeds:
+    def test_yields_each_feed_as_it_finishes(self):
+        import asyncio
+
+        async def run_feed(client, limiter, url, limit):
+            await asyncio.sleep(0.2 if "slow" in url else 0)
+            return [{"title": url}]
+
+        scraper = NewsArticleScraper()
+        with patch.object(scraper, "_run_async", side_effect=run_feed):
+            feeds = scraper.iter_feeds(["https://slow.example.com/rss", "https://fast.example.com/rss"])
+            started = time.perf_counter()
+            first_url, _ = next(feeds)
+            first_after = time.perf_counter() - started
+            rest = list(feeds)
+
+        assert first_url == "https://fast.example.com/rss" and first_after < 0.15
+        assert [url for url, _ in rest] == ["https://slow.example.com/rss"]
+
+    def test_closing_early_cancels_the_rest(self):
+        import asyncio
+        cancelled = []
+
+        async def run_feed(client, limiter, url, limit):
+            try:
+                await asyncio.sleep(0 if "fast" in url else 5)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            return []
+
+        scraper = NewsArticleScraper()
+        with patch.object(scraper, "_run_async", side_effect=run_feed):
+            feeds = scraper.iter_feeds(["https://slow.example.com/rss", "https://fast.example.com/rss"])
+            next(feeds)
+            feeds.close()
+
+        assert cancelled == ["https://slow.example.com/rss"]
+
+
+class TestHostLimiter:
+    def test_spaces_requests_to_same_host(self):
+        import asyncio
+        from scraper import _HostLimiter
+
+        async def run():
+            limiter = _HostLimiter(per_host=4, delay=0.05)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            for _ in range(3):
+                await limiter.wait_turn("https://a.example.com/x")
+            return loop.time() - start
+
+        assert asyncio.run(run()) >= 0.1
+
+    def test_different_hosts_do_not_wait(self):
+        import asyncio
+        from scraper import _HostLimiter
+
+        async def run():
+            limiter = _HostLimiter(per_host=4, delay=5)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await limiter.wait_turn("https://a.example.com/x")
+            await limiter.wait_turn("https://b.example.com/x")
+            return loop.time() - start
+
+        assert asyncio.run(run()) < 1
+
+
+# ---------------------------------------------------------------------------
+# Conditional GET + GUID watermark
+# ---------------------------------------------------------------------------
+
+class TestFeedStateIntegration:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        from feed_state import FeedStateStore
+        self.store = FeedStateStore(path=str(tmp_path / "feed_state.json"))
+        self.scraper = NewsArticleScraper(delay=0, state_store=self.store)
+
+    def _feed(self, links, status=200, etag='"v1"'):
+        feed = MagicMock()
+        feed.bozo = False
+        feed.entries = [{"title": f"T{i}", "link": link, "id": link} for i, link in enumerate(links)]
+        feed.get = {"status": status, "etag": etag, "modified": None}.get
+        return feed
+
+    def test_sends_saved_validators_and_stops_on_304(self):
+        self.store.update_validators("https://x/rss", etag='"v1"')
+        with patch("feedparser.parse", return_value=self._feed([], status=304)) as mock_parse:
+            assert self.scraper.run("https://x/rss") == []
+        assert mock_parse.call_args.kwargs["etag"] == '"v1"'
+
+    def test_only_new_entries_are_scraped(self):
+        with patch.object(NewsArticleScraper, "_get_article_content", return_value="A" * 200):
+            with patch("feedparser.parse", return_value=self._feed(["https://x/1"])):
+                first = self.scraper.run("https://x/rss", limit=5)
+            with patch("feedparser.parse", return_value=self._feed(["https://x/2", "https://x/1"])):
+                second = self.scraper.run("https://x/rss", limit=5)
+        assert [a["link"] for a in first] == ["https://x/1"]
+        assert [a["link"] for a in second] == ["https://x/2"]
+
+    def test_truncated_selection_does_not_cache_validators(self):
+        with patch.object(NewsArticleScraper, "_get_article_content", return_value="A" * 200):
+            with patch("feedparser.parse", return_value=self._feed(["https://x/1", "https://x/2"])):
+                articles = self.scraper.run("https://x/rss", limit=1)
+        assert [a["link"] for a in articles] == ["https://x/1"]
+        assert self.store.validators("https://x/rss") == (None, None)
+
+    def test_validators_cached_once_every_entry_is_marked(self):
+        scraper = NewsArticleScraper(delay=0, state_store=self.store, mark_fetched=False)
+        with patch.object(NewsArticleScraper, "_get_article_content", return_value="A" * 200):
+            with patch("feedparser.parse", return_value=self._feed(["https://x/1", "https://x/2"])):
+                articles = scraper.run("https://x/rss", limit=5)
+        assert self.store.validators("https://x/rss") == (None, None)
+        # Deferred entries stay new until the caller marks them processed
+        assert len(self.store.filter_new("https://x/rss", [{"id": "https://x/1"}])) == 1
+
+        for article in articles:
+            self.store.mark_guids("https://x/rss", [article["guid"]])
+        assert self.store.validators("https://x/rss") == ('"v1"', None)
+
+    def test_async_mode_honours_304(self):
+        import asyncio
+        import httpx
+
+        self.store.update_validators("https://a.example.com/rss", etag='"v1"')
+        seen_headers = {}
+
+        def handler(request):
+            seen_headers.update(request.headers)
+            return httpx.Response(304)
+
+        with patch.object(
+            NewsArticleScraper, "_async_client",
+            lambda self: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        ):
+            result = asyncio.run(self.scraper.run_async("https://a.example.com/rss"))
+
+        assert result == []
+        assert seen_headers.get("if-none-match") == '"v1"'
+
+
+class TestSeenStoreIntegration:
+    def test_already_processed_links_are_not_fetched(self, tmp_path):
+        from seen_store import SeenArticleStore
+        store = SeenArticleStore(path=str(tmp_path / "seen.db"))
+        store.mark("https://example.com/0", "old body")
+        scraper = NewsArticleScraper(delay=0, seen_store=store)
+
+        feed = MagicMock()
+        feed.bozo = False
+        feed.entries = [{"title": f"T{i}", "link": f"https://example.com/{i}"} for i in range(2)]
+
+        with (
+            patch("feedparser.parse", return_value=feed),
+            patch.object(NewsArticleScraper, "_get_article_content", return_value="A" * 200) as mock_get,
+        ):
+            articles = scraper.run("https://example.com/rss", limit=5)
+
+        assert [a["link"] for a in articles] == ["https://example.com/1"]
+        mock_get.assert_called_once_with("https://example.com/1")
+        store.close()
@@ -0,0 +1,91 @@
+# tests/test_sector_index.py
+"""Unit tests for sector_index.py — in-memory competitor lookups with mocked sources."""
+
+import sys
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sector_index import SectorIndex, _load_from_csv, load_sector_map
+
+SECTORS = {"INFY": "Technology", "WIPRO": "Technology", "TCS": "Technology", "HDFCBANK": "Financial Services"}
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+class TestLoadSectorMap:
+    def test_reads_symbol_and_sector_from_csv(self, tmp_path):
+        path = tmp_path / "enriched.csv"
+        path.write_text("SYMBOL,NAME OF COMPANY, SERIES,sector\nINFY,Infosys Limited,EQ, Technology \nX,No Sector,EQ,\n")
+        assert _load_from_csv(str(path)) == {"INFY": "Technology"}
+
+    def test_returns_empty_on_missing_file(self):
+        assert _load_from_csv("/nonexistent/path.csv") == {}
+
+    def test_falls_back_to_csv_when_db_unavailable(self):
+        with (
+            patch("sector_index._load_from_db", return_value={}),
+            patch("sector_index._load_from_csv", return_value=SECTORS) as mock_csv,
+        ):
+            assert load_sector_map() == SECTORS
+        mock_csv.assert_called_once()
+
+    def test_graph_is_only_read_when_configured(self):
+        driver = MagicMock()
+        with (
+            patch("sector_index.SECTOR_INDEX_SOURCE", "table"),
+            patch("sector_index._load_from_graph") as mock_graph,
+            patch("sector_index._load_from_db", return_value=SECTORS),
+        ):
+            load_sector_map(driver)
+        mock_graph.assert_not_called()
+
+        with (
+            patch("sector_index.SECTOR_INDEX_SOURCE", "graph"),
+            patch("sector_index._load_from_graph", return_value={"A": "X"}),
+            patch("sector_index._load_from_db") as mock_db,
+        ):
+            assert load_sector_map(driver) == {"A": "X"}
+        mock_db.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# SectorIndex
+# ---------------------------------------------------------------------------
+
+class TestSectorIndex:
+    def test_competitors_share_the_sector_and_exclude_the_ticker(self):
+        index = SectorIndex(loader=lambda: SECTORS)
+        assert index.competitors("INFY") == ["WIPRO", "TCS"]
+        assert index.competitors("UNKNOWN") == []
+
+    def test_are_competitors(self):
+        index = SectorIndex(loader=lambda: SECTORS)
+        assert index.are_competitors("INFY", "WIPRO")
+        assert not index.are_competitors("INFY", "HDFCBANK")
+        assert not index.are_competitors("INFY", "INFY")
+        assert not index.are_competitors("UNKNOWN", "OTHER")
+
+    def test_loads_once_until_the_reload_interval_passes(self):
+        loader = MagicMock(return_value=SECTORS)
+        index = SectorIndex(loader=loader, reload_seconds=60)
+        with patch("sector_index.time.monotonic", return_value=1000.0):
+            index.sector_of("INFY")
+            index.competitors("TCS")
+        assert loader.call_count == 1
+        with patch("sector_index.time.monotonic", return_value=1061.0):
+            index.sector_of("INFY")
+        assert loader.call_count == 2
+
+    def test_failed_reload_keeps_previous_index(self):
+        loader = MagicMock(side_effect=[SECTORS, Exception("db down"), {}])
+        index = SectorIndex(loader=loader)
+        assert index.reload()
+        assert not index.reload()
+        assert not index.reload()
+        assert index.sector_of("INFY") == "Technology"
+        assert len(index) == 4
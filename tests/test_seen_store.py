@@ -0,0 +1,85 @@
+# tests/test_seen_store.py
+"""Unit tests for seen_store.py — URL canonicalization, hashing and the two-layer index."""
+
+import sys
+import os
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from seen_store import SeenArticleStore, canonicalize_url, content_hash
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SeenArticleStore(path=str(tmp_path / "seen.db"), hot_size=2)
+    yield s
+    s.close()
+
+
+# ---------------------------------------------------------------------------
+# canonicalize_url / content_hash
+# ---------------------------------------------------------------------------
+
+class TestCanonicalizeUrl:
+    def test_drops_tracking_params_and_fragment(self):
+        assert (canonicalize_url("https://example.com/a?utm_source=rss&id=7#top")
+                == "https://example.com/a?id=7")
+
+    def test_host_case_and_www_ignored(self):
+        assert canonicalize_url("https://WWW.Example.com/a") == canonicalize_url("https://example.com/a")
+
+    def test_trailing_slash_ignored(self):
+        assert canonicalize_url("https://example.com/a/") == canonicalize_url("https://example.com/a")
+
+    def test_query_order_ignored(self):
+        assert canonicalize_url("https://x.com/a?b=2&a=1") == canonicalize_url("https://x.com/a?a=1&b=2")
+
+    def test_missing_or_relative_link_is_empty(self):
+        assert canonicalize_url("") == ""
+        assert canonicalize_url("#") == ""
+
+
+class TestContentHash:
+    def test_whitespace_and_case_insensitive(self):
+        assert content_hash("Reliance  posts\nprofit") == content_hash("reliance posts profit")
+
+    def test_different_text_differs(self):
+        assert content_hash("profit up") != content_hash("profit down")
+
+
+# ---------------------------------------------------------------------------
+# SeenArticleStore
+# ---------------------------------------------------------------------------
+
+class TestSeenArticleStore:
+    def test_unknown_article_not_seen(self, store):
+        assert not store.seen_link("https://example.com/a")
+        assert not store.seen_content("text")
+
+    def test_marked_article_seen_by_link_and_content(self, store):
+        body = "Reliance posts record profit. " * 10
+        store.mark("https://example.com/a?utm_medium=rss", body)
+        assert store.seen_link("https://example.com/a")
+        assert store.seen_content(body.upper())
+
+    def test_short_text_is_not_content_indexed(self, store):
+        store.mark("https://example.com/a", "No content available.")
+        assert not store.seen_content("No content available.")
+
+    def test_survives_hot_layer_eviction(self, store):
+        for i in range(5):
+            store.mark(f"https://example.com/{i}", f"body {i}")
+        # hot_size=2, so the first article is only in SQLite now
+        assert store.seen_link("https://example.com/0")
+
+    def test_persisted_across_instances(self, store):
+        store.mark("https://example.com/a", "Body")
+        reopened = SeenArticleStore(path=store.path)
+        assert reopened.seen_link("https://example.com/a")
+        reopened.close()
+
+    def test_mark_without_link_is_noop(self, store):
+        body = "Body " * 50
+        store.mark("#", body)
+        assert not store.seen_content(body)
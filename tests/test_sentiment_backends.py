@@ -0,0 +1,77 @@
+# tests/test_sentiment_backends.py
+"""Unit tests for sentiment_backends.py and core_nlp's backend dispatch."""
+
+import sys
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sentiment_backends import SentimentBackend, LocalSentimentBackend
+
+
+# ---------------------------------------------------------------------------
+# LocalSentimentBackend
+# ---------------------------------------------------------------------------
+
+class TestLocalSentimentBackend:
+    def test_positive_news(self):
+        result = LocalSentimentBackend().analyze("Reliance posts record profit, strong growth in revenue")
+        assert result["sentiment"] == "Positive"
+        assert result["backend"] == "local"
+
+    def test_negative_news(self):
+        result = LocalSentimentBackend().analyze("Shares plunge after fraud investigation and heavy loss")
+        assert result["sentiment"] == "Negative"
+
+    def test_confidence_is_capped(self):
+        analyzer = MagicMock()
+        analyzer.analyze_advanced_sentiment.return_value = {"sentiment": "Positive", "raw_score": 1.4}
+        result = LocalSentimentBackend(analyzer=analyzer).analyze("anything")
+        assert result["confidence"] <= 0.8
+        assert result["raw_score"] == 1.4
+
+
+# ---------------------------------------------------------------------------
+# core_nlp dispatch
+# ---------------------------------------------------------------------------
+
+class _FailingBackend(SentimentBackend):
+    name = "groq"
+
+    def analyze(self, text):
+        raise RuntimeError("API down")
+
+
+class TestSentimentDispatch:
+    def test_auto_falls_back_to_local_when_groq_fails(self):
+        import core_nlp
+        backends = {"groq": _FailingBackend(), "local": LocalSentimentBackend()}
+        with patch.object(core_nlp, "SENTIMENT_BACKENDS", backends), patch.object(core_nlp, "SENTIMENT_BACKEND", "auto"):
+            result = core_nlp.analyze_sentiment_core("Profit surges on strong demand")
+        assert result["backend"] == "local"
+
+    def test_groq_only_mode_degrades_to_neutral(self):
+        import core_nlp
+        backends = {"groq": _FailingBackend(), "local": LocalSentimentBackend()}
+        with patch.object(core_nlp, "SENTIMENT_BACKENDS", backends), patch.object(core_nlp, "SENTIMENT_BACKEND", "groq"):
+            assert core_nlp.analyze_sentiment_core("Profit surges") == {"sentiment": "Neutral", "confidence": 0.5}
+
+    def test_unavailable_backends_are_skipped(self):
+        import core_nlp
+        with patch.object(core_nlp, "client", None), patch.object(core_nlp, "SENTIMENT_BACKEND", "auto"):
+            assert core_nlp.analyze_sentiment_core("Profit surges")["backend"] == "local"
+
+    def test_custom_backend_can_be_registered(self):
+        import core_nlp
+
+        class Constant(SentimentBackend):
+            name = "constant"
+
+            def analyze(self, text):
+                return {"sentiment": "Negative", "confidence": 0.7, "backend": self.name}
+
+        with patch.dict(core_nlp.SENTIMENT_BACKENDS), patch.object(core_nlp, "SENTIMENT_BACKEND", "constant"):
+            core_nlp.register_sentiment_backend(Constant())
+            assert core_nlp.analyze_sentiment_core("text")["backend"] == "constant"
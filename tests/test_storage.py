@@ -0,0 +1,164 @@
+# tests/test_storage.py
+"""Unit tests for storage.py — the SQLite backend on a temp file and backend selection."""
+
+import sys
+import os
+import pytest
+import pandas as pd
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import storage
+from storage import SQLiteStore, PostgresStore, get_store
+
+
+def _add(writer, ticker="INFY", link="https://x.com/1", sentiment="Positive", confidence=0.9,
+         event_type="Earnings Report", impact=0.5, key_figures='{"revenue_amount": "10 cr"}'):
+    writer.add("Title", link, "Infosys", ticker, {"sentiment": sentiment, "confidence": confidence},
+               event_type, impact, key_figures)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "insights.db"))
+    store.initialize()
+    return store
+
+
+# ---------------------------------------------------------------------------
+# SQLiteStore
+# ---------------------------------------------------------------------------
+
+class TestSQLiteStore:
+    def test_writer_batches_and_query_returns_compact_frame(self, store):
+        writer = store.writer(batch_size=10)
+        _add(writer, link="a")
+        _add(writer, link="b", sentiment="Negative", confidence=0.6)
+        assert writer.flush() == 2
+
+        df, cursor = store.query_insights("INFY", columns=None, limit=10)
+        assert list(df.columns) == list(storage.database.INSIGHT_COLUMNS)
+        assert list(df["link"]) == ["b", "a"]   # newest first (ties broken by id)
+        assert isinstance(df["sentiment"].dtype, pd.CategoricalDtype)
+        assert df["confidence"].dtype == "float32"
+        assert str(df["timestamp"].dtype) == "datetime64[ns, UTC]"
+        assert df["key_figures"].iloc[0] == {"revenue_amount": "10 cr"}
+        assert cursor is None
+
+    def test_upsert_keeps_one_row_per_link_and_ticker(self, store):
+        writer = store.writer()
+        _add(writer)
+        writer.flush()
+        _add(writer, sentiment="Negative", confidence=0.4)
+        writer.flush()
+
+        df, _ = store.query_insights("INFY", limit=10)
+        assert len(df) == 1 and df["sentiment"].iloc[0] == "Negative"
+
+    def test_keyset_pages_cover_every_row_once(self, store):
+        writer = store.writer()
+        for i in range(5):
+            _add(writer, link=f"l{i}")
+        writer.flush()
+
+        seen, cursor = [], None
+        while True:
+            df, cursor = store.query_insights("INFY", columns=("link",), limit=2, after=cursor)
+            seen.extend(df["link"])
+            if cursor is None:
+                break
+        assert sorted(seen) == [f"l{i}" for i in range(5)]
+
+    def test_rollup_follows_inserts_and_upserts(self, store):
+        writer = store.writer()
+        _add(writer, link="a", confidence=0.8)
+        _add(writer, link="b", confidence=0.6)
+        writer.flush()
+        _add(writer, link="b", sentiment="Negative", confidence=0.6)
+        writer.flush()
+
+        rollup = store.query_sentiment_rollup("INFY", since="2000-01-01")
+        buckets = {row.sentiment: (row.count, round(float(row.mean_confidence), 2)) for row in rollup.itertuples()}
+        assert buckets == {"Positive": (1, 0.8), "Negative": (1, 0.6)}
+        assert rollup["count"].dtype == "int32"
+
+    def test_since_filters_by_timestamp(self, store):
+        writer = store.writer()
+        _add(writer)
+        writer.flush()
+        future = pd.Timestamp.now(tz="UTC") + pd.Timedelta(days=1)
+        df, _ = store.query_insights("INFY", since=future)
+        assert df.empty
+
+    def test_change_version_moves_only_on_writes(self, store):
+        before = store.change_version()
+        store.query_insights("INFY")
+        assert store.change_version() == before
+
+        writer = store.writer()
+        _add(writer)
+        writer.flush()
+        after_insert = store.change_version()
+        assert after_insert > before
+        _add(writer, sentiment="Negative")
+        writer.flush()
+        assert store.change_version() > after_insert
+
+    def test_locked_database_is_retried(self, store):
+        import sqlite3
+        with patch.object(store, "write_rows",
+                          side_effect=[sqlite3.OperationalError("database is locked"), 1]) as mock_write:
+            writer = store.writer(backoff_base=0)
+            _add(writer)
+            assert writer.flush() == 1
+        assert mock_write.call_count == 2
+
+    def test_rejects_unknown_columns(self, store):
+        with pytest.raises(ValueError):
+            store.query_insights("INFY", columns=("timestamp", "1; DROP TABLE insights"))
+
+
+# ---------------------------------------------------------------------------
+# Backend selection
+# ---------------------------------------------------------------------------
+
+class TestGetStore:
+    def test_returns_one_store_per_backend(self):
+        with patch("storage._store", None):
+            assert isinstance(get_store("postgres"), PostgresStore)
+            assert get_store("postgres") is get_store("postgres")
+
+    def test_unknown_backend_raises(self):
+        with pytest.raises(ValueError):
+            get_store("mongodb")
+
+    def test_postgres_change_version_starts_one_listener(self):
+        store = PostgresStore()
+        with (
+            patch("storage.database.connection_pool", object()),
+            patch("storage.database.InsightChangeListener") as mock_listener,
+        ):
+            mock_listener.return_value.start.return_value.version = 4
+            assert store.change_version() == 4
+            assert store.change_version() == 4
+        mock_listener.assert_called_once()
+
+    def test_postgres_store_without_pool_raises_a_retryable_error(self):
+        import psycopg2
+        with (
+            patch("storage.database.connection_pool", None),
+            patch("storage.database._pool_retry_at", float("inf")),
+        ):
+            with pytest.raises(psycopg2.OperationalError):
+                PostgresStore().write_rows([("t", "l", "c", "INFY", "Positive", 0.9, "General News", 0.5, "{}")])
+
+    def test_postgres_store_writes_through_database(self):
+        with (
+            patch("storage.database.connection_pool", object()),
+            patch("storage.database.write_insight_rows", return_value=1) as mock_write,
+        ):
+            writer = PostgresStore().writer()
+            _add(writer)
+            assert writer.flush() == 1
+        assert mock_write.call_args.args[0][0][3] == "INFY"
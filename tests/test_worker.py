@@ -9,6 +9,16 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 
+@pytest.fixture(autouse=True)
+def isolated_seen_store(tmp_path):
+    """Each test gets an empty seen-article index instead of the on-disk one."""
+    from seen_store import SeenArticleStore
+    store = SeenArticleStore(path=str(tmp_path / "seen.db"))
+    with patch("worker.seen_articles", store):
+        yield store
+    store.close()
+
+
 # ---------------------------------------------------------------------------
 # get_competitors_from_graph
 # ---------------------------------------------------------------------------
@@ -50,7 +60,7 @@ class TestGetCompetitorsFromGraph:
 class TestProcessFeedNoArticles:
     def test_returns_immediately_when_no_articles(self):
         mock_scraper = MagicMock()
-        mock_scraper.run.return_value = []
+        mock_scraper.iter_feeds = MagicMock(side_effect=lambda urls, limit: [(url, []) for url in urls])
 
         with patch("worker.NewsArticleScraper", return_value=mock_scraper):
             from worker import process_feed
@@ -65,14 +75,13 @@ class TestProcessFeedNoArticles:
 class TestProcessFeedNoTickers:
     def test_skips_article_when_no_tickers_found(self):
         mock_scraper = MagicMock()
-        mock_scraper.run.return_value = [
-            {"title": "Weather Update", "content": "It was sunny today.", "link": "https://x.com/1"}
-        ]
+        articles = [{"title": "Weather Update", "content": "It was sunny today.", "link": "https://x.com/1"}]
+        mock_scraper.iter_feeds = MagicMock(side_effect=lambda urls, limit: [(url, articles) for url in urls])
 
         with (
             patch("worker.NewsArticleScraper", return_value=mock_scraper),
-            patch("worker.extract_tickers", return_value={}),
-            patch("worker.save_specific_insight") as mock_save,
+            patch("nlp_processor.extract_tickers", return_value={}),
+            patch("worker.insight_writer.write") as mock_save,
         ):
             from worker import process_feed
             process_feed("https://example.com/feed.xml", source_weight=1.0)
@@ -104,7 +113,7 @@ class TestProcessFeedHappyPath:
 
     def test_saves_insight_for_matched_ticker(self):
         mock_scraper = MagicMock()
-        mock_scraper.run.return_value = [self._make_article()]
+        mock_scraper.iter_feeds = MagicMock(side_effect=lambda urls, limit: [(url, [self._make_article()]) for url in urls])
 
         mock_doc = MagicMock()
         mock_sent = MagicMock()
@@ -115,19 +124,19 @@ class TestProcessFeedHappyPath:
 
         with (
             patch("worker.NewsArticleScraper", return_value=mock_scraper),
-            patch("worker.extract_tickers", return_value=self._make_tickers()),
-            patch("worker.extract_key_figures", return_value={"profit_change_percent": "18%"}),
-            patch("worker.classify_event_type", return_value="Earnings Report"),
-            patch("worker.analyze_sentiment", return_value=mock_sentiment),
-            patch("worker.nlp", return_value=mock_doc),
-            patch("worker.save_specific_insight") as mock_save,
-            patch("worker.get_competitors_from_graph", return_value=[]),
+            patch("nlp_processor.extract_tickers", return_value=self._make_tickers()),
+            patch("nlp_processor.extract_key_figures", return_value={"profit_change_percent": "18%"}),
+            patch("worker.analyze_articles_concurrently", side_effect=lambda requests: [
+                {"event_type": "Earnings Report", "sentiments": {"RELIANCE": mock_sentiment}} for _ in requests]),
+            patch("nlp_processor.nlp", return_value=mock_doc),
+            patch("worker.insight_writer.write") as mock_save,
+            patch("worker.sector_index.are_competitors", return_value=False),
         ):
             from worker import process_feed
             process_feed("https://example.com/feed.xml", source_weight=1.0)
 
         mock_save.assert_called_once()
-        call_args = mock_save.call_args[0]
+        (call_args,) = mock_save.call_args.args[0]
         assert call_args[0] == "Reliance posts record profits"   # title
         assert call_args[3] == "RELIANCE"                        # ticker
 
@@ -136,7 +145,7 @@ class TestProcessFeedHappyPath:
         saved_calls = []
 
         mock_scraper = MagicMock()
-        mock_scraper.run.return_value = [self._make_article()]
+        mock_scraper.iter_feeds = MagicMock(side_effect=lambda urls, limit: [(url, [self._make_article()]) for url in urls])
 
         mock_doc = MagicMock()
         mock_sent = MagicMock()
@@ -144,22 +153,386 @@ class TestProcessFeedHappyPath:
         mock_sent.text = "Reliance Industries reported a massive profit surge."
         mock_doc.sents = [mock_sent]
 
-        def capture_save(*args, **kwargs):
-            saved_calls.append(args)
+        def capture_save(insights):
+            saved_calls.extend(insights)
 
         with (
             patch("worker.NewsArticleScraper", return_value=mock_scraper),
-            patch("worker.extract_tickers", return_value=self._make_tickers()),
-            patch("worker.extract_key_figures", return_value={}),
-            patch("worker.classify_event_type", return_value="Earnings Report"),
-            patch("worker.analyze_sentiment", return_value={"sentiment": "Positive", "confidence": 0.9}),
-            patch("worker.nlp", return_value=mock_doc),
-            patch("worker.save_specific_insight", side_effect=capture_save),
-            patch("worker.get_competitors_from_graph", return_value=[]),
+            patch("nlp_processor.extract_tickers", return_value=self._make_tickers()),
+            patch("nlp_processor.extract_key_figures", return_value={}),
+            patch("worker.analyze_articles_concurrently", side_effect=lambda requests: [
+                {"event_type": "Earnings Report",
+                 "sentiments": {"RELIANCE": {"sentiment": "Positive", "confidence": 0.9}}} for _ in requests]),
+            patch("nlp_processor.nlp", return_value=mock_doc),
+            patch("worker.insight_writer.write", side_effect=capture_save),
+            patch("worker.sector_index.are_competitors", return_value=False),
         ):
             from worker import process_feed
             process_feed("https://example.com/feed.xml", source_weight=1.0)
 
-        assert saved_calls, "save_specific_insight was not called"
+        assert saved_calls, "no insight was written"
         impact_score = saved_calls[0][6]   # 7th positional arg
         assert impact_score > 0
+
+
+    def test_one_llm_call_covers_every_ticker(self):
+        article = {
+            "title": "Reliance and Infosys rally",
+            "content": "Reliance rose 3%. Infosys gained 2%.",
+            "link": "https://example.com/rally",
+        }
+        tickers = {
+            "Reliance Industries Limited": {"ticker": "RELIANCE", "ner_name": "Reliance", "score": 100},
+            "Infosys Limited": {"ticker": "INFY", "ner_name": "Infosys", "score": 100},
+        }
+        llm_result = {
+            "event_type": "General News",
+            "sentiments": {"RELIANCE": {"sentiment": "Positive", "confidence": 0.9},
+                           "INFY": {"sentiment": "Positive", "confidence": 0.9}},
+        }
+        with (
+            patch("nlp_processor.extract_tickers", return_value=tickers),
+            patch("nlp_processor.extract_key_figures", return_value={}),
+            patch("nlp_processor.nlp", None),
+            patch("worker.analyze_articles_concurrently", return_value=[llm_result]) as mock_llm,
+            patch("worker.insight_writer.write") as mock_save,
+        ):
+            from worker import _process_articles
+            _process_articles([article], source_weight=1.0)
+
+        mock_llm.assert_called_once()
+        ((title, snippets),) = mock_llm.call_args.args[0]
+        assert snippets == {"RELIANCE": "Reliance rose 3%.", "INFY": "Infosys gained 2%."}
+        assert len(mock_save.call_args.args[0]) == 2
+
+
+# ---------------------------------------------------------------------------
+# Graph rule — competitor lookups come from the in-memory sector index
+# ---------------------------------------------------------------------------
+
+class TestGraphRule:
+    def _job(self, title, sentiments):
+        analysis = MagicMock()
+        analysis.title_tickers = {
+            "Infosys Limited": {"ticker": "INFY"},
+            "Wipro Limited": {"ticker": "WIPRO"},
+        }
+        return {"article": {"title": title}, "analysis": analysis,
+                "llm_result": {"event_type": "General News", "sentiments": sentiments}}
+
+    def test_competitor_in_headline_is_set_negative_without_neo4j(self):
+        from sector_index import SectorIndex
+        from worker import _PipelineRun
+        index = SectorIndex(loader=lambda: {"INFY": "Technology", "WIPRO": "Technology"})
+        job = self._job("Infosys beats Wipro to $2bn deal",
+                        {"INFY": {"sentiment": "Positive", "confidence": 0.9},
+                         "WIPRO": {"sentiment": "Neutral", "confidence": 0.5}})
+        with patch("worker.sector_index", index), patch("worker.driver", None):
+            job = _PipelineRun().enrich(job)
+        assert job["sentiments"]["WIPRO"] == {"sentiment": "Negative", "confidence": 0.98}
+        assert job["sentiments"]["INFY"]["sentiment"] == "Positive"
+
+    def test_loser_is_the_first_competitor_in_the_headline(self):
+        from sector_index import SectorIndex
+        from worker import _PipelineRun
+        index = SectorIndex(loader=lambda: {"INFY": "Technology", "WIPRO": "Technology", "TCS": "Technology"})
+        job = self._job("Infosys beats TCS and Wipro to $2bn deal", {"INFY": {"sentiment": "Positive", "confidence": 0.9}})
+        # Not in headline order, as extract_tickers may return them
+        job["analysis"].title_tickers = {
+            "Wipro Limited": {"ticker": "WIPRO", "ner_name": "Wipro"},
+            "Tata Consultancy Services Limited": {"ticker": "TCS", "ner_name": "TCS"},
+            "Infosys Limited": {"ticker": "INFY", "ner_name": "Infosys"},
+        }
+        with patch("worker.sector_index", index):
+            job = _PipelineRun().enrich(job)
+        assert job["sentiments"]["TCS"]["sentiment"] == "Negative"
+        assert "WIPRO" not in job["sentiments"]
+
+    def test_different_sectors_are_left_alone(self):
+        from sector_index import SectorIndex
+        from worker import _PipelineRun
+        index = SectorIndex(loader=lambda: {"INFY": "Technology", "WIPRO": "Consumer"})
+        sentiments = {"INFY": {"sentiment": "Positive", "confidence": 0.9}}
+        with patch("worker.sector_index", index):
+            job = _PipelineRun().enrich(self._job("Infosys beats Wipro", sentiments))
+        assert job["sentiments"] == sentiments
+
+
+# ---------------------------------------------------------------------------
+# process_feeds — concurrent fetch across all configured feeds
+# ---------------------------------------------------------------------------
+
+class TestProcessFeeds:
+    def test_applies_each_feeds_weight_to_its_articles(self):
+        feeds = {
+            "A": {"url": "https://a.example.com/rss", "weight": 1.0},
+            "B": {"url": "https://b.example.com/rss", "weight": 0.5},
+        }
+        fetched = {
+            "https://a.example.com/rss": [{"title": "a", "content": "a", "link": "https://a/1"}],
+            "https://b.example.com/rss": [{"title": "b", "content": "b", "link": "https://b/1"}],
+        }
+        mock_scraper = MagicMock()
+        mock_scraper.iter_feeds = MagicMock(return_value=iter(fetched.items()))
+
+        with (
+            patch("worker.NewsArticleScraper", return_value=mock_scraper),
+            patch("worker._PipelineRun.parse", side_effect=lambda jobs: []) as mock_parse,
+        ):
+            from worker import process_feeds
+            process_feeds(feeds, article_limit=2)
+
+        # Every feed in one iter_feeds call, so they share one client and per-host limiter
+        mock_scraper.iter_feeds.assert_called_once()
+        assert sorted(mock_scraper.iter_feeds.call_args.args[0]) == list(fetched)
+        assert mock_scraper.iter_feeds.call_args.kwargs["limit"] == 2
+        weights = {job['article']['title']: job['weight'] for c in mock_parse.call_args_list for job in c.args[0]}
+        assert weights == {"a": 1.0, "b": 0.5}
+
+    def test_parsing_starts_before_slower_feeds_finish(self):
+        import threading
+        parsed = threading.Event()
+
+        def iter_feeds(urls, limit):
+            yield "https://a.example.com/rss", [{"title": "a", "content": "a", "link": "https://a/1"}]
+            # The slow feed is still "downloading" until the first feed's article has been parsed
+            assert parsed.wait(timeout=5)
+            yield "https://b.example.com/rss", []
+
+        def parse(jobs):
+            parsed.set()
+            return []
+
+        mock_scraper = MagicMock()
+        mock_scraper.iter_feeds = iter_feeds
+        with (
+            patch("worker.NewsArticleScraper", return_value=mock_scraper),
+            patch("worker._PipelineRun.parse", side_effect=parse),
+        ):
+            from worker import process_feeds
+            stats = process_feeds({"A": {"url": "https://a.example.com/rss"}, "B": {"url": "https://b.example.com/rss"}})
+        assert stats["fetch"]["errors"] == 0 and stats["parse"]["in"] == 1
+
+    def test_fetch_failure_does_not_raise(self):
+        mock_scraper = MagicMock()
+        mock_scraper.iter_feeds = MagicMock(side_effect=Exception("network down"))
+        with patch("worker.NewsArticleScraper", return_value=mock_scraper):
+            from worker import process_feeds
+            stats = process_feeds({"A": {"url": "https://a.example.com/rss", "weight": 1.0}})
+        assert stats["fetch"]["errors"] == 1
+
+    def test_one_failing_feed_does_not_stop_the_others(self):
+        mock_scraper = MagicMock()
+        # iter_feeds reports a feed that failed as having no articles
+        mock_scraper.iter_feeds = MagicMock(return_value=iter({
+            "https://a.example.com/rss": [],
+            "https://b.example.com/rss": [{"title": "b", "content": "b", "link": "https://b/1"}],
+        }.items()))
+
+        with (
+            patch("worker.NewsArticleScraper", return_value=mock_scraper),
+            patch("worker._PipelineRun.parse", side_effect=lambda jobs: []) as mock_parse,
+        ):
+            from worker import process_feeds
+            process_feeds({"A": {"url": "https://a.example.com/rss"}, "B": {"url": "https://b.example.com/rss"}})
+
+        titles = [job['article']['title'] for c in mock_parse.call_args_list for job in c.args[0]]
+        assert titles == ["b"]
+
+
+# ---------------------------------------------------------------------------
+# Seen-article index
+# ---------------------------------------------------------------------------
+
+def _stub_inference():
+    """Patches out ticker extraction and the LLM so the pipeline runs without spaCy or Groq."""
+    def infer(jobs):
+        for job in jobs:
+            job['llm_result'] = {"event_type": "General News", "sentiments": {}}
+        return jobs
+    return (
+        patch("worker._PipelineRun.extract", side_effect=lambda job: job),
+        patch("worker._PipelineRun.infer", side_effect=infer),
+        patch("worker._PipelineRun.enrich", side_effect=lambda job: job),
+    )
+
+
+class TestSeenArticles:
+    def _article(self, link="https://example.com/story?utm_source=rss", content="Body text. " * 20):
+        return {"title": "Story", "content": content, "link": link}
+
+    def _run(self, *batches):
+        extract, infer, enrich = _stub_inference()
+        with (
+            extract, infer, enrich,
+            patch("worker.analyze_articles", side_effect=lambda batch: [MagicMock() for _ in batch]),
+            patch("worker._job_insights", return_value=[]) as mock_save,
+        ):
+            from worker import _process_articles
+            for batch in batches:
+                _process_articles(batch, source_weight=1.0)
+        return mock_save
+
+    def test_processed_article_is_skipped_next_time(self, isolated_seen_store):
+        mock_save = self._run([self._article()], [self._article(link="https://www.example.com/story")])
+        assert mock_save.call_count == 1
+
+    def test_same_content_under_new_url_is_skipped(self, isolated_seen_store):
+        mock_save = self._run([self._article()], [self._article(link="https://mirror.example.com/x")])
+        assert mock_save.call_count == 1
+
+    def test_failed_article_is_not_marked_seen(self, isolated_seen_store):
+        extract, infer, enrich = _stub_inference()
+        with (
+            extract, infer, enrich,
+            patch("worker.analyze_articles", side_effect=lambda batch: [MagicMock() for _ in batch]),
+            patch("worker.insight_writer.write", side_effect=Exception("DB down")),
+        ):
+            from worker import _process_articles
+            stats = _process_articles([self._article()], source_weight=1.0)
+        assert stats["persist"]["errors"] == 1
+        assert not isolated_seen_store.seen_link("https://example.com/story")
+
+    def test_article_is_not_marked_seen_when_batch_write_fails(self, isolated_seen_store):
+        extract, infer, enrich = _stub_inference()
+        with (
+            extract, infer, enrich,
+            patch("worker.analyze_articles", side_effect=lambda batch: [MagicMock() for _ in batch]),
+            patch("worker._job_insights", return_value=[]),
+            patch("worker.insight_writer.write", side_effect=Exception("DB down")),
+        ):
+            from worker import _process_articles
+            _process_articles([self._article()], source_weight=1.0)
+        assert not isolated_seen_store.seen_link("https://example.com/story")
+
+    def test_article_is_not_marked_seen_without_a_database(self, isolated_seen_store):
+        import worker
+        extract, infer, enrich = _stub_inference()
+        insight = ("Story", "https://example.com/story", "Infosys", "INFY",
+                   {"sentiment": "Positive", "confidence": 0.9}, "General News", 0.9, "{}")
+        with (
+            extract, infer, enrich,
+            patch("worker.analyze_articles", side_effect=lambda batch: [MagicMock() for _ in batch]),
+            patch("worker._job_insights", return_value=[insight]),
+            patch("worker.insight_writer", worker.get_store("postgres").writer(max_retries=0)),
+            patch("database.connection_pool", None),
+            patch("database._pool_retry_at", float("inf")),
+        ):
+            stats = worker._process_articles([self._article()], source_weight=1.0)
+        assert stats["persist"]["errors"] == 1
+        assert not isolated_seen_store.seen_link("https://example.com/story")
+
+    def test_article_is_not_marked_seen_when_llm_is_unavailable(self, isolated_seen_store):
+        from llm_client import LLMUnavailableError
+        tickers = {"Reliance Industries Limited": {"ticker": "RELIANCE", "ner_name": "Body", "score": 100}}
+        with (
+            patch("nlp_processor.extract_tickers", return_value=tickers),
+            patch("nlp_processor.nlp", None),
+            patch("worker.analyze_articles_concurrently", return_value=[LLMUnavailableError("429")]),
+            patch("worker.insight_writer.write") as mock_save,
+        ):
+            from worker import _process_articles
+            _process_articles([self._article()], source_weight=1.0)
+        mock_save.assert_not_called()
+        assert not isolated_seen_store.seen_link("https://example.com/story")
+
+    def test_feed_watermark_advances_only_after_persist(self, tmp_path):
+        from feed_state import FeedStateStore
+        from worker import _PipelineRun
+        state = FeedStateStore(path=str(tmp_path / "feed_state.json"))
+        article = dict(self._article(), guid="g1")
+        extract, infer, enrich = _stub_inference()
+        with (
+            extract, infer, enrich,
+            patch("worker.feed_state", state),
+            patch("worker.analyze_articles", side_effect=lambda batch: [MagicMock() for _ in batch]),
+            patch("worker.insight_writer.write", side_effect=Exception("DB down")),
+        ):
+            _PipelineRun().run([{'article': article, 'weight': 1.0, 'feed_url': "https://x/rss"}], start="parse")
+        assert state.filter_new("https://x/rss", [{"id": "g1"}]) == [{"id": "g1"}]
+
+        extract, infer, enrich = _stub_inference()
+        with (
+            extract, infer, enrich,
+            patch("worker.feed_state", state),
+            patch("worker.analyze_articles", side_effect=lambda batch: [MagicMock() for _ in batch]),
+            patch("worker._job_insights", return_value=[]),
+            patch("worker.insight_writer.write"),
+        ):
+            _PipelineRun().run([{'article': article, 'weight': 1.0, 'feed_url': "https://x/rss"}], start="parse")
+        assert state.filter_new("https://x/rss", [{"id": "g1"}]) == []
+
+    def test_missing_groq_key_stores_local_sentiment(self, isolated_seen_store):
+        import core_nlp
+        tickers = {"Tata Motors Limited": {"ticker": "TATAMOTORS", "ner_name": "Tata Motors", "score": 100}}
+        article = self._article(content="Tata Motors reports record profit and strong growth. " * 5)
+        with (
+            patch("nlp_processor.extract_tickers", return_value=tickers),
+            patch("nlp_processor.nlp", None),
+            patch.object(core_nlp, "client", None),
+            patch.object(core_nlp, "SENTIMENT_BACKEND", "auto"),
+            patch("worker.SENTIMENT_CASCADE", False),
+            patch("worker.insight_writer.write") as mock_write,
+        ):
+            from worker import _process_articles
+            _process_articles([article], source_weight=1.0)
+        ((*_, ticker, sentiment, _, _, _),) = mock_write.call_args.args[0]
+        assert ticker == "TATAMOTORS"
+        assert sentiment["sentiment"] == "Positive" and sentiment["backend"] == "local"
+
+    def test_duplicate_within_one_batch_is_processed_once(self, isolated_seen_store):
+        mock_save = self._run([self._article(), self._article(link="https://mirror.example.com/x")])
+        assert mock_save.call_count == 1
+
+    def test_article_without_tickers_is_marked_seen(self, isolated_seen_store):
+        analysis = MagicMock(tickers={})
+        with (
+            patch("worker.analyze_articles", return_value=[analysis]),
+            patch("worker.analyze_articles_concurrently") as mock_llm,
+        ):
+            from worker import _process_articles
+            _process_articles([self._article()], source_weight=1.0)
+        mock_llm.assert_not_called()
+        assert isolated_seen_store.seen_link("https://example.com/story")
+
+
+# ---------------------------------------------------------------------------
+# Batched NLP stage
+# ---------------------------------------------------------------------------
+
+class TestBatchedAnalysis:
+    def test_whole_batch_is_parsed_in_one_call(self):
+        articles = [{"title": f"t{i}", "content": f"c{i}", "link": f"https://x.com/{i}"} for i in range(3)]
+        extract, infer, enrich = _stub_inference()
+        with (
+            extract, infer, enrich,
+            patch("worker.analyze_articles", wraps=lambda batch: [MagicMock() for _ in batch]) as mock_analyze,
+            patch("worker._job_insights", return_value=[]) as mock_save,
+        ):
+            from worker import _process_articles
+            _process_articles(articles, source_weight=1.0)
+
+        mock_analyze.assert_called_once()
+        assert len(mock_analyze.call_args.args[0]) == 3
+        analyses = [c.args[0]['analysis'] for c in mock_save.call_args_list]
+        assert len(analyses) == 3 and len(set(map(id, analyses))) == 3
+
+
+class TestCascadeMode:
+    def test_worker_uses_cascade_when_enabled(self):
+        articles = [{"title": "t", "content": "c", "link": "https://x.com/1"}]
+        analysis = MagicMock()
+        with (
+            patch("worker.SENTIMENT_CASCADE", True),
+            patch("worker.analyze_articles", return_value=[analysis]),
+            patch("worker._llm_snippets", return_value={}),
+            patch("worker.cascade_analyze_articles",
+                  return_value=[{"event_type": "General News", "sentiments": {}}]) as mock_cascade,
+            patch("worker.analyze_articles_concurrently") as mock_llm,
+            patch("worker._PipelineRun.enrich", side_effect=lambda job: job),
+            patch("worker._job_insights", return_value=[]),
+        ):
+            from worker import _process_articles
+            _process_articles(articles, source_weight=1.0)
+        mock_cascade.assert_called_once()
+        mock_llm.assert_not_called()
@@ -1,75 +1,242 @@
 # worker.py
 import logging
 import json
-import spacy
+import threading
 from scraper import NewsArticleScraper
-from nlp_processor import extract_tickers, extract_key_figures
-from core_nlp import analyze_sentiment_core as analyze_sentiment
-from core_nlp import classify_event_type_core as classify_event_type
-from database import save_specific_insight
+from feed_state import FeedStateStore
+from seen_store import SeenArticleStore
+from nlp_processor import ArticleAnalysis, analyze_articles
+from core_nlp import analyze_articles_concurrently, cascade_analyze_articles, cascade_stats, LLMUnavailableError
+from storage import get_store
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import os
-from config import COMPETITIVE_KEYWORDS, EVENT_IMPACT_MULTIPLIERS
+from pipeline import Stage, StagedPipeline
+from sector_index import SectorIndex, load_sector_map
+from config import (COMPETITIVE_KEYWORDS, EVENT_IMPACT_MULTIPLIERS, SENTIMENT_CASCADE,
+                    PIPELINE_QUEUE_SIZE, PIPELINE_STAGES)
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s: %(message)s')
-nlp = spacy.load("en_core_web_lg")
 load_dotenv()
 
 # Knowledge Graph Connection
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+# Optional: competitor lookups use the in-memory sector index, the graph is only a reload source
+driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD)) if NEO4J_URI else None
+
+# ETag/Last-Modified validators and seen-entry watermarks, persisted across cycles
+feed_state = FeedStateStore()
+# Articles already processed (by canonical URL / content hash), persisted across cycles
+seen_articles = SeenArticleStore()
+# Writes each persist batch in one transaction (retried on connection errors), to the STORAGE_BACKEND store
+insight_writer = get_store().writer()
+# Ticker -> sector, loaded on first use and refreshed every SECTOR_INDEX_RELOAD_SECONDS
+sector_index = SectorIndex(loader=lambda: load_sector_map(driver))
 
 def get_competitors_from_graph(ticker: str) -> list:
+    """Live graph query for `ticker`'s competitors; the worker itself uses sector_index.competitors."""
+    if driver is None: return sector_index.competitors(ticker)
     with driver.session() as session:
         query = "MATCH (:Company {ticker: $ticker})-[:IN_SECTOR]->()<-[:IN_SECTOR]-(c:Company) RETURN c.ticker AS competitor"
         result = session.run(query, ticker=ticker)
         return [record["competitor"] for record in result]
 
 def process_feed(feed_url: str, source_weight: float, article_limit: int = 5):
-    try:
-        scraper = NewsArticleScraper()
-        articles = scraper.run(feed_url=feed_url, limit=article_limit)
-        if not articles: return
-
-        for article in articles:
-            title, content, link = article.get("title", ""), article.get("content", ""), article.get("link", "#")
-
-            primary_tickers = extract_tickers(title) or extract_tickers(content)
-            if not primary_tickers: continue
-
-            key_figures = extract_key_figures(content)
-            event_type = classify_event_type(title)
-            event_multiplier = EVENT_IMPACT_MULTIPLIERS.get(event_type, 1.0)
-            
-            doc = nlp(content)
-            sentiment_results = {}
-            for company_name, data in primary_tickers.items():
-                ner_name = data['ner_name']
-                relevant_sentences = [sent.text for sent in doc.sents if ner_name in sent.text]
-                if relevant_sentences:
-                    sentiment_results[data['ticker']] = analyze_sentiment(" ".join(relevant_sentences))
-
-            tickers_in_headline = {data['ticker'] for data in (extract_tickers(title) or {}).values()}
-            if len(tickers_in_headline) > 1 and any(kw in title.lower() for kw in COMPETITIVE_KEYWORDS):
-                winner = next((ticker for ticker, res in sentiment_results.items() if res.get('sentiment') == 'Positive'), None)
-                if winner:
-                    competitors = get_competitors_from_graph(winner)
-                    loser = next((comp for comp in competitors if comp in tickers_in_headline), None)
-                    if loser:
-                        logging.info(f"GRAPH RULE APPLIED: {winner} -> {loser}. Setting sentiment for {loser} to Negative.")
-                        sentiment_results[loser] = {'sentiment': 'Negative', 'confidence': 0.98}
-
-            for company_name, data in primary_tickers.items():
-                ticker = data['ticker']
-                if ticker in sentiment_results:
-                    sentiment_result = sentiment_results[ticker]
-                    impact_score = sentiment_result.get('confidence', 0.0) * source_weight * event_multiplier
-                    save_specific_insight(
-                        title, link, company_name, ticker, sentiment_result, 
-                        event_type, impact_score, json.dumps(key_figures)
-                    )
-    except Exception as e:
-        logging.error(f"Error in worker pipeline: {e}", exc_info=True)
\ No newline at end of file
+    """Runs one feed through the pipeline (see process_feeds)."""
+    process_feeds({feed_url: {'url': feed_url, 'weight': source_weight}}, article_limit=article_limit)
+
+def process_feeds(feeds: dict, article_limit: int = 5) -> dict:
+    """
+    Processes every configured feed in one cycle through the staged pipeline:
+
+        fetch -> parse -> extract -> infer -> enrich -> persist
+
+    All feeds are fetched together on one HTTP client and per-host limiter, and each
+    feed's articles go downstream as soon as that feed is done, so parsing starts while
+    slower feeds are still downloading. Each stage has its own workers
+    (config.PIPELINE_STAGES) and bounded input queue, so network waits, spaCy, LLM
+    calls and DB writes overlap instead of running one phase at a time.
+    `feeds` has the shape of config.FEEDS_TO_PROCESS. Returns the per-stage counters.
+    """
+    return _PipelineRun(article_limit).run([list(feeds.items())], start="fetch")
+
+def _process_articles(articles: list, source_weight: float) -> dict:
+    """Runs already-fetched articles through the pipeline from the parse stage on."""
+    jobs = [{'article': article, 'weight': source_weight} for article in articles]
+    return _PipelineRun().run(jobs, start="parse")
+
+def _mark_processed(job: dict):
+    """Marks a job's article seen once it is stored or deliberately skipped; this also
+    advances its feed's GUID watermark (and lets the feed's validators be cached)."""
+    article = job['article']
+    seen_articles.mark(article.get("link", "#"), article.get("content", ""))
+    if job.get('feed_url') and article.get('guid'):
+        feed_state.mark_guids(job['feed_url'], [article['guid']])
+
+def _already_seen(article: dict) -> bool:
+    if seen_articles.seen_link(article.get("link", "#")) or seen_articles.seen_content(article.get("content", "")):
+        logging.info(f"Skipping already-processed article: \"{article.get('title', '')}\"")
+        return True
+    return False
+
+def _headline_position(title: str, data: dict) -> tuple:
+    """Sort key for a title_tickers entry: character offset of its matched span in `title`, then ticker."""
+    name = data.get('ner_name') or ""
+    offset = title.lower().find(name.lower()) if name else -1
+    return (offset if offset >= 0 else len(title), data['ticker'])
+
+def _llm_snippets(analysis: ArticleAnalysis) -> dict:
+    """Ticker -> the article sentences mentioning it, the input to the LLM analysis."""
+    snippets = {}
+    for company_name, data in analysis.tickers.items():
+        relevant_sentences = analysis.sentences_mentioning(data['ner_name'])
+        if relevant_sentences:
+            snippets[data['ticker']] = " ".join(relevant_sentences)
+    return snippets
+
+class _PipelineRun:
+    """
+    One pass of the pipeline. Items flowing between stages are job dicts:
+    {'article', 'weight'} plus whatever each stage adds ('analysis', 'snippets',
+    'llm_result', 'sentiments', ...). An article is marked seen, in the seen-article
+    index and its feed's GUID watermark, only once it has been persisted (or found to
+    mention no company, or already processed), so anything dropped on an error is
+    offered again by the next poll.
+    """
+    STAGE_ORDER = ("fetch", "parse", "extract", "infer", "enrich", "persist")
+
+    def __init__(self, article_limit: int = 5):
+        self.article_limit = article_limit
+        # Seen-index keys of articles already in flight this run: the same story from two
+        # feeds is parsed once, even though neither copy is marked seen until persisted
+        self._claimed = set()
+        self._claim_lock = threading.Lock()
+
+    def run(self, items: list, start: str = "fetch") -> dict:
+        if not items: return {}
+        stages = [Stage(name, getattr(self, name), fan_out=(name == "fetch"), **PIPELINE_STAGES.get(name, {}))
+                  for name in self.STAGE_ORDER[self.STAGE_ORDER.index(start):]]
+        stats = StagedPipeline(stages, queue_size=PIPELINE_QUEUE_SIZE).run(items)
+        feed_state.save()   # GUID watermarks advanced by this run
+        logging.info("Pipeline: " + ", ".join(
+            f"{name} {s['in']}->{s['out']} ({s['errors']} err, {s['busy_s']:.2f}s)" for name, s in stats.items()
+        ))
+        if SENTIMENT_CASCADE and stats.get("infer", {}).get("in"):
+            logging.info(cascade_stats.summary())
+        return stats
+
+    def _claim(self, job: dict) -> bool:
+        article = job['article']
+        if _already_seen(article):
+            _mark_processed(job)
+            return False
+        keys = seen_articles.keys(article.get("link", "#"), article.get("content", ""))
+        with self._claim_lock:
+            if any(key in self._claimed for key in keys):
+                logging.info(f"Skipping duplicate article in this cycle: \"{article.get('title', '')}\"")
+                return False
+            self._claimed.update(keys)
+        return True
+
+    # --- STAGES ---
+
+    def fetch(self, feeds: list):
+        scraper = NewsArticleScraper(state_store=feed_state, seen_store=seen_articles, mark_fetched=False)
+        by_url = {cfg['url']: (name, cfg) for name, cfg in feeds}
+        # Every feed in one event loop on one client and _HostLimiter, so the per-host
+        # concurrency and delay limits hold across feeds that share a host; a generator,
+        # so each feed's jobs reach the parse queue as soon as that feed is done
+        for url, articles in scraper.iter_feeds(list(by_url), limit=self.article_limit):
+            name, cfg = by_url[url]
+            logging.info(f"Fetched {len(articles)} new article(s) from {name}")
+            for article in articles:
+                yield {'article': article, 'weight': cfg.get('weight', 1.0), 'feed_url': url}
+
+    def parse(self, jobs: list) -> list:
+        jobs = [job for job in jobs if self._claim(job)]
+        if not jobs: return []
+        # One nlp.pipe run over the whole batch instead of a separate parse per title/content
+        for job, analysis in zip(jobs, analyze_articles([job['article'] for job in jobs])):
+            job['analysis'] = analysis
+        return jobs
+
+    def extract(self, job: dict):
+        article, analysis = job['article'], job['analysis']
+        if not analysis.tickers:
+            _mark_processed(job)
+            return None
+        job['snippets'] = _llm_snippets(analysis)
+        job['key_figures'] = analysis.key_figures
+        return job
+
+    def infer(self, jobs: list) -> list:
+        # Event type and every ticker's sentiment in one call per article, all articles of the
+        # batch concurrently (rate-limited, identical requests coalesced). In cascade mode the
+        # local scorer decides first and only uncertain snippets reach the LLM.
+        analyze = cascade_analyze_articles if SENTIMENT_CASCADE else analyze_articles_concurrently
+        results = analyze([(job['article'].get("title", ""), job['snippets']) for job in jobs])
+        done = []
+        for job, llm_result in zip(jobs, results):
+            if isinstance(llm_result, LLMUnavailableError):
+                # Neither its link nor its feed GUID is marked seen, so the next poll offers
+                # the article again as long as its feed still lists it
+                logging.error(f"LLM analysis unavailable for \"{job['article'].get('title', '')}\", "
+                              f"leaving it unprocessed for the next poll: {llm_result}")
+                continue
+            if 'decided_by' in llm_result:
+                timings = llm_result['timings']
+                logging.info(f"Sentiment for \"{job['article'].get('title', '')}\" decided by "
+                             f"{llm_result['decided_by']} tier "
+                             f"(local {timings['local_ms']} ms, llm {timings['llm_ms']} ms)")
+            job['llm_result'] = llm_result
+            done.append(job)
+        return done
+
+    def enrich(self, job: dict) -> dict:
+        title, analysis, llm_result = job['article'].get("title", ""), job['analysis'], job['llm_result']
+        sentiment_results = dict(llm_result['sentiments'])
+
+        # title_tickers comes out of a set, so order the mentions by where they start in the
+        # headline (dict.fromkeys drops repeats) and the chosen loser is deterministic
+        mentions = sorted(analysis.title_tickers.values(), key=lambda data: _headline_position(title, data))
+        tickers_in_headline = list(dict.fromkeys(data['ticker'] for data in mentions))
+        if len(tickers_in_headline) > 1 and any(kw in title.lower() for kw in COMPETITIVE_KEYWORDS):
+            winner = next((ticker for ticker, res in sentiment_results.items() if res.get('sentiment') == 'Positive'), None)
+            if winner:
+                loser = next((comp for comp in tickers_in_headline if sector_index.are_competitors(winner, comp)), None)
+                if loser:
+                    logging.info(f"GRAPH RULE APPLIED: {winner} -> {loser}. Setting sentiment for {loser} to Negative.")
+                    sentiment_results[loser] = {'sentiment': 'Negative', 'confidence': 0.98}
+
+        job['sentiments'] = sentiment_results
+        return job
+
+    def persist(self, jobs: list) -> list:
+        # The batch's rows are collected here and committed in one write; only then are its
+        # articles marked seen. Nothing is buffered, so a failed batch leaves no rows behind.
+        insight_writer.write([insight for job in jobs for insight in _job_insights(job)])
+        for job in jobs:
+            _mark_processed(job)
+        return jobs
+
+def _job_insights(job: dict) -> list:
+    """The job's insights, as InsightWriter.write tuples: one per ticker with a sentiment."""
+    article, analysis = job['article'], job['analysis']
+    title, link = article.get("title", ""), article.get("link", "#")
+    event_type = job['llm_result']['event_type']
+    event_multiplier = EVENT_IMPACT_MULTIPLIERS.get(event_type, 1.0)
+    sentiment_results = job['sentiments']
+
+    insights = []
+    for company_name, data in analysis.tickers.items():
+        ticker = data['ticker']
+        if ticker in sentiment_results:
+            sentiment_result = sentiment_results[ticker]
+            impact_score = sentiment_result.get('confidence', 0.0) * job['weight'] * event_multiplier
+            insights.append((
+                title, link, company_name, ticker, sentiment_result, 
+                event_type, impact_score, json.dumps(job['key_figures'])
+            ))
+    return insights